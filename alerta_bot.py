@@ -1,10 +1,8 @@
 import os
-import yfinance as yf
-import pandas as pd
-import numpy as np
-import requests
-import time
+import data_provider
 from datetime import datetime
+from panel_indicators import with_indicators, last_values
+from bot_runner import load_panels, send_telegram, print_provider_report
 
 # --- CREDENCIALES ---
 TELEGRAM_TOKEN = os.environ.get("TELEGRAM_TOKEN")
@@ -46,86 +44,47 @@ def send_message(msg):
     # Si el reporte es muy largo, hay que partirlo.
     max_len = 4000
     if len(msg) <= max_len:
-        url = f"https://api.telegram.org/bot{TELEGRAM_TOKEN}/sendMessage"
-        requests.post(url, data={"chat_id": CHAT_ID, "text": msg, "parse_mode": "Markdown"})
+        send_telegram(TELEGRAM_TOKEN, CHAT_ID, msg)
     else:
         # Dividir mensaje en partes
         parts = [msg[i:i+max_len] for i in range(0, len(msg), max_len)]
         for part in parts:
-            url = f"https://api.telegram.org/bot{TELEGRAM_TOKEN}/sendMessage"
-            requests.post(url, data={"chat_id": CHAT_ID, "text": part, "parse_mode": "Markdown"})
-            time.sleep(1)
-
-# --- CÁLCULOS MATEMÁTICOS ---
-def calculate_heikin_ashi(df):
-    df_ha = df.copy()
-    df_ha['HA_Close'] = (df['Open'] + df['High'] + df['Low'] + df['Close']) / 4
-    ha_open = [df['Open'].iloc[0]]
-    for i in range(1, len(df)):
-        ha_open.append((ha_open[-1] + df_ha['HA_Close'].iloc[i-1]) / 2)
-    df_ha['HA_Open'] = ha_open
-    df_ha['Color'] = np.where(df_ha['HA_Close'] > df_ha['HA_Open'], 1, -1)
-    return df_ha
-
-def calculate_adx(df, period=14):
-    df = df.copy()
-    df['H-L'] = df['High'] - df['Low']
-    df['H-C'] = abs(df['High'] - df['Close'].shift(1))
-    df['L-C'] = abs(df['Low'] - df['Close'].shift(1))
-    df['TR'] = df[['H-L', 'H-C', 'L-C']].max(axis=1)
-    
-    df['UpMove'] = df['High'] - df['High'].shift(1)
-    df['DownMove'] = df['Low'].shift(1) - df['Low']
-    
-    df['+DM'] = np.where((df['UpMove'] > df['DownMove']) & (df['UpMove'] > 0), df['UpMove'], 0)
-    df['-DM'] = np.where((df['DownMove'] > df['UpMove']) & (df['DownMove'] > 0), df['DownMove'], 0)
-    
-    def wilder(x, period): return x.ewm(alpha=1/period, adjust=False).mean()
-
-    tr_s = wilder(df['TR'], period).replace(0, 1)
-    p_dm_s = wilder(df['+DM'], period)
-    n_dm_s = wilder(df['-DM'], period)
-    
-    p_di = 100 * (p_dm_s / tr_s)
-    n_di = 100 * (n_dm_s / tr_s)
-    dx = 100 * abs(p_di - n_di) / (p_di + n_di)
-    return wilder(dx, period)
+            send_telegram(TELEGRAM_TOKEN, CHAT_ID, part)
+            data_provider.pause(1)
 
 # --- MOTOR PRINCIPAL ---
-def run_bot():
-    print(f"--- START: {datetime.now()} ---")
-    
+def build_market_state(panels):
+    """panels: {(interval, period): panel compactado}. Devuelve el estado por ticker y temporalidad"""
     # Memoria del estado de mercado
     market_state = {t: {} for t in TICKERS}
     
-    # 1. ESCANEO MASIVO
     for interval, label_key, period in TIMEFRAMES:
         try:
-            data = yf.download(TICKERS, interval=interval, period=period, group_by='ticker', progress=False, auto_adjust=True)
-            for ticker in TICKERS:
+            # Indicadores de todo el universo en una sola pasada (tickers x barras)
+            panel = with_indicators(panels[(interval, period)])
+            n_valid = panel['n_valid']
+            adx = last_values(panel['ADX'], n_valid)
+            last_color = last_values(panel['HA_Color'], n_valid)
+            prev_color = last_values(panel['HA_Color'], n_valid, offset=2)
+            price = last_values(panel['Close'], n_valid)
+
+            for i, ticker in enumerate(panel['tickers']):
                 try:
-                    df = data[ticker].dropna() if len(TICKERS)>1 else data.dropna()
-                    if df.empty: continue
-                    if isinstance(df.columns, pd.MultiIndex): df.columns = df.columns.get_level_values(0)
+                    # Necesitamos la última vela cerrada/actual y la anterior
+                    if n_valid[i] < 2 or ticker not in market_state: continue
 
-                    # Indicadores
-                    df['ADX'] = calculate_adx(df)
-                    df_ha = calculate_heikin_ashi(df)
-                    
-                    # Guardamos datos de la última vela cerrada/actual
-                    last = df_ha.iloc[-1]
-                    prev = df_ha.iloc[-2]
-                    
                     # Guardamos Estado (1 Verde, -1 Rojo) y Datos
                     market_state[ticker][label_key] = {
-                        'Color': last['Color'],
-                        'Prev_Color': prev['Color'], # Para detectar cambios recientes
-                        'Price': last['Close'],
-                        'ADX': last['ADX']
+                        'Color': int(last_color[i]),
+                        'Prev_Color': int(prev_color[i]), # Para detectar cambios recientes
+                        'Price': price[i],
+                        'ADX': adx[i]
                     }
-                except: pass
-        except: pass
+                except Exception as e: print(f"[{interval}] {ticker}: {e}")
+        except Exception as e: print(f"[{interval}] Error: {e}")
+    return market_state
 
+def build_report(market_state):
     # 2. CONSTRUCCIÓN DEL REPORTE DETALLADO
     # Categorías
     full_bull = []      # M+ S+ D+
@@ -188,7 +147,18 @@ def run_bot():
     # if mixed:
     #    report += f"💤 **LATERAL / RUIDO**\n" + "\n".join(mixed) + "\n\n"
     
-    send_message(report)
+    return report
+
+def run_plugin(panels):
+    """Reporte Matrioska sobre paneles ya cargados (ver bot_runner.py)"""
+    send_message(build_report(build_market_state(panels)))
+
+def run_bot():
+    print(f"--- START: {datetime.now()} ---")
+    
+    # 1. ESCANEO MASIVO
+    run_plugin(load_panels(TICKERS, TIMEFRAMES))
+    print_provider_report()
 
 if __name__ == "__main__":
     run_bot()
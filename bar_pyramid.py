@@ -0,0 +1,162 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+
+# --- PIRÁMIDE DE VELAS (BASE -> 4H / D / W / M) ---
+# Las temporalidades mayores se derivan de UNA serie base (panel tickers x barras, ver
+# panel_indicators.panel_from_download). Los límites de cada grupo se calculan una sola
+# vez sobre el índice (mismos cortes que df.resample(rule)) y se comparten entre todos los
+# tickers y campos; la agregación first/max/min/last/sum corre por columnas en C.
+# La pirámide queda en caché y, cuando llegan barras base nuevas, solo se recalcula la
+# última vela de cada temporalidad (la que estaba abierta) y las siguientes. La caché es LRU:
+# guarda como mucho PYRAMID_CACHE_MAX pirámides (una por ticker en los scorings 360).
+
+AGG = {'Open': 'first', 'High': 'max', 'Low': 'min', 'Close': 'last', 'Volume': 'sum'}
+LEGACY_RULES = {'ME': 'M'}  # alias para pandas < 2.2 (CI)
+
+PYRAMID_CACHE_MAX = int(os.environ.get("PYRAMID_CACHE_MAX", "512"))
+
+_CACHE = OrderedDict()
+_LOCK = threading.Lock()
+
+def bin_codes(index, rule):
+    """Grupo de cada barra + etiquetas de todos los grupos (incluye grupos vacíos, como resample)"""
+    s = pd.Series(np.ones(len(index)), index=index)
+    try: counts = s.resample(rule).count()
+    except ValueError: counts = s.resample(LEGACY_RULES.get(rule, rule)).count()
+    return np.repeat(np.arange(len(counts)), counts.to_numpy()), counts.index
+
+def _valid_mask(panel):
+    fields = [f for f in AGG if f in panel]
+    valid = np.ones(panel[fields[0]].shape, dtype=bool)
+    for f in fields: valid &= np.isfinite(panel[f])
+    return valid
+
+def aggregate(panel, rule, start=0):
+    """
+    Agrega el panel base a `rule`. Igual a data[t].dropna().resample(rule).agg(...) por ticker.
+    start: primer grupo a calcular (los anteriores se omiten, para la extensión incremental).
+    """
+    codes, labels = bin_codes(panel['index'], rule)
+    first_bar = np.searchsorted(codes, start)
+    codes = codes[first_bar:] - start
+    labels = labels[start:]
+    # Barra válida = todos los campos presentes (mismo criterio que el dropna por ticker)
+    valid = _valid_mask(panel)[:, first_bar:]
+
+    out = {'tickers': panel['tickers'], 'index': labels, 'rule': rule}
+    for f, how in AGG.items():
+        if f not in panel: continue
+        x = np.where(valid, panel[f][:, first_bar:], np.nan)
+        g = pd.DataFrame(x.T).groupby(codes)
+        res = g.sum(min_count=1) if how == 'sum' else getattr(g, how)()
+        block = np.full((len(panel['tickers']), len(labels)), np.nan)
+        block[:, res.index.to_numpy()] = res.to_numpy().T
+        out[f] = block
+    return out
+
+def build_pyramid(base, rules):
+    return {'tickers': list(base['tickers']), 'base': base, 'tf': {rule: aggregate(base, rule) for rule in rules}}
+
+def is_append(old, base):
+    """
+    True si `base` solo agrega barras a `old`: mismo índice y mismos valores en todas las barras
+    viejas salvo la última (que cae en la vela abierta de cada temporalidad y se recalcula).
+    Una historia reajustada (dividendo / split con auto_adjust) no es un agregado.
+    """
+    n = len(old['index'])
+    if n == 0 or len(base['index']) < n or not base['index'][:n].equals(old['index']): return False
+    return all(np.array_equal(base[f][:, :n - 1], old[f][:, :n - 1], equal_nan=True) for f in AGG if f in base)
+
+def extend_pyramid(pyr, base):
+    """
+    Actualiza la pirámide con una base más nueva que solo agrega barras (ver is_append).
+    Se conservan las velas cerradas y se recalcula desde la última vela de cada temporalidad.
+    """
+    for rule, old in pyr['tf'].items():
+        if len(old['index']) == 0:
+            pyr['tf'][rule] = aggregate(base, rule); continue
+        _, labels = bin_codes(base['index'], rule)
+        k = labels.searchsorted(old['index'][-1])
+        new = aggregate(base, rule, start=k)
+        merged = {'tickers': old['tickers'], 'index': old['index'][:-1].append(new['index']), 'rule': rule}
+        for f in AGG:
+            if f in new: merged[f] = np.concatenate((old[f][:, :-1], new[f]), axis=1)
+        pyr['tf'][rule] = merged
+    pyr['base'] = base
+    return pyr
+
+def get_pyramid(key, base, rules):
+    """
+    Pirámide en caché por `key`. Se extiende si la base nueva solo agrega barras a la anterior;
+    si cambian los tickers, las temporalidades pedidas o la historia ya cerrada, se reconstruye. Al pasar de
+    PYRAMID_CACHE_MAX se descarta la usada hace más tiempo.
+    """
+    with _LOCK: pyr = _CACHE.get(key)
+    if pyr is None or pyr['tickers'] != list(base['tickers']) or not set(rules) <= set(pyr['tf']) \
+            or not is_append(pyr['base'], base):
+        pyr = build_pyramid(base, rules)
+    elif not base['index'].equals(pyr['base']['index']) or any(
+            not np.array_equal(base[f], pyr['base'][f], equal_nan=True) for f in AGG if f in base):
+        pyr = extend_pyramid(pyr, base)
+    with _LOCK:
+        _CACHE[key] = pyr
+        _CACHE.move_to_end(key)
+        while len(_CACHE) > PYRAMID_CACHE_MAX: _CACHE.popitem(last=False)
+    return pyr
+
+def frame(panel, ticker, dropna=True):
+    """DataFrame OHLC(V) de un ticker desde un panel (base o temporalidad de la pirámide)"""
+    if ticker not in panel['tickers']: return pd.DataFrame()
+    i = list(panel['tickers']).index(ticker)
+    df = pd.DataFrame({f: panel[f][i] for f in AGG if f in panel}, index=panel['index'])
+    return df.dropna() if dropna else df
+
+# --- BENCHMARK (python bar_pyramid.py) ---
+def _random_panel(n_tickers=70, n_bars=6 * 7 * 126, seed=7):
+    """Panel horario sintético (~6 meses de sesiones de 7 barras)"""
+    rng = np.random.default_rng(seed)
+    days = pd.bdate_range('2024-01-02', periods=n_bars // 7, tz='America/New_York')
+    idx = pd.DatetimeIndex([d + pd.Timedelta(hours=h) for d in days for h in range(9, 16)])[:n_bars]
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.004, (n_tickers, len(idx))), axis=1))
+    panel = {'tickers': [f"T{i:02d}" for i in range(n_tickers)], 'index': idx, 'Close': close,
+             'Open': close * (1 + rng.normal(0, 0.001, close.shape))}
+    panel['High'] = np.maximum(panel['Open'], close) * 1.002
+    panel['Low'] = np.minimum(panel['Open'], close) * 0.998
+    panel['Volume'] = rng.integers(1e4, 1e6, close.shape).astype(float)
+    panel['Close'][::9, :40] = np.nan  # historias más cortas
+    return panel
+
+def run_benchmark(rules=('4h', 'D', 'W')):
+    panel = _random_panel()
+    logic = {'Open': 'first', 'High': 'max', 'Low': 'min', 'Close': 'last', 'Volume': 'sum'}
+
+    t0 = time.perf_counter()
+    ref = {(t, r): frame(panel, t).resample(r).agg(logic).dropna() for t in panel['tickers'] for r in rules}
+    t_loop = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    pyr = build_pyramid(panel, rules)
+    t_vec = time.perf_counter() - t0
+
+    same = all(np.allclose(ref[(t, r)].to_numpy(), frame(pyr['tf'][r], t).to_numpy()) and
+               ref[(t, r)].index.equals(frame(pyr['tf'][r], t).index) for (t, r) in ref)
+
+    # Extensión incremental: la base crece una sesión
+    head = {k: (v[:, :-7] if isinstance(v, np.ndarray) else v) for k, v in panel.items()}
+    head['index'] = panel['index'][:-7]
+    get_pyramid('bench', head, rules)
+    t0 = time.perf_counter()
+    inc = get_pyramid('bench', panel, rules)
+    t_inc = time.perf_counter() - t0
+    same_inc = all(np.array_equal(inc['tf'][r][f], pyr['tf'][r][f], equal_nan=True) for r in rules for f in AGG)
+
+    print(f"Pirámide {len(panel['tickers'])} tickers x {len(rules)} TF | resample por ticker: {t_loop*1000:.0f} ms | "
+          f"panel: {t_vec*1000:.1f} ms | extensión: {t_inc*1000:.1f} ms | idéntico: {same} / {same_inc}")
+    return t_loop, t_vec, same and same_inc
+
+if __name__ == "__main__":
+    run_benchmark()
@@ -0,0 +1,103 @@
+import importlib
+import time
+from datetime import datetime
+import pandas as pd
+import data_provider
+import ohlcv_store
+import provider_guard
+from panel_indicators import panel_from_download, pack_panel, with_indicators
+
+# --- RUNNER ÚNICO DE LOS BOTS ---
+# Cada (intervalo, period) se descarga UNA vez para el universo unido de todos los bots,
+# los indicadores (ADX + HA) se calculan una vez por panel y cada bot corre como plugin
+# sobre esos paneles. Un plugin es un módulo con TICKERS, TIMEFRAMES y run_plugin(panels).
+
+PLUGINS = ['alerta_bot', 'mtf_bot']
+FINAL_TICKER = 'SPY'   # su regularMarketTime dice si Yahoo ya registró el cierre de la sesión
+
+def load_panels(tickers, timeframes):
+    """{(interval, period): panel compactado} sin repetir descargas"""
+    panels = {}
+    for interval, _, period in timeframes:
+        if (interval, period) in panels: continue
+        try:
+            data = ohlcv_store.download(tickers, interval, period)
+            panels[(interval, period)] = pack_panel(panel_from_download(data, tickers))
+        except Exception as e:
+            print(f"Error descargando {interval}/{period}: {e}")
+    return panels
+
+def send_telegram(token, chat_id, text):
+    """Un mensaje de Telegram con deadline / reintentos (429 y 5xx se reintentan). True si salió"""
+    try:
+        r = provider_guard.call('telegram.send', data_provider.send_message, token, chat_id, text,
+                                validate=lambda r: r['status_code'] != 429 and r['status_code'] < 500)
+    except Exception as e:
+        print(f"[telegram] Error: {e}")
+        return False
+    if not r['ok']: print(f"[telegram] HTTP {r['status_code']}: {r['text'][:200]}")
+    return r['ok']
+
+def print_provider_report():
+    for line in provider_guard.report(): print(f"[proveedores] {line}")
+
+def market_time(ticker=FINAL_TICKER):
+    """Hora (UTC) de la última cotización regular de `ticker` según Yahoo, o None"""
+    try: ts = provider_guard.call('yf.info', data_provider.info, ticker).get('regularMarketTime')
+    except Exception as e:
+        print(f"[datos] regularMarketTime de {ticker}: {e}")
+        return None
+    if ts is None: return None
+    ts = pd.Timestamp(ts, unit='s', tz='UTC') if isinstance(ts, (int, float)) else pd.Timestamp(ts)
+    return ts.tz_localize('UTC') if ts.tzinfo is None else ts
+
+def last_bar(panel):
+    """Etiqueta (fecha, sin zona) de la última vela del panel"""
+    ts = pd.Timestamp(panel['index'][-1])
+    return (ts.tz_localize(None) if ts.tzinfo is not None else ts).normalize()
+
+def run(plugins=PLUGINS, expect=None, closed_at=None):
+    """
+    Corre los plugins sobre paneles cargados una sola vez.
+    closed_at: hora de cierre de la sesión opcional; si Yahoo todavía no tiene una cotización
+    regular >= closed_at, la vela del día sigue en curso (misma etiqueta, datos parciales): no se
+    baja ni se evalúa nada y devuelve False.
+    expect: {interval: fecha} opcional; si algún panel de esos intervalos no tiene una vela con
+    etiqueta >= fecha (falta la vela) tampoco se evalúa y devuelve False.
+    """
+    print(f"--- START RUNNER: {datetime.now()} ---")
+    if closed_at is not None:
+        last = market_time()
+        if last is None or last < pd.Timestamp(closed_at):
+            print(f"[datos] Yahoo todavía no registró el cierre de {pd.Timestamp(closed_at)} (última cotización: {last}), no se evalúa")
+            return False
+    modules = [importlib.import_module(name) for name in plugins]
+
+    # Universo unido y temporalidades sin repetir
+    tickers = sorted(set().union(*(m.TICKERS for m in modules)))
+    timeframes = list({(i, p): (i, i, p) for m in modules for i, _, p in m.TIMEFRAMES}.values())
+
+    t0 = time.perf_counter()
+    panels = load_panels(tickers, timeframes)
+    print(f"[datos] {len(panels)} paneles x {len(tickers)} tickers: {time.perf_counter() - t0:.2f} s")
+
+    for interval, since in (expect or {}).items():
+        bars = [last_bar(p) for (i, _), p in panels.items() if i == interval and len(p['index'])]
+        if not bars or min(bars) < pd.Timestamp(since):
+            print(f"[datos] {interval}: todavía sin la vela del {pd.Timestamp(since).date()}, no se evalúa")
+            return False
+
+    t0 = time.perf_counter()
+    for p in panels.values(): with_indicators(p)
+    print(f"[indicadores] ADX + HA: {time.perf_counter() - t0:.2f} s")
+
+    for name, module in zip(plugins, modules):
+        t0 = time.perf_counter()
+        try: module.run_plugin(panels)
+        except Exception as e: print(f"[{name}] Error: {e}")
+        print(f"[{name}] {time.perf_counter() - t0:.2f} s")
+    print_provider_report()
+    return True
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,41 @@
+import asyncio
+import exchange_pool
+import ohlcv_store
+
+# --- DESCARGA CONCURRENTE CCXT (ASYNCIO + TOKEN BUCKET) ---
+# Todas las velas de un lote se piden en paralelo con ccxt.async_support. El ritmo lo
+# marca el token bucket del pool de clientes (ver exchange_pool.py), compartido con el resto
+# de las páginas: mientras haya peso disponible los pedidos salen de inmediato.
+# Cada símbolo se entrega por callback apenas terminan todas sus temporalidades.
+
+MAX_IN_FLIGHT = 16
+
+# --- ESCANEO ---
+async def _scan(exchange_id, symbols, timeframes, on_symbol, max_in_flight):
+    # Mercados desde el caché del pool (sin load_markets por escaneo) y bucket compartido
+    exchange = await exchange_pool.get_async_client(exchange_id)
+    sem = asyncio.Semaphore(max_in_flight)
+
+    async def one(symbol, tf, limit):
+        async with sem:
+            try: return symbol, tf, await ohlcv_store.fetch_ohlcv_async(exchange, symbol, tf, limit)
+            except Exception as e: return symbol, tf, e
+
+    pending = {s: {} for s in symbols}
+    try:
+        jobs = [one(s, tf, limit) for s in symbols for tf, limit in timeframes]
+        for fut in asyncio.as_completed(jobs):
+            symbol, tf, rows = await fut
+            pending[symbol][tf] = rows
+            if len(pending[symbol]) == len(timeframes):
+                on_symbol(symbol, pending.pop(symbol))
+    finally:
+        await exchange.close()
+
+def scan_symbols(symbols, timeframes, on_symbol, exchange_id='kucoinfutures', max_in_flight=MAX_IN_FLIGHT):
+    """
+    timeframes: [(tf, limit), ...]. Llama on_symbol(symbol, {tf: velas | Exception})
+    a medida que cada símbolo queda completo (orden de llegada, no de entrada).
+    """
+    if not symbols: return
+    asyncio.run(_scan(exchange_id, list(symbols), list(timeframes), on_symbol, max_in_flight))
@@ -0,0 +1,284 @@
+import asyncio
+import copy
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import deque
+import numpy as np
+from streaming_indicators import ha_init, ha_update, rsi_init, rsi_update
+
+# --- STREAMING CRIPTO (WEBSOCKET + REPLAY) ---
+# Una "fuente" es un dict con las corrutinas watch_ohlcv(symbol, tf) / watch_ticker(symbol)
+# y close(): la misma firma que ccxt.pro, así el motor no distingue entre el exchange en
+# vivo y una cinta JSONL reproducida desde disco (pruebas offline de latencia y volumen).
+# Por símbolo y temporalidad se guarda un buffer de velas y el estado incremental de
+# HA / RSI (ver streaming_indicators.py), que avanza una vez por vela cerrada.
+# La vela en curso se aplica sobre una copia para leer los valores "en vivo".
+
+BUFFER = 200
+RSI_LEN = 14
+LATENCY_SAMPLES = 10_000
+
+# --- SERIE (BUFFER + INDICADORES) ---
+def series_init(rsi_len=RSI_LEN):
+    return {'candles': [], 'ha': ha_init('mid'), 'rsi': rsi_init(rsi_len),
+            'closed_ts': None, 'closed_vol': None, 'closes': 0}
+
+def _close(s, bar):
+    ts, o, h, l, c, v = bar[:6]
+    ha_update(s['ha'], o, h, l, c)
+    rsi_update(s['rsi'], c)
+    s['closed_ts'], s['closed_vol'] = ts, v
+    s['closes'] += 1
+
+def series_update(s, rows):
+    """Aplica velas [ts, o, h, l, c, v] (la última puede estar abierta). Devuelve cuántas cerraron"""
+    closed = 0
+    for row in rows:
+        candles = s['candles']
+        if candles and row[0] == candles[-1][0]:
+            candles[-1] = list(row)          # actualización de la vela en curso
+        elif not candles or row[0] > candles[-1][0]:
+            if candles:
+                _close(s, candles[-1]); closed += 1
+            candles.append(list(row))
+            if len(candles) > BUFFER: del candles[:-BUFFER]
+    return closed
+
+def series_view(s):
+    """Valores actuales con la vela en curso: color HA, RSI, variación de precio y de volumen"""
+    if not s['candles']: return None
+    ts, o, h, l, c, v = s['candles'][-1][:6]
+    ha, rsi = dict(s['ha']), copy.deepcopy(s['rsi'])
+    prev_vol = s['closed_vol']
+    return {
+        'ts': ts, 'price': c,
+        'ha_color': ha_update(ha, o, h, l, c),
+        'rsi': rsi_update(rsi, c),
+        # Precio: dentro de la vela actual | Volumen: contra la vela anterior
+        'p_chg': (c - o) / o * 100 if o else 0.0,
+        'v_chg': (v - prev_vol) / prev_vol * 100 if prev_vol else 0.0,
+        'closed_ts': s['closed_ts'],
+    }
+
+# --- FUENTES ---
+def pro_source(exchange_id, **config):
+    """Exchange en vivo por WebSocket (ccxt.pro), con los mercados del pool de clientes"""
+    import ccxt.pro
+    import exchange_pool
+    ex = getattr(ccxt.pro, exchange_id)({'enableRateLimit': True, **config})
+    markets = exchange_pool.get_client(exchange_id, **config)
+    ex.set_markets(markets.markets, markets.currencies or None)
+    return {'id': exchange_id, 'watch_ohlcv': ex.watch_ohlcv, 'watch_ticker': ex.watch_ticker,
+            'close': ex.close, 'sent': {}}
+
+def _key(ev):
+    return (ev['type'], ev['symbol'], ev.get('tf'))
+
+def replay_source(path, speed=1.0):
+    """
+    Reproduce una cinta JSONL ({t, type, symbol, tf, data} por línea) con el ritmo original
+    dividido por `speed` (speed=0: lo más rápido posible). Al terminar la cinta, los watch_*
+    lanzan EOFError. source['sent'][clave] = perf_counter de la última entrega.
+    """
+    with open(path) as f: events = [json.loads(line) for line in f if line.strip()]
+    src = {'id': 'replay', 'sent': {}, 'queues': {}, 'driver': None}
+
+    def queue(key):
+        if key not in src['queues']: src['queues'][key] = asyncio.Queue()
+        return src['queues'][key]
+
+    async def drive():
+        loop = asyncio.get_running_loop()
+        t0, base = loop.time(), events[0]['t'] if events else 0
+        for i, ev in enumerate(events):
+            if speed:
+                delay = (ev['t'] - base) / 1000 / speed - (loop.time() - t0)
+                if delay > 0: await asyncio.sleep(delay)
+            elif i % 100 == 0:
+                await asyncio.sleep(0)
+            queue(_key(ev)).put_nowait((time.perf_counter(), ev['data']))
+        for q in list(src['queues'].values()): q.put_nowait(None)
+        src['done'] = True
+
+    async def watch(key):
+        if src['driver'] is None: src['driver'] = asyncio.ensure_future(drive())
+        if src.get('done') and key not in src['queues']: raise EOFError
+        item = await queue(key).get()
+        if item is None:
+            queue(key).put_nowait(None)  # otros consumidores de la misma clave
+            raise EOFError
+        src['sent'][key] = item[0]
+        return item[1]
+
+    async def close():
+        if src['driver'] is not None: src['driver'].cancel()
+
+    src['watch_ohlcv'] = lambda symbol, tf: watch(('ohlcv', symbol, tf))
+    src['watch_ticker'] = lambda symbol: watch(('ticker', symbol, None))
+    src['close'] = close
+    return src
+
+# --- MOTOR ---
+def store_init(symbols, timeframes):
+    return {'series': {(s, tf): series_init() for s in symbols for tf in timeframes},
+            'quotes': {}, 'stats': {'events': 0, 'closes': 0, 'latency': deque(maxlen=LATENCY_SAMPLES)},
+            'error': None}
+
+async def run_stream(source, symbols, timeframes, store=None, on_close=None, stop=None, tickers=True):
+    """
+    Suscribe velas (y tickers) de todos los símbolos y actualiza `store` hasta que la
+    fuente se agote o se active `stop` (threading.Event). on_close(symbol, tf, vista)
+    se llama cada vez que cierra una vela.
+    """
+    store = store or store_init(symbols, timeframes)
+    stats = store['stats']
+
+    def latency(key):
+        sent = source['sent'].get(key)
+        if sent is not None: stats['latency'].append(time.perf_counter() - sent)
+
+    async def candles(symbol, tf):
+        s = store['series'].setdefault((symbol, tf), series_init())
+        while not (stop and stop.is_set()):
+            try: rows = await source['watch_ohlcv'](symbol, tf)
+            except EOFError: return
+            except Exception:
+                await asyncio.sleep(1); continue
+            closed = series_update(s, rows)
+            stats['events'] += 1
+            stats['closes'] += closed
+            if closed and on_close: on_close(symbol, tf, series_view(s))
+            latency(('ohlcv', symbol, tf))
+
+    async def quotes(symbol):
+        while not (stop and stop.is_set()):
+            try: store['quotes'][symbol] = await source['watch_ticker'](symbol)
+            except EOFError: return
+            except Exception:
+                await asyncio.sleep(1); continue
+            stats['events'] += 1
+            latency(('ticker', symbol, None))
+
+    async def watchdog(tasks):
+        while not all(t.done() for t in tasks):
+            if stop and stop.is_set():
+                for t in tasks: t.cancel()
+                return
+            await asyncio.sleep(0.2)
+
+    tasks = [asyncio.ensure_future(candles(s, tf)) for s in symbols for tf in timeframes]
+    if tickers: tasks += [asyncio.ensure_future(quotes(s)) for s in symbols]
+    try:
+        await asyncio.gather(watchdog(tasks), *tasks, return_exceptions=True)
+    finally:
+        await source['close']()
+    return store
+
+# --- STREAMS EN SEGUNDO PLANO (STREAMLIT) ---
+# Un hilo con su propio event loop por stream; las páginas solo leen `store` en cada rerun.
+_STREAMS = {}
+_LOCK = threading.Lock()
+
+def start(key, make_source, symbols, timeframes, seed=None):
+    """
+    Arranca (o reutiliza) el stream `key`. make_source() se llama dentro del hilo del stream.
+    seed(symbol, tf) -> velas REST para precargar los buffers antes de suscribirse.
+    """
+    with _LOCK:
+        entry = _STREAMS.get(key)
+        if entry and entry['thread'].is_alive(): return entry['store']
+        store, halt = store_init(symbols, timeframes), threading.Event()
+
+        def main():
+            try:
+                if seed:
+                    for (symbol, tf), s in store['series'].items():
+                        try: series_update(s, seed(symbol, tf) or [])
+                        except Exception: pass
+                asyncio.run(run_stream(make_source(), symbols, timeframes, store, stop=halt))
+            except Exception as e:
+                store['error'] = str(e)
+
+        thread = threading.Thread(target=main, name=f"stream-{key}", daemon=True)
+        _STREAMS[key] = {'thread': thread, 'store': store, 'stop': halt}
+        thread.start()
+        return store
+
+def stop(key):
+    with _LOCK:
+        entry = _STREAMS.pop(key, None)
+    if entry: entry['stop'].set()
+
+def stop_all():
+    for key in list(_STREAMS): stop(key)
+
+def snapshot(store):
+    """{(symbol, tf): vista} de todas las series con datos"""
+    return {k: v for k, v in ((k, series_view(s)) for k, s in list(store['series'].items())) if v}
+
+# --- GRABACIÓN / CINTA SINTÉTICA ---
+async def record(source, symbols, timeframes, path, seconds=60):
+    """Graba lo que entrega `source` como cinta JSONL para reproducir con replay_source"""
+    end = time.monotonic() + seconds
+    with open(path, 'w') as f:
+        async def pump(kind, symbol, tf=None):
+            while time.monotonic() < end:
+                try:
+                    data = await (source['watch_ohlcv'](symbol, tf) if kind == 'ohlcv' else source['watch_ticker'](symbol))
+                except Exception:
+                    await asyncio.sleep(1); continue
+                f.write(json.dumps({'t': int(time.time() * 1000), 'type': kind, 'symbol': symbol, 'tf': tf,
+                                    'data': data}, default=str) + "\n")
+        jobs = [pump('ohlcv', s, tf) for s in symbols for tf in timeframes] + [pump('ticker', s) for s in symbols]
+        try: await asyncio.wait_for(asyncio.gather(*jobs), seconds + 5)
+        except asyncio.TimeoutError: pass
+        finally: await source['close']()
+
+def write_tape(path, symbols, timeframes=('1m', '5m'), minutes=60, ticks_per_minute=6, seed=7):
+    """Cinta sintética: cada tick actualiza la vela en curso de cada símbolo/temporalidad"""
+    rng = np.random.default_rng(seed)
+    tf_ms = {'1m': 60_000, '5m': 300_000, '15m': 900_000, '1h': 3_600_000}
+    t0 = 1_700_000_000_000
+    price = {s: 100.0 for s in symbols}
+    bars = {}
+    step = 60_000 // ticks_per_minute
+    with open(path, 'w') as f:
+        for i in range(minutes * ticks_per_minute):
+            now = t0 + i * step
+            for s in symbols:
+                price[s] *= 1 + rng.normal(0, 0.001)
+                p, vol = round(price[s], 4), float(rng.integers(1, 100))
+                for tf in timeframes:
+                    start = now // tf_ms[tf] * tf_ms[tf]
+                    b = bars.get((s, tf))
+                    if b is None or b[0] != start: b = bars[(s, tf)] = [start, p, p, p, p, 0.0]
+                    b[2], b[3], b[4], b[5] = max(b[2], p), min(b[3], p), p, b[5] + vol
+                    f.write(json.dumps({'t': now, 'type': 'ohlcv', 'symbol': s, 'tf': tf, 'data': [list(b)]}) + "\n")
+                f.write(json.dumps({'t': now, 'type': 'ticker', 'symbol': s, 'tf': None,
+                                    'data': {'symbol': s, 'last': p, 'timestamp': now}}) + "\n")
+
+# --- BENCHMARK (python crypto_stream.py) ---
+def run_benchmark(n_symbols=50, timeframes=('1m', '5m'), minutes=30):
+    symbols = [f"S{i:02d}/USDT:USDT" for i in range(n_symbols)]
+    path = os.path.join(tempfile.gettempdir(), "crypto_stream_tape.jsonl")
+    write_tape(path, symbols, timeframes, minutes)
+
+    # Volumen: la cinta completa lo más rápido posible
+    t0 = time.perf_counter()
+    store = asyncio.run(run_stream(replay_source(path, speed=0), symbols, timeframes))
+    elapsed = time.perf_counter() - t0
+    ev = store['stats']['events']
+
+    # Latencia: reproducción con el ritmo de la cinta acelerado x600 (1 minuto = 0.1 s)
+    store_rt = asyncio.run(run_stream(replay_source(path, speed=600), symbols, timeframes))
+    lat = np.array(store_rt['stats']['latency']) * 1000
+    print(f"Stream replay {n_symbols} símbolos x {len(timeframes)} TF | {ev} eventos en {elapsed:.2f} s "
+          f"({ev / elapsed:,.0f} ev/s) | velas cerradas: {store['stats']['closes']} | "
+          f"latencia x600 p50: {np.percentile(lat, 50):.2f} ms p99: {np.percentile(lat, 99):.2f} ms")
+    return store
+
+if __name__ == "__main__":
+    run_benchmark()
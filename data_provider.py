@@ -0,0 +1,214 @@
+import asyncio
+import gzip
+import hashlib
+import os
+import pickle
+import threading
+import time
+import yfinance as yf
+from single_flight import freeze
+
+# --- PROVEEDOR DE DATOS (VIVO / GRABACIÓN / REPRODUCCIÓN) ---
+# Punto único de salida a la red para Yahoo (download, history, opciones, info, fast_info),
+# ccxt (cualquier método del exchange, sync o async) y Telegram (sendMessage). El modo se
+# elige con variables de entorno (o set_mode):
+#   DATA_PROVIDER=live     (por defecto) va directo al proveedor.
+#   DATA_PROVIDER=record   va al proveedor y guarda cada respuesta (o error) en un fixture.
+#   DATA_PROVIDER=replay   sirve los fixtures sin red; si falta uno lanza FixtureMissing.
+#   DATA_FIXTURES=<dir>    carpeta de fixtures (por defecto <repo>/fixtures).
+#   DATA_REPLAY_LATENCY=recorded | <segundos>   latencia simulada por llamada.
+#   DATA_REPLAY_SPEED=<x>  divide la latencia grabada (10 = diez veces más rápido).
+# Un fixture es un pickle comprimido con gzip por llamada: <dir>/<operación>/<hash>.pkl.gz,
+# con la clave legible, la respuesta (o el tipo y mensaje del error) y la latencia medida.
+# Son pickles de pandas: se reproducen con la misma versión de pandas que los grabó. Son
+# respuestas reales del proveedor: fixtures/ está en .gitignore (no se versionan).
+# Telegram nunca se graba: en replay no se envía nada, se responde 200 y el texto queda en SENT.
+
+FIXTURES_DIR = os.environ.get("DATA_FIXTURES", os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures"))
+MODES = ('live', 'record', 'replay')
+
+_CONFIG = {'mode': os.environ.get("DATA_PROVIDER", "live"),
+           'latency': os.environ.get("DATA_REPLAY_LATENCY", "recorded"),
+           'speed': float(os.environ.get("DATA_REPLAY_SPEED", "1"))}
+_LOCK = threading.Lock()
+SENT = []
+
+class FixtureMissing(LookupError):
+    """No hay fixture para la llamada en modo replay (no se reintenta)"""
+    fatal = True
+
+class ReplayedError(RuntimeError):
+    """Error grabado del proveedor, relanzado en replay"""
+
+def set_mode(mode, fixtures=None, latency=None, speed=None):
+    global FIXTURES_DIR
+    if mode not in MODES: raise ValueError(f"modo desconocido: {mode}")
+    _CONFIG['mode'] = mode
+    if fixtures is not None: FIXTURES_DIR = fixtures
+    if latency is not None: _CONFIG['latency'] = latency
+    if speed is not None: _CONFIG['speed'] = float(speed)
+
+def mode():
+    return _CONFIG['mode']
+
+# --- FIXTURES ---
+def fixture_key(op, *args, **kwargs):
+    return repr((op, freeze(args), freeze(kwargs)))
+
+def fixture_path(op, key):
+    return os.path.join(FIXTURES_DIR, op, hashlib.md5(key.encode()).hexdigest() + ".pkl.gz")
+
+def _save(op, key, entry):
+    path = fixture_path(op, key)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{threading.get_ident()}.tmp"
+    try:
+        with gzip.open(tmp, 'wb') as f: pickle.dump({'key': key, **entry}, f, protocol=4)
+        os.replace(tmp, path)
+    except Exception:
+        if os.path.exists(tmp): os.remove(tmp)
+
+def _load(op, key):
+    path = fixture_path(op, key)
+    try:
+        with gzip.open(path, 'rb') as f: return pickle.load(f)
+    except (OSError, EOFError, pickle.UnpicklingError):
+        raise FixtureMissing(f"{op}: sin fixture para {key[:200]}") from None
+
+def _latency(entry):
+    if _CONFIG['latency'] == 'recorded': return entry.get('latency', 0.0) / max(_CONFIG['speed'], 1e-9)
+    return float(_CONFIG['latency'])
+
+def _replayed(entry):
+    if 'error' in entry:
+        kind, msg = entry['error']
+        raise ReplayedError(f"{kind}: {msg}")
+    return entry['result']
+
+def _run(op, key, fn):
+    """Llamada sync según el modo"""
+    m = _CONFIG['mode']
+    if m == 'replay':
+        entry = _load(op, key)
+        time.sleep(_latency(entry))
+        return _replayed(entry)
+    if m == 'live': return fn()
+    t0 = time.perf_counter()
+    try: result = fn()
+    except Exception as e:
+        _save(op, key, {'error': (type(e).__name__, str(e)), 'latency': time.perf_counter() - t0})
+        raise
+    _save(op, key, {'result': result, 'latency': time.perf_counter() - t0})
+    return result
+
+async def _run_async(op, key, make_coro):
+    m = _CONFIG['mode']
+    if m == 'replay':
+        entry = _load(op, key)
+        await asyncio.sleep(_latency(entry))
+        return _replayed(entry)
+    if m == 'live': return await make_coro()
+    t0 = time.perf_counter()
+    try: result = await make_coro()
+    except Exception as e:
+        _save(op, key, {'error': (type(e).__name__, str(e)), 'latency': time.perf_counter() - t0})
+        raise
+    _save(op, key, {'result': result, 'latency': time.perf_counter() - t0})
+    return result
+
+# --- YAHOO ---
+def download(tickers, **kw):
+    """yf.download(tickers, **kw)"""
+    return _run('yf.download', fixture_key('yf.download', tickers, **kw), lambda: yf.download(tickers, **kw))
+
+def history(ticker, **kw):
+    """yf.Ticker(ticker).history(**kw)"""
+    return _run('yf.history', fixture_key('yf.history', ticker, **kw), lambda: yf.Ticker(ticker).history(**kw))
+
+def option_expirations(ticker):
+    """yf.Ticker(ticker).options como tupla"""
+    return _run('yf.options', fixture_key('yf.options', ticker), lambda: tuple(yf.Ticker(ticker).options))
+
+def option_chain(ticker, expiry):
+    """(calls, puts) de yf.Ticker(ticker).option_chain(expiry)"""
+    def fetch():
+        opt = yf.Ticker(ticker).option_chain(expiry)
+        return opt.calls, opt.puts
+    return _run('yf.option_chain', fixture_key('yf.option_chain', ticker, expiry), fetch)
+
+def info(ticker):
+    """yf.Ticker(ticker).info"""
+    return _run('yf.info', fixture_key('yf.info', ticker), lambda: yf.Ticker(ticker).info)
+
+def fast_info(ticker):
+    """{'last_price', 'previous_close'} de yf.Ticker(ticker).fast_info (el objeto original es perezoso)"""
+    def fetch():
+        fi = yf.Ticker(ticker).fast_info
+        return {'last_price': fi.last_price, 'previous_close': fi.previous_close}
+    return _run('yf.fast_info', fixture_key('yf.fast_info', ticker), fetch)
+
+# --- CCXT ---
+def exchange_call(exchange, method, *args, **kwargs):
+    """exchange.<method>(*args, **kwargs): fetch_ohlcv, fetch_tickers, fetch_open_interest_history, ..."""
+    key = fixture_key(f"ccxt.{exchange.id}.{method}", *args, **kwargs)
+    return _run(f"ccxt.{method}", key, lambda: getattr(exchange, method)(*args, **kwargs))
+
+async def exchange_call_async(exchange, method, *args, **kwargs):
+    """Igual que exchange_call para ccxt.async_support (mismos fixtures que la versión sync)"""
+    key = fixture_key(f"ccxt.{exchange.id}.{method}", *args, **kwargs)
+    return await _run_async(f"ccxt.{method}", key, lambda: getattr(exchange, method)(*args, **kwargs))
+
+def load_markets(exchange):
+    """(markets, currencies) recargados del exchange; en replay no se toca la red"""
+    def fetch():
+        exchange.load_markets(reload=True)
+        return exchange.markets, exchange.currencies
+    return _run('ccxt.load_markets', fixture_key(f"ccxt.{exchange.id}.load_markets"), fetch)
+
+async def load_markets_async(exchange):
+    """load_markets para ccxt.async_support (mismo fixture que la versión sync)"""
+    async def fetch():
+        await exchange.load_markets(reload=True)
+        return exchange.markets, exchange.currencies
+    return await _run_async('ccxt.load_markets', fixture_key(f"ccxt.{exchange.id}.load_markets"), fetch)
+
+# --- TELEGRAM ---
+def send_message(token, chat_id, text, timeout=10):
+    """sendMessage de Telegram -> {'status_code', 'ok', 'text'}"""
+    if _CONFIG['mode'] == 'replay':
+        with _LOCK: SENT.append(text)
+        return {'status_code': 200, 'ok': True, 'text': ''}
+    import requests
+    r = requests.post(f"https://api.telegram.org/bot{token}/sendMessage", timeout=timeout,
+                      data={"chat_id": chat_id, "text": text, "parse_mode": "Markdown"})
+    return {'status_code': r.status_code, 'ok': r.ok, 'text': r.text}
+
+def pause(seconds):
+    """Pausa entre mensajes (límite anti-flood de Telegram); en replay no hay a quién esperar"""
+    if _CONFIG['mode'] != 'replay': time.sleep(seconds)
+
+# --- BENCHMARK OFFLINE (python data_provider.py [record|replay]) ---
+def run_benchmark(mode_name='replay'):
+    """Corre el runner de los bots y el motor de cotizaciones con el modo pedido y un almacén OHLCV vacío"""
+    import tempfile
+    import ohlcv_store
+    import provider_guard
+    import quote_engine
+    import bot_runner
+
+    set_mode(mode_name)
+    # Almacén vacío: cada corrida pide exactamente lo mismo (mismas claves de fixture)
+    ohlcv_store.STORE_DIR = tempfile.mkdtemp(prefix="ohlcv_bench_")
+    provider_guard.reset()
+
+    t0 = time.perf_counter(); bot_runner.run(); t_bots = time.perf_counter() - t0
+    quote_engine.clear()
+    tickers = ['AAPL', 'MSFT', 'NVDA', 'GGAL', 'YPF', 'MELI', 'KO', 'XOM', 'SPY', 'QQQ']
+    t0 = time.perf_counter(); quotes = quote_engine.get_quotes(tickers); t_quotes = time.perf_counter() - t0
+    print(f"Proveedor [{mode_name}] fixtures: {FIXTURES_DIR} | bots: {t_bots:.2f} s | "
+          f"cotizaciones: {t_quotes:.2f} s ({len(quotes)}/{len(tickers)}) | Telegram (replay): {len(SENT)} mensajes")
+    for line in provider_guard.report(): print(f"  {line}")
+
+if __name__ == "__main__":
+    import sys
+    run_benchmark(sys.argv[1] if len(sys.argv) > 1 else 'replay')
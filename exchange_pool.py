@@ -0,0 +1,186 @@
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+import ccxt
+import ccxt.async_support as ccxt_async
+import data_provider
+import provider_guard
+from ohlcv_store import STORE_DIR
+
+# --- POOL DE CLIENTES CCXT ---
+# Un cliente por exchange y por proceso (compartido entre páginas y sesiones de Streamlit):
+# se reutiliza la sesión HTTP y los mercados ya cargados. La metadata de mercados se
+# guarda en disco y solo se vuelve a pedir cuando vence MARKETS_TTL (si la red falla se
+# usa la copia vencida); los clientes async la piden con await, sin bloquear el event loop.
+# Todos los pedidos de un exchange, sync o async y desde cualquier hilo, consumen del mismo
+# token bucket.
+
+MARKETS_DIR = os.path.join(STORE_DIR, "markets")
+MARKETS_TTL = float(os.environ.get("MARKETS_TTL", 6 * 3600))
+
+# Cupo por IP de los endpoints públicos. Se usa `usage` del cupo para dejar margen.
+# KuCoin Futures: 2000 de peso cada 30 s (klines = peso 3). Gate.io: 200 pedidos / 10 s.
+RATE_LIMITS = {
+    'kucoinfutures': {'capacity': 2000, 'window': 30, 'weight': 3, 'usage': 0.8},
+    'gate': {'capacity': 200, 'window': 10, 'weight': 1, 'usage': 0.8},
+}
+DEFAULT_LIMIT = {'capacity': 600, 'window': 60, 'weight': 1, 'usage': 0.8}
+DEFAULT_CONFIG = {'timeout': 30000}
+
+_LOCK = threading.Lock()
+_MARKETS_LOCK = threading.RLock()
+_CLIENTS = {}
+_MARKETS = {}
+_APPLIED = {}  # id(cliente) -> ts de los mercados que tiene cargados
+_BUCKETS = {}
+
+# --- TOKEN BUCKET (COMPARTIDO ENTRE HILOS Y EVENT LOOPS) ---
+def bucket_init(capacity, window, usage=1.0):
+    cap = capacity * usage
+    return {'capacity': cap, 'rate': cap / window, 'tokens': cap, 'ts': time.monotonic(), 'lock': threading.Lock()}
+
+def bucket_reserve(b, weight=1):
+    """Reserva `weight` tokens (el saldo puede quedar negativo) y devuelve cuántos segundos esperar"""
+    with b['lock']:
+        now = time.monotonic()
+        b['tokens'] = min(b['capacity'], b['tokens'] + (now - b['ts']) * b['rate'])
+        b['ts'] = now
+        b['tokens'] -= weight
+        return max(0.0, -b['tokens'] / b['rate'])
+
+def get_bucket(exchange_id):
+    with _LOCK:
+        if exchange_id not in _BUCKETS:
+            lim = RATE_LIMITS.get(exchange_id, DEFAULT_LIMIT)
+            _BUCKETS[exchange_id] = bucket_init(lim['capacity'], lim['window'], lim['usage'])
+        return _BUCKETS[exchange_id]
+
+def _weight(exchange_id):
+    return RATE_LIMITS.get(exchange_id, DEFAULT_LIMIT)['weight']
+
+def throttle(exchange_id):
+    time.sleep(bucket_reserve(get_bucket(exchange_id), _weight(exchange_id)))
+
+async def throttle_async(exchange_id):
+    await asyncio.sleep(bucket_reserve(get_bucket(exchange_id), _weight(exchange_id)))
+
+# --- METADATA DE MERCADOS (DISCO + MEMORIA) ---
+def _markets_path(exchange_id, key):
+    tag = hashlib.md5(key.encode()).hexdigest()[:8]
+    return os.path.join(MARKETS_DIR, f"{exchange_id}_{tag}.json")
+
+def _read_markets(path):
+    try:
+        with open(path, encoding='utf-8') as f: return json.load(f)
+    except (OSError, ValueError): return None
+
+def _write_markets(path, entry):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".tmp"
+    try:
+        with open(tmp, 'w', encoding='utf-8') as f: json.dump(entry, f, default=str)
+        os.replace(tmp, path)
+    except (OSError, TypeError, ValueError):
+        if os.path.exists(tmp): os.remove(tmp)
+
+def _fresh(entry, ttl):
+    return entry is not None and time.time() - entry['ts'] < ttl
+
+def _cached(exchange_id, key, ttl):
+    """(entrada vigente o None, mejor copia aunque esté vencida) desde memoria / disco. Llamar con _MARKETS_LOCK"""
+    mk = (exchange_id, key)
+    entry = _MARKETS.get(mk)
+    if _fresh(entry, ttl): return entry, entry
+    disk = _read_markets(_markets_path(exchange_id, key))
+    if _fresh(disk, ttl):
+        _MARKETS[mk] = disk
+        return disk, disk
+    return None, entry or disk
+
+def _save(exchange_id, key, markets, currencies):
+    """Guarda mercados recién bajados en memoria y disco. Llamar con _MARKETS_LOCK"""
+    entry = {'ts': time.time(), 'markets': markets, 'currencies': currencies}
+    _write_markets(_markets_path(exchange_id, key), entry)
+    _MARKETS[(exchange_id, key)] = entry
+    return entry
+
+def _apply(exchange, entry):
+    if _APPLIED.get(id(exchange)) != entry['ts']:
+        exchange.set_markets(entry['markets'], entry['currencies'] or None)
+        _APPLIED[id(exchange)] = entry['ts']
+
+def load_markets(exchange, key='default', refresh=False, ttl=MARKETS_TTL):
+    """
+    Carga los mercados en `exchange` desde memoria / disco, o desde la red si vencieron.
+    key: distingue configuraciones con distintos mercados (p.ej. defaultType).
+    """
+    with _MARKETS_LOCK:
+        fresh, stale = _cached(exchange.id, key, ttl)
+        entry = None if refresh else fresh
+        if entry is None:
+            try:
+                markets, currencies = provider_guard.call('ccxt.markets', data_provider.load_markets, exchange)
+                entry = _save(exchange.id, key, markets, currencies)
+            except Exception:
+                # Sin red: la copia vencida sirve más que nada
+                entry = stale
+                if entry is None: raise
+                _MARKETS[(exchange.id, key)] = entry
+        _apply(exchange, entry)
+    return exchange.markets
+
+async def load_markets_async(exchange, key='default', refresh=False, ttl=MARKETS_TTL):
+    """
+    Igual que load_markets para un cliente async: si hay que ir a la red se espera con
+    `await` (no bloquea el event loop). El lock no se sostiene durante la descarga.
+    """
+    with _MARKETS_LOCK: fresh, stale = _cached(exchange.id, key, ttl)
+    entry = None if refresh else fresh
+    if entry is None:
+        try:
+            markets, currencies = await provider_guard.call_async(
+                'ccxt.markets', lambda: data_provider.load_markets_async(exchange))
+            with _MARKETS_LOCK: entry = _save(exchange.id, key, markets, currencies)
+        except Exception:
+            entry = stale
+            if entry is None: raise
+    with _MARKETS_LOCK: _apply(exchange, entry)
+    return exchange.markets
+
+# --- CLIENTES ---
+def _key(config):
+    return json.dumps(config, sort_keys=True, default=str)
+
+def get_client(exchange_id, refresh=False, **config):
+    """Cliente sync compartido por proceso para (exchange, config), con mercados ya cargados"""
+    key = _key(config)
+    with _LOCK:
+        client = _CLIENTS.get((exchange_id, key))
+        if client is None:
+            client = getattr(ccxt, exchange_id)({**DEFAULT_CONFIG, **config, 'enableRateLimit': True})
+            # El ritmo lo marca el bucket del pool, no el throttler propio de cada instancia
+            client.throttle = lambda cost=None: throttle(exchange_id)
+            _CLIENTS[(exchange_id, key)] = client
+    load_markets(client, key, refresh)
+    return client
+
+async def get_async_client(exchange_id, refresh=False, **config):
+    """
+    Cliente ccxt.async_support nuevo (su sesión aiohttp queda atada al event loop actual;
+    cerrarlo con `await client.close()`), con los mercados del pool y el bucket compartido.
+    Con el caché de mercados vencido los pide el propio cliente async, sin frenar el loop.
+    """
+    client = getattr(ccxt_async, exchange_id)({**DEFAULT_CONFIG, **config, 'enableRateLimit': True})
+
+    async def _throttle(cost=None):
+        await throttle_async(exchange_id)
+
+    client.throttle = _throttle
+    try: await load_markets_async(client, _key(config), refresh)
+    except Exception:
+        await client.close()
+        raise
+    return client
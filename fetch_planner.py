@@ -0,0 +1,140 @@
+import math
+import ohlcv_store
+from bar_pyramid import get_pyramid
+from panel_indicators import panel_from_download
+
+# --- PLANIFICADOR DE VENTANAS POR INDICADOR ---
+# Cada escáner declara qué indicadores calcula en cada temporalidad y cuántas barras
+# finales usa (señal, gráfico); el planificador calcula el calentamiento necesario y lo
+# traduce a la ventana (period) e intervalo mínimos de yfinance. Calentamiento:
+#   - Wilder (ADX, RSI, ATR con RMA): ~10 x longitud, el peso de la semilla cae a e^-10.
+#   - Media / ventana simple: la longitud (+1 si usa diff / shift).
+#   - ADX con medias simples (ATR y ADX con rolling(n)): primera lectura en 2n + 1 barras.
+#   - ewm(adjust=True): sin semilla, se normaliza con los pesos disponibles; con 5 x longitud
+#     la cola que queda afuera pesa (1 - 1/n)^(5n) ~ e^-5 (< 1%).
+#   - Heikin Ashi recursivo: 50 barras (0.5^50, por debajo del redondeo de un float).
+#   - Heikin Ashi de dos velas (HA_Open = vela anterior): 2 barras.
+#   - Estacionalidad: los años pedidos completos.
+# Las temporalidades sin intervalo nativo (4H) o más gruesas que una base ya planificada
+# que las cubre se derivan con la pirámide de velas en lugar de otra descarga.
+
+WARMUP = {
+    'wilder': lambda n: 10 * n,
+    'adx': lambda n: 10 * n,
+    'rsi': lambda n: 10 * n,
+    'adx_sma': lambda n: 2 * n + 1,
+    'ewm': lambda n: 5 * n,
+    'sma': lambda n: n,
+    'rolling_diff': lambda n: n + 1,
+    'ha': lambda: 50,
+    'ha_fast': lambda: 2,
+}
+
+# Temporalidad -> (intervalo nativo de yfinance o None, regla de la pirámide, minutos por barra)
+TIMEFRAMES = {
+    '1h': ('1h', None, 60),
+    '4h': (None, '4h', 240),
+    '1d': ('1d', 'D', 1440),
+    '1wk': ('1wk', 'W', 10080),
+    '1mo': ('1mo', 'ME', 43200),
+}
+BARS_PER_YEAR = {'1h': 252 * 7, '4h': 252 * 2, '1d': 252, '1wk': 52, '1mo': 12}
+# Ventanas estándar de Yahoo (días de calendario que cubren)
+PERIODS = (('5d', 5), ('1mo', 31), ('3mo', 92), ('6mo', 183), ('1y', 366),
+           ('2y', 731), ('5y', 1827), ('10y', 3653))
+MAX_DAYS = {'1h': 730}  # límite de Yahoo para velas intradía
+CALENDAR_MARGIN = 1.05  # feriados
+
+# --- BARRAS ---
+def warmup(indicators):
+    """Barras de calentamiento para un conjunto [(nombre, longitud...), ...]"""
+    bars = 0
+    for name, *args in indicators:
+        if name == 'seasonality': continue
+        bars = max(bars, WARMUP[name](*args))
+    return bars
+
+def bars_needed(indicators, keep=1):
+    """Barras a descargar: calentamiento + `keep` barras útiles"""
+    return warmup(indicators) + keep
+
+def days_needed(tf, bars):
+    """Días de calendario que cubren `bars` barras de `tf`"""
+    return math.ceil(bars / BARS_PER_YEAR[tf] * 365 * CALENDAR_MARGIN) + 1
+
+def span_days(tf, indicators, keep=1):
+    """Días de calendario para el calentamiento + `keep`, o los años completos de estacionalidad"""
+    years = max([args[0] for name, *args in indicators if name == 'seasonality'] or [0])
+    return max(days_needed(tf, bars_needed(indicators, keep)), math.ceil(years * 365.25))
+
+def period_for_days(interval, days):
+    """Ventana de yfinance más chica que cubre `days` días de calendario ('max' si no alcanza ninguna)"""
+    cap = MAX_DAYS.get(interval)
+    if cap is not None and days >= cap: return f"{cap}d"
+    for period, span in PERIODS:
+        if days <= span: return period
+    return 'max'
+
+def period_for(interval, bars):
+    return period_for_days(interval, days_needed(interval, bars))
+
+# --- PLAN ---
+def plan(declared):
+    """
+    declared: {tf: (indicadores, keep)}. Devuelve
+    {'fetch': {intervalo: period}, 'derive': {tf: (intervalo base, regla o None si es nativo)}, 'days': {tf: días}}.
+    Se recorre de la temporalidad más fina a la más gruesa; una temporalidad se deriva de la
+    base más gruesa ya planificada cuya ventana la cubre, o se descarga en su intervalo nativo.
+    """
+    order = sorted(declared, key=lambda tf: TIMEFRAMES[tf][2])
+    spans = {tf: span_days(tf, *declared[tf]) for tf in order}
+    days, derive = {}, {}
+    for tf in order:
+        native, rule, minutes = TIMEFRAMES[tf]
+        need = spans[tf]
+        covering = [b for b in days if TIMEFRAMES[b][2] < minutes and days[b] >= need]
+        if native is None and not covering:
+            # Sin intervalo nativo: se amplía la base más fina disponible
+            base = next((b for b in days if TIMEFRAMES[b][2] < minutes), '1h')
+            days[base] = max(days.get(base, 0), need)
+            derive[tf] = (base, rule)
+        elif covering and rule is not None:
+            derive[tf] = (max(covering, key=lambda b: TIMEFRAMES[b][2]), rule)
+        else:
+            days[native] = max(days.get(native, 0), need)
+            derive[tf] = (native, None)
+    fetch = {interval: period_for_days(interval, d) for interval, d in days.items()}
+    return {'fetch': fetch, 'derive': derive, 'days': spans}
+
+def load(tickers, p, key):
+    """{tf: panel} según el plan: una descarga por intervalo base (almacén OHLCV) y el resto por pirámide"""
+    tickers = list(tickers)
+    bases = {interval: panel_from_download(ohlcv_store.download(tickers, interval, period), tickers)
+             for interval, period in p['fetch'].items()}
+    panels = {}
+    for interval, base in bases.items():
+        rules = tuple(rule for b, rule in p['derive'].values() if b == interval and rule)
+        tf = get_pyramid((key, interval, tuple(tickers)), base, rules)['tf'] if rules and len(base['index']) else {}
+        for name, (b, rule) in p['derive'].items():
+            if b == interval: panels[name] = base if rule is None else tf.get(rule)
+    return panels
+
+def describe(p):
+    """Texto corto del plan para la interfaz, p.ej. '1h: 1mo · 1d: 1y'"""
+    return " · ".join(f"{interval}: {period}" for interval, period in p['fetch'].items())
+
+# --- DEMO (python fetch_planner.py) ---
+if __name__ == "__main__":
+    demo = {
+        'HA ADX VOL': {'1h': ([('adx_sma', 14), ('ewm', 14), ('ha_fast',)], 1), '4h': ([('ha_fast',)], 1),
+                       '1d': ([('adx_sma', 14), ('ewm', 14), ('ha_fast',)], 1), '1wk': ([('ha_fast',)], 1)},
+        'Análisis 360': {'1d': ([('sma', 200), ('rolling_diff', 14), ('seasonality', 10)], 1),
+                         '1wk': ([('ha_fast',)], 1), '1mo': ([('ha_fast',)], 1)},
+    }
+    for name, declared in demo.items():
+        p = plan(declared)
+        print(f"{name}: {describe(p)} | derivadas: "
+              f"{ {tf: b for tf, (b, rule) in p['derive'].items() if rule} } | días: {p['days']}")
+    for interval in ('1mo', '1wk', '1d', '1h'):
+        bars = bars_needed([('adx', 14), ('ha',)], keep=200)
+        print(f"ADX 14 + HA con 200 velas útiles, {interval}: {bars} barras -> {period_for(interval, bars)}")
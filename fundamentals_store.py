@@ -0,0 +1,99 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import numpy as np
+import pandas as pd
+import data_provider
+import market_hours
+import provider_guard
+import single_flight
+from ohlcv_store import STORE_DIR, HAS_PARQUET
+
+# --- FOTO DIARIA DE FUNDAMENTALES ---
+# Tabla ticker x campos con solo lo que usa el puntaje fundamental (PEG, P/E, márgenes,
+# crecimiento, precio y precio objetivo). Los .info que faltan o son de otro día se piden
+# en paralelo con un pool de hilos acotado; la tabla se guarda en Parquet y se renueva una
+# vez por día (hora de Nueva York). Puntuar el universo completo es un cruce en memoria.
+
+FIELDS = ('pegRatio', 'forwardPE', 'profitMargins', 'revenueGrowth', 'currentPrice', 'targetMeanPrice')
+SNAPSHOT_PATH = os.path.join(STORE_DIR, "fundamentals.parquet")
+MAX_WORKERS = 8
+
+_TABLE = None
+_LOCK = threading.Lock()
+
+# --- TABLA ---
+def _empty():
+    return pd.DataFrame(columns=list(FIELDS) + ['fetched_at'], dtype=float)
+
+def _read():
+    if not HAS_PARQUET or not os.path.exists(SNAPSHOT_PATH): return _empty()
+    try: return pd.read_parquet(SNAPSHOT_PATH)
+    except Exception: return _empty()
+
+def _write(table):
+    if not HAS_PARQUET: return
+    os.makedirs(os.path.dirname(SNAPSHOT_PATH), exist_ok=True)
+    tmp = SNAPSHOT_PATH + ".tmp"
+    try:
+        table.to_parquet(tmp)
+        os.replace(tmp, SNAPSHOT_PATH)
+    except Exception:
+        if os.path.exists(tmp): os.remove(tmp)
+
+def table():
+    global _TABLE
+    with _LOCK:
+        if _TABLE is None: _TABLE = _read()
+        return _TABLE
+
+def _today_start():
+    return market_hours.now_ny().normalize().timestamp()
+
+# --- CARGA ---
+@single_flight.shared('fundamentals.info')
+def fetch_info(ticker):
+    """Campos de FIELDS desde yf.Ticker(t).info (NaN si falta o no es numérico); None si falla"""
+    try: info = provider_guard.call('yf.info', data_provider.info, ticker)
+    except Exception: return None
+    if not info: return None
+    row = {}
+    for f in FIELDS:
+        v = info.get(f)
+        row[f] = float(v) if isinstance(v, (int, float)) and not isinstance(v, bool) else np.nan
+    return row
+
+def load_snapshot(tickers, max_workers=MAX_WORKERS, on_progress=None):
+    """
+    Asegura una fila del día para cada ticker (pide solo las faltantes o viejas) y devuelve
+    la tabla completa. on_progress(hechos, total) se llama en el hilo que invoca.
+    """
+    global _TABLE
+    tab = table()
+    today = _today_start()
+    fetched = tab['fetched_at'].reindex(list(tickers))
+    stale = [t for t in dict.fromkeys(tickers) if not (fetched.get(t, np.nan) >= today)]
+    if not stale: return tab
+
+    rows, now = {}, time.time()
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(stale))) as pool:
+        futures = {pool.submit(fetch_info, t): t for t in stale}
+        for i, fut in enumerate(as_completed(futures), 1):
+            row = fut.result()
+            if row is not None: rows[futures[fut]] = {**row, 'fetched_at': now}
+            if on_progress: on_progress(i, len(stale))
+
+    if rows:
+        new = pd.DataFrame.from_dict(rows, orient='index')
+        with _LOCK:
+            _TABLE = pd.concat([_TABLE[~_TABLE.index.isin(new.index)], new])
+            _write(_TABLE)
+    return table()
+
+def get(ticker):
+    """Campos del ticker como dict (sin los faltantes, igual que info.get con default); {} si no hay fila"""
+    tab = table()
+    if ticker not in tab.index: return {}
+    row = tab.loc[ticker]
+    return {f: float(row[f]) for f in FIELDS if pd.notna(row[f])}
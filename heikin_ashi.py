@@ -0,0 +1,114 @@
+import time
+import numpy as np
+import pandas as pd
+
+# --- MOTOR HEIKIN ASHI COMPARTIDO ---
+# HA_Open[i] = (HA_Open[i-1] + HA_Close[i-1]) / 2 es un filtro lineal de primer orden:
+# equivale a una EWM con alpha=0.5 (adjust=False) sobre la serie [semilla, HA_Close[:-1]].
+# Pandas resuelve esa recurrencia en C, sin bucle Python, y con el mismo redondeo
+# que el bucle original (0.5*a + 0.5*b == (a + b) / 2 en coma flotante).
+# La EWM salta los NaN arrastrando el último valor; el bucle, en cambio, propagaba el NaN a
+# todas las barras siguientes. Se enmascara igual para no colorear velas con datos viejos.
+
+OHLC_UPPER = ('Open', 'High', 'Low', 'Close')
+OHLC_LOWER = ('open', 'high', 'low', 'close')
+
+def ha_close(o, h, l, c):
+    """HA_Close = promedio OHLC"""
+    return (o + h + l + c) / 4
+
+def ha_open(hc, seed):
+    """
+    HA_Open vectorizado. `hc` puede ser 1-D (barras) o 2-D (tickers x barras).
+    `seed` es el HA_Open de la primera barra (escalar o un valor por ticker).
+    Desde el primer NaN (semilla o HA_Close) el resultado es NaN, como en el bucle original.
+    """
+    hc = np.asarray(hc, dtype=float)
+    if hc.shape[-1] == 0: return hc.copy()
+    seed = np.asarray(seed, dtype=float)
+
+    x = np.empty_like(hc)
+    x[..., 0] = seed
+    x[..., 1:] = hc[..., :-1]
+
+    if x.ndim == 1:
+        out = pd.Series(x).ewm(alpha=0.5, adjust=False).mean().to_numpy()
+    else:
+        # Panel: una columna por ticker, la EWM corre sobre el eje de barras
+        out = pd.DataFrame(x.T).ewm(alpha=0.5, adjust=False).mean().to_numpy().T
+    gap = np.isnan(x)
+    if gap.any(): out = np.where(np.logical_or.accumulate(gap, axis=-1), np.nan, out)
+    return out
+
+def calculate_heikin_ashi(df, seed='open', cols=OHLC_UPPER, wicks=False):
+    """
+    Convierte velas OHLC a Heikin Ashi (HA_Close, HA_Open, Color).
+    seed='open' -> HA_Open inicial = Open[0] (bots, Escáner)
+    seed='mid'  -> HA_Open inicial = (Open[0] + Close[0]) / 2 (matrices)
+    wicks=True agrega HA_High / HA_Low.
+    """
+    c_open, c_high, c_low, c_close = cols
+    df_ha = df.copy()
+    if df.empty: return df_ha
+
+    o = df[c_open].to_numpy(dtype=float)
+    c = df[c_close].to_numpy(dtype=float)
+    hc = ha_close(o, df[c_high].to_numpy(dtype=float), df[c_low].to_numpy(dtype=float), c)
+    first = o[0] if seed == 'open' else (o[0] + c[0]) / 2
+    ho = ha_open(hc, first)
+
+    df_ha['HA_Close'] = hc
+    df_ha['HA_Open'] = ho
+    if wicks:
+        df_ha['HA_High'] = np.fmax(df[c_high].to_numpy(dtype=float), np.fmax(ho, hc))
+        df_ha['HA_Low'] = np.fmin(df[c_low].to_numpy(dtype=float), np.fmin(ho, hc))
+    # 1 Verde, -1 Rojo
+    df_ha['Color'] = np.where(hc > ho, 1, -1)
+    return df_ha
+
+# --- BENCHMARK (python heikin_ashi.py) ---
+def _legacy_heikin_ashi(df):
+    """Versión iterativa original (referencia para validar y medir)"""
+    df_ha = df.copy()
+    df_ha['HA_Close'] = (df['Open'] + df['High'] + df['Low'] + df['Close']) / 4
+    ha_open = [df['Open'].iloc[0]]
+    for i in range(1, len(df)):
+        ha_open.append((ha_open[-1] + df_ha['HA_Close'].iloc[i-1]) / 2)
+    df_ha['HA_Open'] = ha_open
+    df_ha['Color'] = np.where(df_ha['HA_Close'] > df_ha['HA_Open'], 1, -1)
+    return df_ha
+
+def _random_ohlc(n_bars, seed=7):
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, n_bars)))
+    open_ = np.r_[close[0], close[:-1]] * (1 + rng.normal(0, 0.002, n_bars))
+    high = np.maximum(open_, close) * (1 + rng.uniform(0, 0.01, n_bars))
+    low = np.minimum(open_, close) * (1 - rng.uniform(0, 0.01, n_bars))
+    idx = pd.date_range('2000-01-03', periods=n_bars, freq='D')
+    return pd.DataFrame({'Open': open_, 'High': high, 'Low': low, 'Close': close}, index=idx)
+
+def run_benchmark(n_bars=10_000, repeats=3):
+    df = _random_ohlc(n_bars)
+
+    t0 = time.perf_counter()
+    for _ in range(repeats): ref = _legacy_heikin_ashi(df)
+    t_loop = (time.perf_counter() - t0) / repeats
+
+    t0 = time.perf_counter()
+    for _ in range(repeats): new = calculate_heikin_ashi(df)
+    t_vec = (time.perf_counter() - t0) / repeats
+
+    same = np.array_equal(ref['HA_Open'].to_numpy(), new['HA_Open'].to_numpy()) and \
+        np.array_equal(ref['Color'].to_numpy(), new['Color'].to_numpy())
+    # Con un hueco el bucle deja NaN desde la barra siguiente en adelante
+    gap = df.copy(); gap.iloc[n_bars // 2, gap.columns.get_loc('Close')] = np.nan
+    ref, new = _legacy_heikin_ashi(gap), calculate_heikin_ashi(gap)
+    same = same and np.array_equal(ref['HA_Open'].to_numpy(), new['HA_Open'].to_numpy(), equal_nan=True) and \
+        np.array_equal(ref['Color'].to_numpy(), new['Color'].to_numpy())
+
+    print(f"Heikin Ashi {n_bars} barras | bucle: {t_loop*1000:.1f} ms | vectorizado: {t_vec*1000:.2f} ms | "
+          f"x{t_loop / t_vec:.0f} | idéntico: {same}")
+    return t_loop, t_vec, same
+
+if __name__ == "__main__":
+    run_benchmark()
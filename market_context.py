@@ -0,0 +1,50 @@
+import threading
+import time
+import market_hours
+import ohlcv_store
+from seasonality import close_panel
+
+# --- CONTEXTO DE MERCADO (BENCHMARKS + VIX) ---
+# El régimen de cada benchmark regional (precio vs MA50) y el nivel del VIX se calculan
+# una vez por ventana (CONTEXT_TTL con el mercado abierto, hasta la próxima apertura con
+# el mercado cerrado) con una sola descarga para todos, y se comparten entre tickers y
+# sesiones: puntuar un ticker no hace I/O de benchmarks.
+
+BENCHMARKS = {'SPY': "S&P 500", 'ARGT': "ETF Argentina", 'EWZ': "ETF Brasil",
+              'FXI': "ETF China", 'SOXX': "ETF Semis", 'GDX': "ETF Oro"}
+VIX = '^VIX'
+CONTEXT_TTL = 15 * 60
+MA_LEN = 50
+
+_CONTEXT = None
+_LOCK = threading.Lock()
+
+def compute_context(data):
+    """{'bench': {ticker: {'price', 'ma50', 'state'}}, 'vix'} desde una descarga diaria agrupada por ticker"""
+    close = close_panel(data, list(BENCHMARKS) + [VIX])
+    bench = {}
+    for t in BENCHMARKS:
+        s = close[t].dropna() if t in close else None
+        if s is None or s.empty: continue
+        price, ma = float(s.iloc[-1]), float(s.rolling(MA_LEN).mean().iloc[-1])
+        bench[t] = {'price': price, 'ma50': ma, 'state': "BULLISH" if price > ma else "BEARISH"}
+    vix = close[VIX].dropna() if VIX in close else None
+    return {'bench': bench, 'vix': float(vix.iloc[-1]) if vix is not None and not vix.empty else 0.0}
+
+def get_context(refresh=False):
+    """Contexto vigente; lo recalcula (una sola descarga, un solo hilo a la vez) si venció"""
+    global _CONTEXT
+    with _LOCK:
+        if refresh or _CONTEXT is None or not market_hours.is_fresh(_CONTEXT['fetched_at'], CONTEXT_TTL):
+            data = ohlcv_store.download(list(BENCHMARKS) + [VIX], "1d", "6mo")
+            # Sin datos no se guarda: el próximo ticker lo vuelve a intentar
+            if data.empty: return {'bench': {}, 'vix': 0.0, 'fetched_at': time.time()}
+            _CONTEXT = {**compute_context(data), 'fetched_at': time.time()}
+        return _CONTEXT
+
+def benchmark_state(ticker):
+    """{'price', 'ma50', 'state'} del benchmark o None si no hay datos"""
+    return get_context()['bench'].get(ticker)
+
+def vix_level():
+    return get_context()['vix']
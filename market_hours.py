@@ -0,0 +1,117 @@
+from datetime import date, timedelta
+from functools import lru_cache
+import pandas as pd
+
+# --- HORARIO DE MERCADO (NYSE) ---
+# Sesión regular 9:30-16:00 hora de Nueva York, lunes a viernes salvo feriados NYSE.
+# Algunas vísperas (3 de julio, viernes después de Acción de Gracias, 24 de diciembre) cierran 13:00.
+# Sirve para decidir cuánto vive un dato: con el mercado cerrado nada cambia hasta la
+# próxima apertura, así que una foto tomada después del último cierre sigue vigente.
+
+TZ = 'America/New_York'
+OPEN = (9, 30)
+CLOSE = (16, 0)
+EARLY_CLOSE = (13, 0)
+
+# --- CALENDARIO NYSE (reglas, sin dependencias) ---
+def _nth_weekday(year, month, weekday, n):
+    """n-ésimo día `weekday` (0=lunes) del mes; n=-1 es el último"""
+    if n > 0:
+        d = date(year, month, 1)
+        return d + timedelta(days=(weekday - d.weekday()) % 7 + 7 * (n - 1))
+    d = date(year + month // 12, month % 12 + 1, 1) - timedelta(days=1)
+    return d - timedelta(days=(d.weekday() - weekday) % 7)
+
+def _easter(year):
+    """Domingo de Pascua (algoritmo gregoriano anónimo)"""
+    a, b, c = year % 19, year // 100, year % 100
+    d, e = b // 4, b % 4
+    g = (8 * b + 13) // 25
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = c // 4, c % 4
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 19 * l) // 433
+    month = (h + l - 7 * m + 90) // 25
+    return date(year, month, (h + l - 7 * m + 33 * month + 19) % 32)
+
+def _observed(d):
+    """Feriado fijo que cae sábado se toma el viernes; domingo, el lunes"""
+    if d.weekday() == 5: return d - timedelta(days=1)
+    if d.weekday() == 6: return d + timedelta(days=1)
+    return d
+
+@lru_cache(maxsize=None)
+def holidays(year):
+    """Feriados NYSE del año (días hábiles sin sesión)"""
+    new_year = date(year, 1, 1)
+    days = {
+        new_year + timedelta(days=1) if new_year.weekday() == 6 else new_year,  # sábado: no se corre al 31/12
+        _nth_weekday(year, 1, 0, 3),     # Martin Luther King
+        _nth_weekday(year, 2, 0, 3),     # Washington
+        _easter(year) - timedelta(days=2),  # Viernes Santo
+        _nth_weekday(year, 5, 0, -1),    # Memorial Day
+        _observed(date(year, 7, 4)),
+        _nth_weekday(year, 9, 0, 1),     # Labor Day
+        _nth_weekday(year, 11, 3, 4),    # Acción de Gracias
+        _observed(date(year, 12, 25)),
+    }
+    if year >= 2022: days.add(_observed(date(year, 6, 19)))  # Juneteenth
+    return frozenset(d for d in days if d.weekday() < 5)
+
+@lru_cache(maxsize=None)
+def early_closes(year):
+    """Sesiones que cierran a las 13:00"""
+    days = {_nth_weekday(year, 11, 3, 4) + timedelta(days=1), date(year, 7, 3), date(year, 12, 24)}
+    # 3/7 y 24/12 solo de lunes a jueves (un viernes es el feriado observado o no hay víspera)
+    return frozenset(d for d in days if d.weekday() < 4 or d.month == 11)
+
+def now_ny(now=None):
+    if now is None: return pd.Timestamp.now(tz=TZ)
+    now = pd.Timestamp(now)
+    return now.tz_localize(TZ) if now.tzinfo is None else now.tz_convert(TZ)
+
+def is_trading_day(day):
+    return day.weekday() < 5 and pd.Timestamp(day).date() not in holidays(day.year)
+
+def _at(day, hm):
+    return day.normalize() + pd.Timedelta(hours=hm[0], minutes=hm[1])
+
+def session_close(day):
+    """Hora de cierre de la sesión de `day` (13:00 en las vísperas)"""
+    return _at(day, EARLY_CLOSE if pd.Timestamp(day).date() in early_closes(day.year) else CLOSE)
+
+def is_open(now=None):
+    now = now_ny(now)
+    return is_trading_day(now) and _at(now, OPEN) <= now < session_close(now)
+
+def last_close(now=None):
+    """Último cierre de sesión regular <= now"""
+    now = now_ny(now)
+    day = now.normalize()
+    while not is_trading_day(day) or session_close(day) > now:
+        day -= pd.Timedelta(days=1)
+    return session_close(day)
+
+def next_trading_day(day):
+    """Primer día hábil después de `day` (medianoche NY)"""
+    day = now_ny(day).normalize() + pd.DateOffset(days=1)
+    while not is_trading_day(day): day += pd.DateOffset(days=1)
+    return day
+
+def next_open(now=None):
+    """Próxima apertura de sesión regular > now"""
+    now = now_ny(now)
+    day = now.normalize()
+    while not is_trading_day(day) or _at(day, OPEN) <= now:
+        day += pd.Timedelta(days=1)
+    return _at(day, OPEN)
+
+def is_fresh(fetched_at, ttl_open, now=None):
+    """
+    ¿Sigue vigente un dato tomado en `fetched_at` (epoch s)?
+    Mercado abierto: vale `ttl_open` segundos. Cerrado: vale si se tomó después del último cierre.
+    """
+    now = now_ny(now)
+    age = now.timestamp() - fetched_at
+    if age < ttl_open: return True
+    return not is_open(now) and fetched_at >= last_close(now).timestamp()
@@ -0,0 +1,88 @@
+import threading
+import time
+import numpy as np
+import ohlcv_store
+from bar_pyramid import get_pyramid, frame
+from panel_indicators import panel_from_download
+
+# --- MATRIZ MULTI-TEMPORALIDAD CON REFRESCO DELTA ---
+# Las series horarias y diarias del universo viven en el almacén OHLCV (disco), que solo
+# pide a la red las barras posteriores a la última guardada. En memoria quedan las
+# pirámides (4H / W / M, extendidas con las barras nuevas) y el último resultado de cada
+# (ticker, temporalidad) junto con la firma de sus velas: primera y última barra válidas.
+# En cada refresco solo se re-evalúan las temporalidades cuya firma cambió (última vela
+# nueva o modificada, o ventana corrida); el resto reutiliza el resultado anterior.
+
+SOURCES = {'1h': '1mo', '1d': '2y'}  # intervalo base -> ventana
+TIMEFRAMES = {'1H': ('1h', None), '4H': ('1h', '4h'),
+              'Diario': ('1d', None), 'Semanal': ('1d', 'W'), 'Mensual': ('1d', 'ME')}
+
+_STATE = {}  # key -> {(ticker, temporalidad): (firma, resultado)}
+_LOCK = threading.Lock()
+
+def signatures(panel):
+    """Firma por ticker: (n barras válidas, primera y última etiqueta, OHLC de la última) o None sin datos"""
+    fields = [f for f in ('Open', 'High', 'Low', 'Close') if f in panel]
+    valid = np.ones(panel[fields[0]].shape, dtype=bool)
+    for f in fields: valid &= np.isfinite(panel[f])
+    n_bars = valid.shape[1]
+    out = []
+    for i, row in enumerate(valid):
+        n = int(row.sum())
+        if n == 0:
+            out.append(None); continue
+        first, last = int(row.argmax()), n_bars - 1 - int(row[::-1].argmax())
+        out.append((n, panel['index'][first], panel['index'][last],
+                    tuple(float(panel[f][i, last]) for f in fields)))
+    return out
+
+def load_panels(key, tickers):
+    """{temporalidad: panel}. Base desde el almacén (delta), mayores desde la pirámide en caché"""
+    panels = {}
+    for interval, period in SOURCES.items():
+        base = panel_from_download(ohlcv_store.download(tickers, interval, period), tickers)
+        rules = tuple(rule for src, rule in TIMEFRAMES.values() if src == interval and rule)
+        tf = get_pyramid((key, interval, tuple(tickers)), base, rules)['tf'] if len(base['index']) else {}
+        for name, (src, rule) in TIMEFRAMES.items():
+            if src != interval: continue
+            panels[name] = base if rule is None else tf.get(rule)
+    return panels
+
+def refresh(key, tickers, evaluate, on_progress=None):
+    """
+    Evalúa la matriz. evaluate(temporalidad, df) -> dict de columnas de la fila, y se llama
+    solo para las (ticker, temporalidad) cuya firma cambió desde el refresco anterior.
+    Devuelve (filas en el orden de `tickers`, stats {'evaluated', 'reused', 'load_s'}).
+    """
+    tickers = list(tickers)
+    t0 = time.perf_counter()
+    panels = load_panels(key, tickers)
+    load_s = time.perf_counter() - t0
+
+    with _LOCK: cache = dict(_STATE.get(key, {}))
+    sigs = {name: signatures(p) if p is not None and len(p['index']) else [None] * len(tickers)
+            for name, p in panels.items()}
+    rows, evaluated, reused = [], 0, 0
+    for i, t in enumerate(tickers):
+        row = {'Activo': t}
+        for name in TIMEFRAMES:
+            sig = sigs[name][i]
+            hit = cache.get((t, name))
+            if sig is None:
+                res = evaluate(name, None)
+            elif hit is not None and hit[0] == sig:
+                res = hit[1]; reused += 1
+            else:
+                res = evaluate(name, frame(panels[name], t))
+                cache[(t, name)] = (sig, res); evaluated += 1
+            row.update(res)
+        rows.append(row)
+        if on_progress: on_progress(i + 1, len(tickers))
+
+    with _LOCK: _STATE[key] = cache
+    return rows, {'evaluated': evaluated, 'reused': reused, 'load_s': load_s}
+
+def clear(key=None):
+    with _LOCK:
+        if key is None: _STATE.clear()
+        else: _STATE.pop(key, None)
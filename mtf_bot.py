@@ -1,10 +1,10 @@
 import os
-import yfinance as yf
-import pandas as pd
-import numpy as np
-import requests
-import time
+import data_provider
 from datetime import datetime
+from panel_indicators import panel_from_frame, pack_panel, with_indicators, signal_state, ticker_bars
+from bot_runner import load_panels, send_telegram, print_provider_report
+from ohlcv_store import STORE_DIR
+from streaming_indicators import scan_incremental
 
 # --- CREDENCIALES ---
 TELEGRAM_TOKEN = os.environ.get("TELEGRAM_TOKEN")
@@ -19,6 +19,11 @@ TIMEFRAMES = [
 
 ADX_LEN = 14
 ADX_TH = 20
+MIN_BARS = 50
+
+# Estado ADX + HA + posición por (ticker, temporalidad): cada corrida procesa solo las velas nuevas
+# (si la ventana de 10y corrió su inicio, esa serie se recorre de nuevo: mismo resultado que recalcular)
+CHECKPOINT = os.path.join(STORE_DIR, "checkpoints", f"mtf_bot_adx{ADX_LEN}_th{ADX_TH}.json")
 
 # --- BASE DE DATOS COMPLETA ---
 # --- BASE DE DATOS COMPLETA (Actualizada) ---
@@ -42,103 +47,65 @@ TICKERS = sorted([
 
 def send_message(msg):
     if not TELEGRAM_TOKEN or not CHAT_ID: return
-    try:
-        url = f"https://api.telegram.org/bot{TELEGRAM_TOKEN}/sendMessage"
-        requests.post(url, data={"chat_id": CHAT_ID, "text": msg, "parse_mode": "Markdown"})
-    except: pass
-
-# --- CÁLCULOS MATEMÁTICOS NATIVOS ---
-def calculate_heikin_ashi(df):
-    df_ha = df.copy()
-    df_ha['HA_Close'] = (df['Open'] + df['High'] + df['Low'] + df['Close']) / 4
-    
-    ha_open = [df['Open'].iloc[0]]
-    for i in range(1, len(df)):
-        ha_open.append((ha_open[-1] + df_ha['HA_Close'].iloc[i-1]) / 2)
-    df_ha['HA_Open'] = ha_open
-    
-    df_ha['Color'] = np.where(df_ha['HA_Close'] > df_ha['HA_Open'], 1, -1)
-    return df_ha
-
-def calculate_adx(df, period=14):
-    df = df.copy()
-    df['H-L'] = df['High'] - df['Low']
-    df['H-C'] = abs(df['High'] - df['Close'].shift(1))
-    df['L-C'] = abs(df['Low'] - df['Close'].shift(1))
-    df['TR'] = df[['H-L', 'H-C', 'L-C']].max(axis=1)
-    
-    df['UpMove'] = df['High'] - df['High'].shift(1)
-    df['DownMove'] = df['Low'].shift(1) - df['Low']
-    
-    df['+DM'] = np.where((df['UpMove'] > df['DownMove']) & (df['UpMove'] > 0), df['UpMove'], 0)
-    df['-DM'] = np.where((df['DownMove'] > df['UpMove']) & (df['DownMove'] > 0), df['DownMove'], 0)
-    
-    def wilder(x, period): return x.ewm(alpha=1/period, adjust=False).mean()
-
-    tr_s = wilder(df['TR'], period).replace(0, 1)
-    p_dm_s = wilder(df['+DM'], period)
-    n_dm_s = wilder(df['-DM'], period)
-    
-    p_di = 100 * (p_dm_s / tr_s)
-    n_di = 100 * (n_dm_s / tr_s)
-    dx = 100 * abs(p_di - n_di) / (p_di + n_di)
-    return wilder(dx, period)
+    send_telegram(TELEGRAM_TOKEN, CHAT_ID, msg)
 
 # --- MOTOR DE BÚSQUEDA ---
-def get_last_signal(df, adx_th):
-    df['ADX'] = calculate_adx(df)
-    df_ha = calculate_heikin_ashi(df)
-    
-    last_signal = None
-    in_position = False
-    
-    # Recorrido histórico para encontrar la última señal real
-    for i in range(1, len(df_ha)):
-        color = df_ha['Color'].iloc[i]
-        adx = df['ADX'].iloc[i]
-        date = df_ha.index[i]
-        price = df_ha['Close'].iloc[i]
-        
-        # COMPRA
-        if not in_position and color == 1 and adx > adx_th:
-            in_position = True
-            last_signal = {"Tipo": "🟢 COMPRA", "Fecha": date, "Precio": price, "ADX": adx}
-        # VENTA
-        elif in_position and color == -1:
-            in_position = False
-            last_signal = {"Tipo": "🔴 VENTA", "Fecha": date, "Precio": price, "ADX": adx}
-            
-    return last_signal
-
-def run_bot():
-    print(f"--- START MTF SCAN: {datetime.now()} ---")
-    all_signals = []
+def get_last_signals(p, adx_th, min_bars=MIN_BARS):
+    """
+    Última señal de cada ticker de un panel compactado (pack_panel), sin bucle por barra.
+    Devuelve una lista alineada con p['tickers'] (None si no hay señal o faltan barras).
+    """
+    with_indicators(p, ADX_LEN)
+    adx = p['ADX']
+    res = signal_state(p['HA_Color'], adx, adx_th, p['n_valid'])
+
+    out = []
+    for i, last in enumerate(res['last_idx']):
+        if p['n_valid'][i] < min_bars or last < 0:
+            out.append(None); continue
+        out.append({
+            "Tipo": "🟢 COMPRA" if res['events'][i, last] > 0 else "🔴 VENTA",
+            "Fecha": p['index'][p['pos'][i, last]],
+            "Precio": p['Close'][i, last],
+            "ADX": adx[i, last]
+        })
+    return out
 
+def get_last_signal(df, adx_th):
+    return get_last_signals(pack_panel(panel_from_frame(df)), adx_th, min_bars=0)[0]
+
+def collect_signals(panels, checkpoint=CHECKPOINT):
+    """
+    panels: {(interval, period): panel compactado}. Última señal de cada ticker y temporalidad.
+    El estado se retoma del checkpoint (ver streaming_indicators.py): solo se recorren las
+    velas posteriores a la última consolidada; la vela en curso se aplica sin consolidar.
+    """
+    frames, labels = {}, {}
     for interval, label, period in TIMEFRAMES:
         print(f"Procesando {label}...")
+        labels[interval] = label
         try:
-            data = yf.download(TICKERS, interval=interval, period=period, group_by='ticker', progress=False, auto_adjust=True)
-            for ticker in TICKERS:
-                try:
-                    df = data[ticker].dropna() if len(TICKERS)>1 else data.dropna()
-                    if df.empty or len(df)<50: continue
-                    if isinstance(df.columns, pd.MultiIndex): df.columns = df.columns.get_level_values(0)
-
-                    sig = get_last_signal(df, ADX_TH)
-                    
-                    if sig:
-                        all_signals.append({
-                            "Ticker": ticker,
-                            "TF": label,
-                            "Tipo": sig['Tipo'],
-                            "Precio": sig['Precio'],
-                            "ADX": sig['ADX'],
-                            "Fecha": sig['Fecha'],
-                            "Fecha_Str": sig['Fecha'].strftime('%d-%m-%Y')
-                        })
-                except: pass
-        except: pass
+            p = panels[(interval, period)]
+            for i, ticker in enumerate(p['tickers']):
+                if ticker in TICKERS: frames[(ticker, interval)] = ticker_bars(p, i)
+        except Exception as e: print(f"[{label}] Error: {e}")
 
+    all_signals = []
+    for (ticker, interval), s in scan_incremental(frames, checkpoint, ADX_TH, ADX_LEN).items():
+        sig = s['last_signal']
+        if not sig or s['bars'] < MIN_BARS: continue
+        all_signals.append({
+            "Ticker": ticker,
+            "TF": labels[interval],
+            "Tipo": sig['Tipo'],
+            "Precio": sig['Precio'],
+            "ADX": sig['ADX'],
+            "Fecha": sig['Fecha'],
+            "Fecha_Str": sig['Fecha'].strftime('%d-%m-%Y')
+        })
+    return all_signals
+
+def send_signals(all_signals):
     # --- ENVÍO DE RESULTADOS ---
     if not all_signals:
         send_message("🤖 MTF: Sin señales detectadas.")
@@ -149,7 +116,7 @@ def run_bot():
     
     # Cabecera
     send_message(f"📊 **REPORTE MENSUAL Y SEMANAL**\nEnviando las últimas señales de {len(TICKERS)} activos...")
-    time.sleep(1)
+    data_provider.pause(1)
 
     # Enviar TODAS las señales (Sin límites)
     for s in all_signals:
@@ -163,9 +130,18 @@ def run_bot():
         )
         send_message(msg)
         # Pausa leve para que Telegram no bloquee por spam (flood limit)
-        time.sleep(0.3)
+        data_provider.pause(0.3)
 
     send_message("✅ Fin del reporte.")
 
+def run_plugin(panels):
+    """Reporte de últimas señales sobre paneles ya cargados (ver bot_runner.py)"""
+    send_signals(collect_signals(panels))
+
+def run_bot():
+    print(f"--- START MTF SCAN: {datetime.now()} ---")
+    run_plugin(load_panels(TICKERS, TIMEFRAMES))
+    print_provider_report()
+
 if __name__ == "__main__":
     run_bot()
@@ -0,0 +1,278 @@
+import os
+import re
+import threading
+import time
+import numpy as np
+import pandas as pd
+import data_provider
+import provider_guard
+import single_flight
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    HAS_PARQUET = True
+except ImportError:
+    HAS_PARQUET = False
+
+# --- ALMACÉN OHLCV LOCAL (PARQUET) ---
+# Un archivo Parquet por fuente/intervalo/ticker:  <STORE_DIR>/<fuente>/<intervalo>/<ticker>.parquet
+# Cada lectura pide a la red solo las barras posteriores a la última guardada, más un
+# solapamiento de OVERLAP_BARS barras que re-valida la última vela (que podía estar abierta).
+# Si las barras cerradas del solapamiento no coinciden (dividendo/split con auto_adjust),
+# ese ticker se vuelve a bajar completo. Cada archivo guarda en sus metadatos desde qué fecha
+# cubre la historia ('covered_from'): si después se pide un `period` más largo que lo guardado
+# (6mo y luego 10y), ese ticker se baja completo con el period nuevo en vez de solo la cola.
+# Sin pyarrow el almacén queda desactivado y todo va directo a la red, como antes.
+
+STORE_DIR = os.environ.get("OHLCV_STORE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".ohlcv_store"))
+OVERLAP_BARS = 3
+CCXT_MAX_ROWS = 5000
+CCXT_COLS = ['time', 'open', 'high', 'low', 'close', 'vol']
+COVERED_KEY = b'covered_from'
+
+# --- ARCHIVOS ---
+def _safe(name):
+    return re.sub(r'[^A-Za-z0-9._^=-]', '_', name)
+
+def store_path(source, interval, key):
+    # '1M' (mes) y '1m' (minuto) no pueden compartir carpeta en discos sin mayúsculas
+    folder = interval[:-1] + 'month' if interval.endswith('M') else interval
+    return os.path.join(STORE_DIR, source, _safe(folder), _safe(key) + ".parquet")
+
+def read(source, interval, key):
+    """Lee la serie guardada (memory-map del archivo); None si no existe o está dañada"""
+    path = store_path(source, interval, key)
+    if not HAS_PARQUET or not os.path.exists(path): return None
+    try: return pd.read_parquet(path, memory_map=True)
+    except Exception: return None
+
+def covered_from(source, interval, key, df=None):
+    """Desde cuándo cubre la historia guardada: 'max', 'YYYY-MM-DD' o None si no hay archivo.
+    Archivos sin el metadato cuentan desde su primera barra"""
+    path = store_path(source, interval, key)
+    if not HAS_PARQUET or not os.path.exists(path): return None
+    try: meta = pq.read_schema(path).metadata or {}
+    except Exception: meta = {}
+    if COVERED_KEY in meta: return meta[COVERED_KEY].decode()
+    if df is None or df.empty: return None
+    first = pd.Timestamp(df.index[0])
+    return (first.tz_localize(None) if first.tzinfo is not None else first).strftime('%Y-%m-%d')
+
+def write(source, interval, key, df, covered=None):
+    if not HAS_PARQUET or df is None or df.empty: return
+    path = store_path(source, interval, key)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Temporal propio por proceso e hilo: dos sesiones pueden escribir el mismo ticker a la vez
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        table = pa.Table.from_pandas(df)
+        if covered is not None:
+            table = table.replace_schema_metadata({**(table.schema.metadata or {}), COVERED_KEY: covered.encode()})
+        pq.write_table(table, tmp)
+        os.replace(tmp, path)
+    except Exception:
+        if os.path.exists(tmp): os.remove(tmp)
+
+# --- VENTANAS (period de yfinance) ---
+def period_start(period, now=None):
+    """Inicio de la ventana `period` ('10y', '6mo', '5d', 'ytd', 'max' -> None)"""
+    if period in (None, 'max'): return None
+    now = (now or pd.Timestamp.now()).normalize()
+    if period == 'ytd': return now.replace(month=1, day=1)
+    m = re.fullmatch(r'(\d+)(d|wk|mo|y)', period)
+    if not m: return None
+    n, unit = int(m.group(1)), m.group(2)
+    offset = {'d': pd.DateOffset(days=n), 'wk': pd.DateOffset(weeks=n),
+              'mo': pd.DateOffset(months=n), 'y': pd.DateOffset(years=n)}[unit]
+    return now - offset
+
+def _covers(covered, start):
+    """¿La historia guardada desde `covered` alcanza una ventana que empieza en `start` (None = max)?"""
+    if covered is None: return False
+    if covered == 'max': return True
+    return start is not None and pd.Timestamp(covered) <= start
+
+def _trim(df, period):
+    start = period_start(period)
+    if start is None or df.empty: return df
+    if df.index.tz is not None: start = start.tz_localize(df.index.tz)
+    return df[df.index >= start]
+
+def _merge(old, new, key='Close'):
+    """Une guardado + nuevo. None si el solapamiento cerrado no coincide (historia ajustada)"""
+    if new is None or new.empty: return old
+    try:
+        common = old.index.intersection(new.index)
+        closed = common[common < old.index[-1]]
+        if len(closed) and not np.allclose(old.loc[closed, key].to_numpy(dtype=float),
+                                           new.loc[closed, key].to_numpy(dtype=float), rtol=1e-6, equal_nan=True):
+            return None
+        return pd.concat([old[old.index < new.index[0]], new])
+    except (TypeError, ValueError):  # p.ej. índice con otra zona horaria
+        return None
+
+# --- YFINANCE ---
+def has_rows(data):
+    return data is not None and not data.empty
+
+def rows_check(tickers):
+    """
+    validate para yf.download. yfinance no lanza si Yahoo falla, devuelve vacío: un lote de
+    varios tickers vacío cuenta como falla del endpoint; un solo ticker vacío es un símbolo
+    inválido o deslistado (EmptyResult, fatal: no se reintenta ni abre el circuito)
+    """
+    single = isinstance(tickers, str) or len(tickers) == 1
+    def check(data):
+        if has_rows(data): return True
+        if single: raise provider_guard.EmptyResult(f"sin filas para {tickers}")
+        return False
+    return check
+
+def yf_download(tickers, **kw):
+    """yf.download(tickers, **kw) con deadline / reintentos / circuito de 'yf.download'. Vacío si falla"""
+    try: return provider_guard.call('yf.download', data_provider.download, tickers, validate=rows_check(tickers), **kw)
+    except Exception: return pd.DataFrame()
+
+def yf_history(ticker, **kw):
+    """yf.Ticker(ticker).history(**kw) con deadline / reintentos / circuito de 'yf.history'. Vacío si falla"""
+    try: return provider_guard.call('yf.history', data_provider.history, ticker, validate=rows_check(ticker), **kw)
+    except Exception: return pd.DataFrame()
+
+def _yf(tickers, interval, **kw):
+    return yf_download(tickers, interval=interval, group_by='ticker', progress=False, auto_adjust=True, **kw)
+
+def _split(data, tickers):
+    """Resultado de yf.download -> {ticker: DataFrame} sin filas vacías"""
+    out = {}
+    if data is None or data.empty: return out
+    multi = isinstance(data.columns, pd.MultiIndex)
+    top = set(data.columns.get_level_values(0)) if multi else set()
+    for t in tickers:
+        if multi and t in top: df = data[t]
+        elif not multi and len(tickers) == 1: df = data
+        else: continue
+        df = df.dropna(how='all')
+        if not df.empty: out[t] = df
+    return out
+
+@single_flight.shared('ohlcv.download')
+def download(tickers, interval, period):
+    """
+    Igual que yf.download(tickers, interval, period, group_by='ticker', auto_adjust=True),
+    pero bajando solo la cola de cada ticker que ya está en el almacén.
+    """
+    tickers = list(tickers)
+    if not HAS_PARQUET:
+        return _yf(tickers, interval, period=period)
+
+    start = period_start(period)
+    stored = {t: read('yf', interval, t) for t in tickers}
+    covered = {t: covered_from('yf', interval, t, stored[t]) for t in tickers if stored[t] is not None}
+    # Sin historia, muy corta o que no llega al inicio del period pedido: se baja completo
+    fresh = [t for t in tickers if stored[t] is None or len(stored[t]) <= OVERLAP_BARS or not _covers(covered[t], start)]
+    known = [t for t in tickers if t not in fresh]
+    frames = {}
+
+    if known:
+        # Un solo lote desde la barra de solapamiento más antigua
+        since = min(stored[t].index[-OVERLAP_BARS] for t in known)
+        new = _split(_yf(known, interval, start=since.strftime('%Y-%m-%d')), known)
+        for t in known:
+            merged = _merge(stored[t], new.get(t))
+            if merged is None: fresh.append(t)
+            else: frames[t] = merged
+
+    if fresh:
+        full = _split(_yf(fresh, interval, period=period), fresh)
+        frames.update(full)
+        for t in full: covered[t] = 'max' if start is None else start.strftime('%Y-%m-%d')
+        # Si la bajada completa falla, mejor la historia guardada (más corta) que nada
+        for t in fresh:
+            if t not in full and stored[t] is not None: frames[t] = stored[t]
+
+    for t, df in frames.items():
+        if stored.get(t) is None or len(df) != len(stored[t]) or not df.tail(OVERLAP_BARS).equals(stored[t].tail(OVERLAP_BARS)):
+            write('yf', interval, t, df, covered=covered.get(t))
+
+    out = {t: _trim(frames[t], period) for t in tickers if t in frames}
+    return pd.concat(out, axis=1) if out else pd.DataFrame()
+
+def history(ticker, interval, period):
+    """Serie de un solo ticker (reemplazo de yf.Ticker(t).history(...) para OHLCV)"""
+    data = download([ticker], interval, period)
+    return data[ticker].dropna(how='all') if not data.empty else data
+
+# --- CCXT ---
+def _ccxt_key(exchange, symbol):
+    return f"{exchange.id}_{symbol}"
+
+def _ccxt_frame(rows):
+    return pd.DataFrame(rows, columns=CCXT_COLS).set_index('time', drop=False)
+
+def _ccxt_since(exchange, old, timeframe, limit):
+    """Vela desde la que pedir el delta y cuántas, o (None, limit) para la ventana completa"""
+    # Con menos velas guardadas que las pedidas (antes se pidió un limit menor) va la ventana completa
+    if old is None or len(old) <= OVERLAP_BARS or len(old) < limit: return None, limit
+    since = int(old['time'].iloc[-OVERLAP_BARS])
+    gap = (exchange.milliseconds() - since) // (exchange.parse_timeframe(timeframe) * 1000) + 1
+    # si falta más de `limit`, es más barato pedir la ventana completa
+    return (since, int(gap) + 1) if gap < limit else (None, limit)
+
+def _ccxt_save(exchange, symbol, timeframe, limit, df):
+    df = df.tail(CCXT_MAX_ROWS)
+    write('ccxt', timeframe, _ccxt_key(exchange, symbol), df.reset_index(drop=True))
+    return df[CCXT_COLS].tail(limit).astype(object).values.tolist()
+
+@single_flight.shared('ohlcv.ccxt')
+def fetch_ohlcv(exchange, symbol, timeframe, limit):
+    """
+    Igual que exchange.fetch_ohlcv(symbol, timeframe, limit=limit): lista [ts, o, h, l, c, v].
+    Con almacén, solo se piden las velas desde la última guardada (menos el solapamiento).
+    """
+    def get(**kw):
+        return provider_guard.call('ccxt.ohlcv', data_provider.exchange_call, exchange, 'fetch_ohlcv', symbol,
+                                   timeframe=timeframe, fatal=provider_guard.ccxt_fatal, **kw)
+
+    if not HAS_PARQUET:
+        return get(limit=limit)
+
+    old = read('ccxt', timeframe, _ccxt_key(exchange, symbol))
+    since, n = _ccxt_since(exchange, old, timeframe, limit)
+    df = None
+    if since is not None:
+        df = _merge(old.set_index('time', drop=False), _ccxt_frame(get(since=since, limit=n)), key='close')
+    if df is None:
+        df = _ccxt_frame(get(limit=limit))
+    return _ccxt_save(exchange, symbol, timeframe, limit, df)
+
+async def fetch_ohlcv_async(exchange, symbol, timeframe, limit, throttle=None):
+    """Versión para ccxt.async_support. `throttle`: corrutina que se espera antes de cada pedido"""
+    async def attempt(**kw):
+        if throttle: await throttle()
+        return await data_provider.exchange_call_async(exchange, 'fetch_ohlcv', symbol, timeframe=timeframe, **kw)
+
+    async def get(**kw):
+        return await provider_guard.call_async('ccxt.ohlcv', lambda: attempt(**kw), fatal=provider_guard.ccxt_fatal)
+
+    if not HAS_PARQUET:
+        return await get(limit=limit)
+
+    old = read('ccxt', timeframe, _ccxt_key(exchange, symbol))
+    since, n = _ccxt_since(exchange, old, timeframe, limit)
+    df = None
+    if since is not None:
+        df = _merge(old.set_index('time', drop=False), _ccxt_frame(await get(since=since, limit=n)), key='close')
+    if df is None:
+        df = _ccxt_frame(await get(limit=limit))
+    return _ccxt_save(exchange, symbol, timeframe, limit, df)
+
+# --- BENCHMARK (python ohlcv_store.py) ---
+def run_benchmark(tickers=('SPY', 'QQQ', 'AAPL', 'MSFT'), interval='1wk', period='10y'):
+    t0 = time.perf_counter(); first = download(tickers, interval, period); t_first = time.perf_counter() - t0
+    t0 = time.perf_counter(); again = download(tickers, interval, period); t_again = time.perf_counter() - t0
+    print(f"Almacén OHLCV {len(tickers)} tickers {interval}/{period} | parquet: {HAS_PARQUET} | "
+          f"primera: {t_first:.2f} s ({len(first)} barras) | repetida: {t_again:.2f} s ({len(again)} barras)")
+
+if __name__ == "__main__":
+    run_benchmark()
@@ -0,0 +1,119 @@
+import json
+import os
+import re
+import threading
+import time
+import numpy as np
+import pandas as pd
+import data_provider
+import market_hours
+import provider_guard
+import single_flight
+from ohlcv_store import STORE_DIR
+
+# --- FOTOS DE CADENAS DE OPCIONES (DISCO + MEMORIA) ---
+# Cada cadena (ticker, vencimiento) se guarda como arrays columnares en un .npz:
+#   <STORE_DIR>/options/<ticker>/<vencimiento>.npz  (calls_<col>, puts_<col>, fetched_at)
+# junto con la lista de vencimientos del ticker (expirations.json). La vigencia depende del
+# horario de mercado (ver market_hours.py): CHAIN_TTL con el mercado abierto, hasta la
+# próxima apertura con el mercado cerrado. Todas las páginas leen de acá, así que escanear
+# el mismo lote en otra página no vuelve a la red.
+
+OPTIONS_DIR = os.path.join(STORE_DIR, "options")
+CHAIN_TTL = 15 * 60
+CHAIN_COLS = ('strike', 'openInterest', 'volume', 'impliedVolatility', 'lastPrice', 'bid', 'ask')
+
+_MEM = {}
+_LOCK = threading.Lock()
+
+# --- ARCHIVOS ---
+def _dir(ticker):
+    return os.path.join(OPTIONS_DIR, re.sub(r'[^A-Za-z0-9._^=-]', '_', ticker))
+
+def _chain_path(ticker, expiry):
+    return os.path.join(_dir(ticker), f"{expiry}.npz")
+
+def _exps_path(ticker):
+    return os.path.join(_dir(ticker), "expirations.json")
+
+def _replace(tmp, path):
+    try: os.replace(tmp, path)
+    except OSError:
+        if os.path.exists(tmp): os.remove(tmp)
+
+def _columns(df):
+    return {c: (df[c].to_numpy(dtype=float) if c in df else np.full(len(df), np.nan)) for c in CHAIN_COLS}
+
+def write_chain(ticker, expiry, calls, puts, fetched_at):
+    os.makedirs(_dir(ticker), exist_ok=True)
+    arrays = {f"calls_{c}": v for c, v in _columns(calls).items()}
+    arrays.update({f"puts_{c}": v for c, v in _columns(puts).items()})
+    tmp = _chain_path(ticker, expiry) + ".tmp.npz"
+    np.savez_compressed(tmp, fetched_at=np.float64(fetched_at), **arrays)
+    _replace(tmp, _chain_path(ticker, expiry))
+
+def read_chain(ticker, expiry):
+    """(fetched_at, calls, puts) guardados o None"""
+    path = _chain_path(ticker, expiry)
+    if not os.path.exists(path): return None
+    try:
+        with np.load(path) as z:
+            calls = pd.DataFrame({c: z[f"calls_{c}"] for c in CHAIN_COLS})
+            puts = pd.DataFrame({c: z[f"puts_{c}"] for c in CHAIN_COLS})
+            return float(z['fetched_at']), calls, puts
+    except (OSError, ValueError, KeyError):
+        return None
+
+# --- CONSULTAS ---
+def _cached(key, load, fetch):
+    """Memoria -> disco -> red, con la vigencia de market_hours"""
+    with _LOCK: hit = _MEM.get(key)
+    if hit is None:
+        hit = load()
+    if hit is None or not market_hours.is_fresh(hit[0], CHAIN_TTL):
+        hit = single_flight.do(key, fetch)
+    with _LOCK: _MEM[key] = hit
+    return hit
+
+def expirations(ticker):
+    """Vencimientos del ticker (como tk.options); tupla vacía si no tiene opciones"""
+    def load():
+        try:
+            with open(_exps_path(ticker)) as f: d = json.load(f)
+            return d['fetched_at'], tuple(d['expirations'])
+        except (OSError, ValueError, KeyError): return None
+
+    def fetch():
+        exps = provider_guard.call('yf.options', data_provider.option_expirations, ticker)
+        now = time.time()
+        os.makedirs(_dir(ticker), exist_ok=True)
+        tmp = _exps_path(ticker) + ".tmp"
+        with open(tmp, 'w') as f: json.dump({'fetched_at': now, 'expirations': list(exps)}, f)
+        _replace(tmp, _exps_path(ticker))
+        return now, exps
+
+    return _cached(('options.exps', ticker), load, fetch)[1]
+
+def get_chain(ticker, expiry):
+    """(calls, puts) del vencimiento como DataFrames con CHAIN_COLS"""
+    def fetch():
+        calls, puts = provider_guard.call('yf.options', data_provider.option_chain, ticker, expiry)
+        now = time.time()
+        write_chain(ticker, expiry, calls, puts, now)
+        return now, pd.DataFrame(_columns(calls)), pd.DataFrame(_columns(puts))
+
+    _, calls, puts = _cached(('options.chain', ticker, expiry), lambda: read_chain(ticker, expiry), fetch)
+    return calls.copy(), puts.copy()
+
+def nearest_chain(ticker):
+    """(calls, puts, vencimiento) del vencimiento más próximo, o None sin opciones / con error"""
+    try:
+        exps = expirations(ticker)
+        if not exps: return None
+        calls, puts = get_chain(ticker, exps[0])
+        return calls, puts, exps[0]
+    except Exception:
+        return None
+
+def clear_memory():
+    with _LOCK: _MEM.clear()
@@ -0,0 +1,91 @@
+import time
+import numpy as np
+import pandas as pd
+
+# --- ANALÍTICA DE OPCIONES ---
+# Max Pain = strike donde el pago total a los compradores (calls + puts) es mínimo.
+# Para un strike candidato S:
+#   calls: sum((S - K) * OI) sobre K < S  =  S * sum(OI) - sum(K * OI)
+#   puts:  sum((K - S) * OI) sobre K > S  =  sum(K * OI) - S * sum(OI)
+# Con los strikes ordenados una vez, esas sumas son sumas acumuladas (prefijos), así que
+# el pago en todos los candidatos sale de un searchsorted: O((N + M) log N) en vez de
+# recorrer la cadena completa con .apply() por cada strike.
+
+def _sorted_oi(df):
+    """Strikes ordenados + sumas acumuladas de OI y K*OI (OI NaN cuenta como 0, igual que .sum())"""
+    k = df['strike'].to_numpy(dtype=float)
+    oi = np.nan_to_num(df['openInterest'].to_numpy(dtype=float))
+    order = np.argsort(k, kind='stable')
+    k, oi = k[order], oi[order]
+    cum_oi = np.concatenate(([0.0], np.cumsum(oi)))
+    cum_koi = np.concatenate(([0.0], np.cumsum(k * oi)))
+    return k, cum_oi, cum_koi
+
+def pain_curve(calls, puts, strikes):
+    """Pago total (calls + puts) si el subyacente vence en cada strike de `strikes`"""
+    s = np.asarray(strikes, dtype=float)
+    kc, c_oi, c_koi = _sorted_oi(calls)
+    kp, p_oi, p_koi = _sorted_oi(puts)
+
+    n = np.searchsorted(kc, s, side='left')   # calls con K < S
+    call_loss = s * c_oi[n] - c_koi[n]
+
+    m = np.searchsorted(kp, s, side='right')  # puts con K <= S
+    put_loss = (p_koi[-1] - p_koi[m]) - s * (p_oi[-1] - p_oi[m])
+    return call_loss + put_loss
+
+def max_pain(calls, puts, price=None, band=(0.7, 1.3), fallback_all=False):
+    """
+    Strike de Max Pain entre los strikes de la cadena dentro de price*band (extremos excluidos).
+    fallback_all=True usa todos los strikes si la banda queda vacía.
+    Sin candidatos devuelve `price`.
+    """
+    strikes = np.unique(np.concatenate((calls['strike'].to_numpy(dtype=float),
+                                        puts['strike'].to_numpy(dtype=float))))
+    rel = strikes
+    if price is not None and band is not None:
+        rel = strikes[(strikes > price * band[0]) & (strikes < price * band[1])]
+        if len(rel) == 0 and fallback_all: rel = strikes
+    if len(rel) == 0: return price
+    return float(rel[np.argmin(pain_curve(calls, puts, rel))])
+
+# --- BENCHMARK (python options_analytics.py) ---
+def _legacy_max_pain(calls, puts, price, band=(0.7, 1.3)):
+    """Versión original con .apply() por strike (referencia para validar y medir)"""
+    strikes = sorted(list(set(calls['strike'].tolist() + puts['strike'].tolist())))
+    rel = [s for s in strikes if price * band[0] < s < price * band[1]]
+    cash = []
+    for s in rel:
+        c_loss = calls.apply(lambda r: max(0, s - r['strike']) * r['openInterest'], axis=1).sum()
+        p_loss = puts.apply(lambda r: max(0, r['strike'] - s) * r['openInterest'], axis=1).sum()
+        cash.append(c_loss + p_loss)
+    return rel[np.argmin(cash)] if cash else price
+
+def _random_chain(price=500.0, step=1.0, width=0.5, seed=7):
+    """Cadena sintética tipo SPY: strikes cada `step` en price*(1 ± width)"""
+    rng = np.random.default_rng(seed)
+    strikes = np.arange(round(price * (1 - width)), round(price * (1 + width)), step)
+    dist = np.abs(strikes - price) / price
+    def side():
+        oi = np.round(rng.gamma(1.5, 4000, len(strikes)) * np.exp(-dist * 8))
+        oi[rng.random(len(strikes)) < 0.05] = np.nan  # yfinance trae OI vacíos
+        return pd.DataFrame({'strike': strikes, 'openInterest': oi})
+    return side(), side()
+
+def run_benchmark(price=500.0, repeats=3):
+    calls, puts = _random_chain(price)
+
+    t0 = time.perf_counter()
+    ref = _legacy_max_pain(calls, puts, price)
+    t_loop = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    for _ in range(repeats): new = max_pain(calls, puts, price)
+    t_vec = (time.perf_counter() - t0) / repeats
+
+    print(f"Max Pain {len(calls) + len(puts)} contratos | apply: {t_loop*1000:.0f} ms | "
+          f"prefijos: {t_vec*1000:.2f} ms | x{t_loop / t_vec:.0f} | idéntico: {ref == new} ({new})")
+    return t_loop, t_vec, ref == new
+
+if __name__ == "__main__":
+    run_benchmark()
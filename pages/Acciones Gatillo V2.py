@@ -1,10 +1,11 @@
 import streamlit as st
-import yfinance as yf
+import ohlcv_store
 import pandas as pd
 import plotly.graph_objects as go
-import numpy as np
+import option_chain_store
+import scan_jobs
 import time
-from datetime import datetime
+from scoring_360 import score_tactical
 
 # --- CONFIGURACIÓN ---
 st.set_page_config(layout="wide", page_title="SystemaTrader 360: Tactical Edition Fixed")
@@ -56,193 +57,16 @@ CEDEAR_DATABASE = sorted(list(set([item for sublist in DB_CATEGORIES.values() fo
 # --- ESTADO (V14 - Tactical) ---
 if 'st360_db_v14' not in st.session_state: st.session_state['st360_db_v14'] = []
 
-# --- NUEVOS INDICADORES TÁCTICOS (ADX, BANDAS, RVOL) ---
-
-def calculate_adx(df, period=14):
-    """Calcula el ADX (Fuerza de la tendencia)"""
-    try:
-        plus_dm = df['High'].diff()
-        minus_dm = df['Low'].diff()
-        plus_dm[plus_dm < 0] = 0
-        minus_dm[minus_dm > 0] = 0
-        
-        tr1 = pd.DataFrame(df['High'] - df['Low'])
-        tr2 = pd.DataFrame(abs(df['High'] - df['Close'].shift(1)))
-        tr3 = pd.DataFrame(abs(df['Low'] - df['Close'].shift(1)))
-        frames = [tr1, tr2, tr3]
-        tr = pd.concat(frames, axis=1, join='inner').max(axis=1)
-        atr = tr.rolling(period).mean()
-        
-        plus_di = 100 * (plus_dm.ewm(alpha=1/period).mean() / atr)
-        minus_di = 100 * (abs(minus_dm).ewm(alpha=1/period).mean() / atr)
-        dx = (abs(plus_di - minus_di) / abs(plus_di + minus_di)) * 100
-        adx = dx.rolling(period).mean()
-        return adx.iloc[-1]
-    except: return 0
-
-def check_squeeze(df):
-    """Detecta compresión de Bollinger Bands (Energía acumulada)"""
-    try:
-        sma = df['Close'].rolling(20).mean()
-        std = df['Close'].rolling(20).std()
-        upper = sma + (2 * std)
-        lower = sma - (2 * std)
-        bandwidth = (upper - lower) / sma
-        
-        # Si el ancho actual es menor al promedio de 6 meses, es squeeze
-        avg_bw = bandwidth.rolling(120).mean().iloc[-1]
-        current_bw = bandwidth.iloc[-1]
-        
-        is_squeeze = current_bw < (avg_bw * 0.8) # 20% más estrecho que lo normal
-        return is_squeeze, current_bw
-    except: return False, 0
-
-def get_rvol(df):
-    """Volumen Relativo (Interés Institucional)"""
-    try:
-        vol_avg = df['Volume'].rolling(20).mean().iloc[-1]
-        vol_curr = df['Volume'].iloc[-1]
-        if vol_avg == 0: return 0
-        return vol_curr / vol_avg
-    except: return 0
-
-# --- MOTORES EXISTENTES (Resumidos) ---
-def get_technical_score(df):
-    try:
-        score = 0; details = []
-        # HA
-        ha_c = (df['Open']+df['High']+df['Low']+df['Close'])/4
-        ha_o = (df['Open'].shift(1)+df['Close'].shift(1))/2
-        if ha_c.iloc[-1] > ha_o.iloc[-1]: score+=1; details.append("HA Diario 🟢")
-        # Medias
-        p = df['Close'].iloc[-1]
-        m20 = df['Close'].rolling(20).mean().iloc[-1]
-        m50 = df['Close'].rolling(50).mean().iloc[-1]
-        if p>m20: score+=1; details.append(">MA20")
-        if m20>m50: score+=2; details.append("Tendencia Sana")
-        # RSI
-        delta = df['Close'].diff()
-        gain = (delta.where(delta>0, 0)).rolling(14).mean()
-        loss = (-delta.where(delta<0, 0)).rolling(14).mean()
-        rsi = 100 - (100/(1+(gain/loss))).iloc[-1]
-        if 40<=rsi<=65: score+=2
-        elif rsi>70: score-=2
-        
-        return max(0, min(10, score)), details, rsi
-    except: return 0, [], 50
-
-def get_options_data(ticker, price):
-    # Opciones (Simplificado para velocidad, misma lógica V12)
-    def_res = (5, "Neutro", 0, 0, 0, "N/A", 0)
-    try:
-        tk = yf.Ticker(ticker); exps = tk.options
-        if not exps: return def_res
-        opt = tk.option_chain(exps[0]); c=opt.calls; p=opt.puts
-        if c.empty or p.empty: return def_res
-        
-        cw = c.loc[c['openInterest'].idxmax()]['strike']
-        pw = p.loc[p['openInterest'].idxmax()]['strike']
-        
-        t_c, t_p = c['openInterest'].sum(), p['openInterest'].sum()
-        pcr = t_p/t_c if t_c > 0 else 0
-        sent = "🚀 Euforia" if pcr<0.6 else "🐻 Miedo" if pcr>1.4 else "⚖️ Neutro"
-        
-        # Max Pain (Aprox rapida)
-        strikes = sorted(list(set(c['strike'].tolist()+p['strike'].tolist())))
-        rel = [s for s in strikes if price*0.8 < s < price*1.2] or strikes
-        cash = []
-        for s in rel:
-            loss = c.apply(lambda r: max(0,s-r['strike'])*r['openInterest'],1).sum() + \
-                   p.apply(lambda r: max(0,r['strike']-s)*r['openInterest'],1).sum()
-            cash.append(loss)
-        mp = rel[np.argmin(cash)] if cash else price
-        
-        score = 5
-        if price>cw: score=10
-        elif price<pw: score=1
-        else:
-            rng = cw-pw
-            if rng>0: score = 10-((price-pw)/rng*10)
-            
-        return score, "Rango", cw, pw, mp, sent, pcr
-    except: return def_res
-
-# --- NUEVO MOTOR TÁCTICO (La Magia) ---
-def get_tactical_data(df):
-    rvol = get_rvol(df)
-    adx = calculate_adx(df)
-    is_sqz, bw = check_squeeze(df)
-    
-    tactical_score = 0
-    alerts = []
-    
-    # RVOL Logic
-    if rvol > 2.0: tactical_score += 3; alerts.append(f"🔥 VOLUMEN EXPLOSIVO (x{rvol:.1f})")
-    elif rvol > 1.2: tactical_score += 1; alerts.append(f"⚡ Volumen Alto (x{rvol:.1f})")
-    elif rvol < 0.6: tactical_score -= 1; alerts.append("🧊 Sin Interés")
-    
-    # ADX Logic
-    if adx > 25: tactical_score += 2; alerts.append(f"💪 Tendencia Fuerte (ADX {adx:.0f})")
-    elif adx < 20: tactical_score -= 2; alerts.append("💤 Lateral/Débil")
-    
-    # Squeeze Logic
-    if is_sqz: 
-        alerts.append("💣 BOLLINGER SQUEEZE")
-        # El squeeze no suma puntos por sí solo (es neutro), pero avisa explosión
-    
-    return tactical_score, alerts, rvol, adx, is_sqz
-
 # --- ANALISIS COMPLETO ---
+def load_inputs(ticker):
+    """I/O de un ticker (corre en el pool de hilos de parallel_scoring.py)"""
+    df = ohlcv_store.yf_history(ticker, period="2y")
+    try: chain = option_chain_store.nearest_chain(ticker)
+    except Exception: chain = None
+    return {'df': df, 'chain': chain}
+
 def analyze_complete(ticker):
-    try:
-        tk = yf.Ticker(ticker)
-        df = tk.history(period="2y") # Necesitamos historia para ADX y Bandas
-        if df.empty: return None
-        price = df['Close'].iloc[-1]
-        
-        # 1. Técnico Base
-        s_tec, d_tec, rsi = get_technical_score(df)
-        
-        # 2. Táctico (Energía)
-        s_tac, d_tac, rvol, adx, is_sqz = get_tactical_data(df)
-        
-        # 3. Opciones
-        s_opt, _, cw, pw, mp, sent, pcr = get_options_data(ticker, price)
-        
-        # 4. Estacional (Simplificado)
-        curr_m = datetime.now().month
-        m_ret = df['Close'].resample('ME').last().pct_change()
-        hist = m_ret[m_ret.index.month == curr_m]
-        win = (hist>0).mean() if len(hist)>1 else 0
-        s_sea = win * 10
-        
-        # Niveles ATR
-        h, l, c = df['High'], df['Low'], df['Close']
-        tr = np.maximum((h-l), np.maximum(abs(h-c.shift()), abs(l-c.shift())))
-        atr = tr.rolling(14).mean().iloc[-1]
-        
-        # --- SCORE FINAL RECALIBRADO ---
-        # Tec(30%) + Tactico(20%) + Estructura(30%) + Estacional(20%)
-        # El Táctico funciona como "Booster"
-        raw_score = (s_tec * 3) + (s_opt * 3) + (s_sea * 2) + s_tac
-        final = max(0, min(100, raw_score))
-        
-        verdict = "NEUTRAL"
-        if final >= 75: verdict = "🔥 COMPRA FUERTE"
-        elif final >= 60: verdict = "✅ COMPRA"
-        elif final <= 30: verdict = "💀 VENTA FUERTE"
-        elif final <= 45: verdict = "🔻 VENTA"
-        
-        return {
-            "Ticker": ticker, "Price": price, "Score": final, "Verdict": verdict,
-            "RSI": rsi, "ATR": atr,
-            "S_Tec": s_tec, "D_Tec": d_tec,
-            "S_Tac": s_tac, "D_Tac": d_tac, "RVOL": rvol, "ADX": adx, "Squeeze": is_sqz,
-            "S_Opt": s_opt, "Sentiment": sent, "CW": cw, "PW": pw, "Max_Pain": mp,
-            "S_Sea": s_sea,
-            "History": df
-        }
-    except: return None
+    return score_tactical(ticker, load_inputs(ticker))
 
 # --- UI ---
 with st.sidebar:
@@ -253,21 +77,25 @@ with st.sidebar:
     batches = [CEDEAR_DATABASE[i:i + batch_size] for i in range(0, len(CEDEAR_DATABASE), batch_size)]
     batch_labels = [f"Lote {i+1}: {b[0]}...{b[-1]}" for i, b in enumerate(batches)]
     sel_batch = st.selectbox("Elegir Lote:", range(len(batches)), format_func=lambda x: batch_labels[x])
+    scan_all = st.checkbox(f"Universo completo ({len(CEDEAR_DATABASE)})")
     
     c1, c2 = st.columns(2)
     if c1.button("▶️ ESCANEAR", type="primary"):
-        targets = batches[sel_batch]
-        prog = st.progress(0)
-        mem = [x['Ticker'] for x in st.session_state['st360_db_v14']]
-        run = [t for t in targets if t not in mem]
-        for i, t in enumerate(run):
-            r = analyze_complete(t)
-            if r: st.session_state['st360_db_v14'].append(r)
-            prog.progress((i+1)/len(run))
-            time.sleep(0.3)
-        prog.empty(); st.rerun()
-        
-    if c2.button("🗑️ Limpiar"): st.session_state['st360_db_v14'] = []; st.rerun()
+        targets = CEDEAR_DATABASE if scan_all else batches[sel_batch]
+        st.session_state['st360_job_v14'] = scan_jobs.submit('tactical_360', targets, load_inputs, score_tactical,
+                                                             subscriber=scan_jobs.subscriber(st.session_state))
+        
+    if c2.button("🗑️ Limpiar"): st.session_state['st360_db_v14'] = []; scan_jobs.leave(st.session_state, 'st360_job_v14'); st.rerun()
+    # Avance del escaneo en segundo plano: los resultados se suman a medida que terminan
+    job = scan_jobs.merge(st.session_state.get('st360_job_v14'), st.session_state['st360_db_v14'])
+    if job:
+        st.caption(scan_jobs.describe(job))
+        if job['state'] in scan_jobs.ACTIVE:
+            st.progress(job['done'] / max(job['total'], 1))
+            if st.button("⏹️ Cancelar escaneo"):
+                # Solo se desuscribe esta sesión: si otra sigue el mismo escaneo, continúa para ella
+                scan_jobs.leave(st.session_state, 'st360_job_v14')
+                st.rerun()
     st.divider()
     mt = st.text_input("Ticker:").upper().strip()
     if st.button("Analizar"):
@@ -360,3 +188,8 @@ if st.session_state['st360_db_v14']:
                 st.write(f"**Gestión Riesgo:** ATR ${it['ATR']:.2f} | Stop Loss sugerido: ${it['Price']-(2*it['ATR']):.2f}")
 
 else: st.info("👈 Escanea para buscar oportunidades.")
+
+# Escaneo en curso: se vuelve a consultar el trabajo (ver scan_jobs.py)
+if job and job['state'] in scan_jobs.ACTIVE:
+    time.sleep(scan_jobs.POLL_S)
+    st.rerun()
@@ -1,10 +1,12 @@
 import streamlit as st
-import yfinance as yf
+import ohlcv_store
 import pandas as pd
 import plotly.graph_objects as go
-import numpy as np
+import option_chain_store
+import market_context
+import scan_jobs
 import time
-from datetime import datetime
+from scoring_360 import score_gatillo
 
 # --- CONFIGURACIÓN ---
 st.set_page_config(layout="wide", page_title="SystemaTrader 360: Platinum V3.1 Fixed")
@@ -56,22 +58,6 @@ CEDEAR_DATABASE = sorted(list(set([item for sublist in DB_CATEGORIES.values() fo
 # --- ESTADO (V12 - Limpieza total) ---
 if 'st360_db_v12' not in st.session_state: st.session_state['st360_db_v12'] = []
 
-# --- HELPERS MATEMÁTICOS ---
-def calculate_rsi(series, period=14):
-    delta = series.diff()
-    gain = (delta.where(delta > 0, 0)).rolling(window=period).mean()
-    loss = (-delta.where(delta < 0, 0)).rolling(window=period).mean()
-    rs = gain / loss
-    return 100 - (100 / (1 + rs))
-
-def calculate_atr(df, period=14):
-    high_low = df['High'] - df['Low']
-    high_close = np.abs(df['High'] - df['Close'].shift())
-    low_close = np.abs(df['Low'] - df['Close'].shift())
-    ranges = pd.concat([high_low, high_close, low_close], axis=1)
-    true_range = np.max(ranges, axis=1)
-    return true_range.rolling(period).mean()
-
 # --- ALERTAS VISUALES ---
 def get_rsi_alert(rsi):
     if rsi > 70: return "⚠️ SOBRECOMPRA (Riesgo Corrección)", "#FFEBEE", "#C62828"
@@ -97,205 +83,33 @@ def detect_region_benchmark(ticker):
     return 'SPY', "S&P 500"
 
 def get_market_context_dynamic(ticker):
+    # Régimen y VIX compartidos por todo el escaneo (ver market_context.py): sin I/O por ticker
     try:
         bench_tk, bench_name = detect_region_benchmark(ticker)
-        data = yf.Tickers(f"{bench_tk} ^VIX")
-        bench = data.tickers[bench_tk].history(period="6mo")
-        vix = data.tickers['^VIX'].history(period="5d")
+        bench = market_context.benchmark_state(bench_tk)
         
-        if bench.empty: return "NEUTRAL", f"Sin datos {bench_name}", 0, "N/A", bench_name
+        if bench is None: return "NEUTRAL", f"Sin datos {bench_name}", 0, "N/A", bench_name
         
-        price = bench['Close'].iloc[-1]
-        ma50 = bench['Close'].rolling(50).mean().iloc[-1]
-        vix_p = vix['Close'].iloc[-1] if not vix.empty else 0
+        bull = bench['state'] == "BULLISH"
+        vix_p = market_context.vix_level()
         
-        stt = "BULLISH" if price > ma50 else "BEARISH"
-        msg = f"{'✅ Alcista' if price > ma50 else '🛑 Bajista'} en {bench_name}"
+        stt = bench['state']
+        msg = f"{'✅ Alcista' if bull else '🛑 Bajista'} en {bench_name}"
         vix_st = "🟢 Calma" if vix_p < 20 else "🔴 MIEDO" if vix_p > 25 else "🟡 Alerta"
         
         return stt, msg, vix_p, vix_st, bench_name
     except: return "NEUTRAL", "Error Macro", 0, "N/A", "SPY"
 
-def get_technical_score(df):
-    try:
-        score = 0; details = []
-        
-        # 1. HA Matrix (3 pts)
-        ha_close = (df['Open']+df['High']+df['Low']+df['Close'])/4
-        ha_open = (df['Open'].shift(1)+df['Close'].shift(1))/2
-        daily_green = ha_close.iloc[-1] > ha_open.iloc[-1]
-        
-        df_w = df.resample('W').agg({'Open':'first','High':'max','Low':'min','Close':'last'})
-        if not df_w.empty:
-            ha_close_w = (df_w['Open']+df_w['High']+df_w['Low']+df_w['Close'])/4
-            ha_open_w = (df_w['Open'].shift(1)+df_w['Close'].shift(1))/2
-            weekly_green = ha_close_w.iloc[-1] > ha_open_w.iloc[-1]
-        else: weekly_green = False
-        
-        df_m = df.resample('ME').agg({'Open':'first','High':'max','Low':'min','Close':'last'})
-        if not df_m.empty:
-            ha_close_m = (df_m['Open']+df_m['High']+df_m['Low']+df_m['Close'])/4
-            ha_open_m = (df_m['Open'].shift(1)+df_m['Close'].shift(1))/2
-            m_green = ha_close_m.iloc[-1] > ha_open_m.iloc[-1]
-        else: m_green = False
-
-        if daily_green: score+=1; details.append("HA Diario Alcista")
-        if weekly_green: score+=1; details.append("HA Semanal Alcista")
-        if m_green: score+=1; details.append("HA Mensual Alcista")
-
-        # 2. Medias (5 pts)
-        price = df['Close'].iloc[-1]
-        ma20 = df['Close'].rolling(20).mean().iloc[-1]
-        ma50 = df['Close'].rolling(50).mean().iloc[-1]
-        ma200 = df['Close'].rolling(200).mean().iloc[-1]
-        
-        if price > ma20: score+=1; details.append("> MA20")
-        if ma20 > ma50: score+=2; details.append("MA20 > MA50")
-        if price > ma200: score+=2; details.append("> MA200")
-
-        # 3. RSI (2 pts)
-        rsi = calculate_rsi(df['Close']).iloc[-1]
-        if 40 <= rsi <= 65: score += 2 
-        elif rsi > 70: score -= 2
-        elif rsi < 30: score += 1
-            
-        return max(0, min(10, score)), details, rsi
-    except: return 0, ["Error"], 50
-
-def get_options_data(ticker, price):
-    # Valores default seguros para evitar crash
-    def_res = (5, "Sin Opciones", 0, 0, 0, "N/A", 0)
-    try:
-        tk = yf.Ticker(ticker)
-        try: exps = tk.options
-        except: return def_res
-        if not exps: return def_res
-        
-        opt = tk.option_chain(exps[0])
-        calls = opt.calls; puts = opt.puts
-        if calls.empty or puts.empty: return def_res
-        
-        # --- SENTIMIENTO MEJORADO ---
-        total_call = calls['openInterest'].sum()
-        total_put = puts['openInterest'].sum()
-        pcr = total_put / total_call if total_call > 0 else 0
-        
-        if pcr < 0.6: sentiment = "🚀 EUFORIA (Alerta: Techo)"
-        elif pcr > 1.4: sentiment = "🐻 MIEDO (Posible Piso)"
-        else: sentiment = "⚖️ NEUTRAL (Sano)"
-
-        # Muros
-        cw = calls.loc[calls['openInterest'].idxmax()]['strike']
-        pw = puts.loc[puts['openInterest'].idxmax()]['strike']
-        
-        strikes = sorted(list(set(calls['strike'].tolist() + puts['strike'].tolist())))
-        rel = [s for s in strikes if price*0.7 < s < price*1.3] or strikes
-        cash = []
-        for s in rel:
-            c_loss = calls.apply(lambda r: max(0, s-r['strike'])*r['openInterest'], axis=1).sum()
-            p_loss = puts.apply(lambda r: max(0, r['strike']-s)*r['openInterest'], axis=1).sum()
-            cash.append(c_loss+p_loss)
-        mp = rel[np.argmin(cash)] if cash else price
-
-        score = 5
-        detail = "Rango Medio"
-        if price > cw: score=10; detail="🚀 Breakout Gamma"
-        elif price < pw: score=1; detail="💀 Breakdown Gamma"
-        else:
-            rng = cw - pw
-            if rng > 0:
-                pos = (price - pw)/rng
-                score = 10 - (pos*10)
-                if score > 8: detail="🟢 Soporte (PW)"
-                elif score < 2: detail="🧱 Resistencia (CW)"
-                else: detail=f"Rango ${pw}-${cw}"
-                
-        return score, detail, cw, pw, mp, sentiment, pcr
-    except: return def_res
-
-def get_seasonality_score(df):
-    try:
-        curr_m = datetime.now().month
-        m_ret = df['Close'].resample('ME').last().pct_change()
-        hist = m_ret[m_ret.index.month == curr_m]
-        
-        win = (hist>0).mean() if len(hist)>1 else 0
-        score = win * 6
-        avg = hist.mean() if len(hist)>1 else 0
-        
-        if avg > 0.01: score += 4
-        elif avg > 0: score += 2
-        else: score -= 2
-        
-        wins = hist[hist>0]; losses = hist[hist<0]
-        avg_w = wins.mean() if not wins.empty else 0
-        avg_l = abs(losses.mean()) if not losses.empty else 0
-        
-        warning = ""
-        if avg_l > (avg_w * 2) and avg_l > 0.03:
-            score -= 3; warning = "⚠️ RIESGO (Loss > 2x Win)"
-            
-        return max(0, min(10, score)), f"WR: {win:.0%} | {warning}", avg
-    except: return 5, "N/A", 0
-
-def calculate_levels(df, price):
-    try:
-        atr = calculate_atr(df).iloc[-1]
-        sl = price - (2 * atr)
-        tp = price + (3 * atr)
-        return atr, sl, tp
-    except: return 0, 0, 0
-
 # --- FUNCIÓN A PRUEBA DE BALAS ---
+def load_inputs(ticker):
+    """I/O de un ticker (corre en el pool de hilos de parallel_scoring.py)"""
+    df = ohlcv_store.yf_history(ticker, period="2y")
+    try: chain = option_chain_store.nearest_chain(ticker)
+    except Exception: chain = None
+    return {'df': df, 'chain': chain, 'macro': get_market_context_dynamic(ticker)}
+
 def analyze_complete(ticker):
-    # Objeto de error por defecto para que SIEMPRE devuelva algo
-    error_res = {
-        "Ticker": ticker, "Price": 0, "Score": 0, "Verdict": "⚠️ ERROR DATOS",
-        "S_Tec": 0, "RSI": 0, "D_Tec_List": [],
-        "S_Opt": 0, "Sentiment": "N/A", "PCR": 0, "CW": 0, "PW": 0, "Max_Pain": 0, "D_Opt": "N/A",
-        "S_Sea": 0, "D_Sea": "N/A", "Avg_Ret": 0,
-        "ATR": 0, "SL": 0, "TP": 0,
-        "Macro_Msg": "N/A", "Bench": "N/A", "VIX": 0, "VIX_St": "N/A",
-        "History": None
-    }
-    
-    try:
-        tk = yf.Ticker(ticker)
-        df = tk.history(period="2y")
-        
-        if df.empty: return error_res
-        
-        price = df['Close'].iloc[-1]
-        
-        s_tec, d_tec_list, rsi = get_technical_score(df)
-        d_tec_str = ", ".join([d for d in d_tec_list if "(+" in d or "RSI" in d])
-        
-        s_opt, d_opt, cw, pw, mp, sent, pcr_val = get_options_data(ticker, price)
-        s_sea, d_sea, avg_ret = get_seasonality_score(df)
-        atr, sl, tp = calculate_levels(df, price)
-        macro_st, macro_msg, vix, vix_st, bench = get_market_context_dynamic(ticker)
-        
-        final = (s_tec * 4) + (s_opt * 3) + (s_sea * 3)
-        if macro_st == "BEARISH": final -= 10
-        if vix > 25: final -= 5
-        
-        verdict = "NEUTRAL"
-        if final >= 75: verdict = "🔥 COMPRA FUERTE"
-        elif final >= 60: verdict = "✅ COMPRA"
-        elif final <= 25: verdict = "💀 VENTA FUERTE"
-        elif final <= 40: verdict = "🔻 VENTA"
-        
-        return {
-            "Ticker": ticker, "Price": price, "Score": final, "Verdict": verdict,
-            "S_Tec": s_tec, "RSI": rsi, "D_Tec_List": d_tec_list,
-            "S_Opt": s_opt, "Sentiment": sent, "PCR": pcr_val,
-            "CW": cw, "PW": pw, "Max_Pain": mp, "D_Opt": d_opt,
-            "S_Sea": s_sea, "D_Sea": d_sea, "Avg_Ret": avg_ret,
-            "ATR": atr, "SL": sl, "TP": tp,
-            "Macro_Msg": macro_msg, "Bench": bench, "VIX": vix, "VIX_St": vix_st,
-            "History": df
-        }
-    except: return error_res
+    return score_gatillo(ticker, load_inputs(ticker))
 
 # --- UI ---
 with st.sidebar:
@@ -306,32 +120,31 @@ with st.sidebar:
     batches = [CEDEAR_DATABASE[i:i + batch_size] for i in range(0, len(CEDEAR_DATABASE), batch_size)]
     batch_labels = [f"Lote {i+1}: {b[0]} ... {b[-1]}" for i, b in enumerate(batches)]
     sel_batch = st.selectbox("Seleccionar Lote:", range(len(batches)), format_func=lambda x: batch_labels[x])
+    scan_all = st.checkbox(f"Universo completo ({len(CEDEAR_DATABASE)})")
     
     c1, c2 = st.columns(2)
     if c1.button("▶️ ESCANEAR", type="primary"):
-        targets = batches[sel_batch]
-        prog = st.progress(0)
-        
-        # Recuperamos memoria existente o iniciamos lista
-        current_data = st.session_state['st360_db_v12']
-        existing_tickers = [x['Ticker'] for x in current_data]
-        
-        # Solo procesamos lo nuevo
-        to_process = [t for t in targets if t not in existing_tickers]
-        
-        for i, t in enumerate(to_process):
-            r = analyze_complete(t)
-            st.session_state['st360_db_v12'].append(r)
-            prog.progress((i+1)/len(to_process))
-            time.sleep(0.2) # Pausa leve
-            
-        prog.empty()
-        st.rerun()
+        targets = CEDEAR_DATABASE if scan_all else batches[sel_batch]
+        # Trabajo en segundo plano (compartido si otra sesión ya escanea el mismo lote); solo se suma lo nuevo
+        st.session_state['st360_job_v12'] = scan_jobs.submit('gatillo_360', targets, load_inputs, score_gatillo,
+                                                             subscriber=scan_jobs.subscriber(st.session_state))
         
     if c2.button("🗑️ Limpiar"): 
         st.session_state['st360_db_v12'] = []
+        scan_jobs.leave(st.session_state, 'st360_job_v12')
         st.rerun()
 
+    # Avance del escaneo en segundo plano: los resultados se suman a medida que terminan
+    job = scan_jobs.merge(st.session_state.get('st360_job_v12'), st.session_state['st360_db_v12'])
+    if job:
+        st.caption(scan_jobs.describe(job))
+        if job['state'] in scan_jobs.ACTIVE:
+            st.progress(job['done'] / max(job['total'], 1))
+            if st.button("⏹️ Cancelar escaneo"):
+                # Solo se desuscribe esta sesión: si otra sigue el mismo escaneo, continúa para ella
+                scan_jobs.leave(st.session_state, 'st360_job_v12')
+                st.rerun()
+
     st.divider()
     mt = st.text_input("Ticker Manual:").upper().strip()
     if st.button("Analizar"):
@@ -471,3 +284,8 @@ if data:
         st.info("No hay activos que cumplan con los filtros actuales.")
 
 else: st.info("👈 Comienza escaneando un lote.")
+
+# Escaneo en curso: se vuelve a consultar el trabajo (ver scan_jobs.py)
+if job and job['state'] in scan_jobs.ACTIVE:
+    time.sleep(scan_jobs.POLL_S)
+    st.rerun()
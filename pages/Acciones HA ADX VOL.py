@@ -1,7 +1,8 @@
 import streamlit as st
-import yfinance as yf
 import pandas as pd
 import numpy as np
+from bar_pyramid import frame
+import fetch_planner
 
 # --- CONFIGURACIÓN ---
 st.set_page_config(layout="wide", page_title="SystemaTrader - HA Matrix & ADX Strategy")
@@ -57,44 +58,46 @@ def calculate_adx(df, period=14):
     adx = dx.rolling(period).mean()
     return adx
 
-@st.cache_data(ttl=600)
-def fetch_data(tickers):
-    # Descargamos datos horarios para construir todo (Max 730 días)
-    try:
-        data = yf.download(tickers, period="6mo", interval="1h", group_by='ticker', progress=False, auto_adjust=True)
-        return data
-    except: return None
+# Ventanas calculadas desde los indicadores (ver fetch_planner.py): calculate_adx de 14 en 1H y
+# Diario (ATR y ADX con medias simples, DI con ewm ajustada), HA de dos velas en todas.
+# 4H sale de la base horaria y Semanal de la diaria.
+ADX_WARMUP = [('adx_sma', 14), ('ewm', 14)]
+FETCH_PLAN = fetch_planner.plan({
+    '1h': ([*ADX_WARMUP, ('ha_fast',)], 1),
+    '4h': ([('ha_fast',)], 1),
+    '1d': ([*ADX_WARMUP, ('ha_fast',)], 1),
+    '1wk': ([('ha_fast',)], 1),
+})
 
 def analyze_market_structure(tickers):
-    data = fetch_data(tickers)
-    if data is None: 
+    panels = fetch_planner.load(tickers, FETCH_PLAN, 'ha_adx_vol')
+    if any(p is None or len(p['index']) == 0 for p in panels.values()):
         st.error("Error de conexión.")
         return pd.DataFrame()
-        
+
     results = []
     prog = st.progress(0)
     
     for i, t in enumerate(tickers):
         try:
-            # Obtener DF del ticker (Manejo MultiIndex)
-            df_1h = data[t].dropna() if len(tickers) > 1 else data.dropna()
+            df_1h = frame(panels['1h'], t)
             if df_1h.empty: continue
             
-            # --- 1. CONSTRUCCIÓN DE TEMPORALIDADES (Matrioskas) ---
+            # --- 1. TEMPORALIDADES (Matrioskas, según FETCH_PLAN) ---
             
             # A. SEMANAL (Macro)
-            df_1w = df_1h.resample('W').agg({'Open':'first', 'High':'max', 'Low':'min', 'Close':'last'}).dropna()
+            df_1w = frame(panels['1wk'], t)
             ha_1w = calculate_heikin_ashi(df_1w)
             trend_1w = ha_1w['HA_Color'].iloc[-1] # 1 o -1
             
             # B. DIARIO (Estructural + Filtro ADX)
-            df_1d = df_1h.resample('D').agg({'Open':'first', 'High':'max', 'Low':'min', 'Close':'last'}).dropna()
+            df_1d = frame(panels['1d'], t)
             ha_1d = calculate_heikin_ashi(df_1d)
             adx_1d = calculate_adx(df_1d).iloc[-1]
             trend_1d = ha_1d['HA_Color'].iloc[-1]
             
             # C. 4 HORAS (Intermedio)
-            df_4h = df_1h.resample('4h').agg({'Open':'first', 'High':'max', 'Low':'min', 'Close':'last'}).dropna()
+            df_4h = frame(panels['4h'], t)
             ha_4h = calculate_heikin_ashi(df_4h)
             trend_4h = ha_4h['HA_Color'].iloc[-1]
             
@@ -165,6 +168,7 @@ Esta herramienta aplica la estrategia de **"Las Matrioskas"**: busca alineación
 *   **LONG:** Todo Verde + ADX Diario > 20 + ADX 1H > 25.
 *   **SHORT:** Todo Rojo + ADX Diario > 20 + ADX 1H > 25.
 """)
+st.caption(f"📦 Descarga según indicadores: {fetch_planner.describe(FETCH_PLAN)}")
 
 if st.button("🔎 ESCANEAR ESTRATEGIA"):
     df = analyze_market_structure(TICKERS_DB)
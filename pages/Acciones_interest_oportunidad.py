@@ -1,8 +1,10 @@
 import streamlit as st
-import yfinance as yf
+import ohlcv_store
 import pandas as pd
 import plotly.graph_objects as go
-import numpy as np
+from options_analytics import max_pain as calc_max_pain
+import option_chain_store
+import scan_jobs
 import time
 import re
 
@@ -76,20 +78,16 @@ def analyze_ticker_safe(ticker):
     """Analiza un solo ticker de forma segura y devuelve un dict completo"""
     ticker = ticker.upper().strip()
     try:
-        tk = yf.Ticker(ticker)
         
         # 1. Obtener Precio
-        hist = tk.history(period="1d")
+        hist = ohlcv_store.yf_history(ticker, period="1d")
         if hist.empty: return None
         current_price = hist['Close'].iloc[-1]
         
-        # 2. Obtener Opciones
-        exps = tk.options
-        if not exps: return None
-        
-        target_date = exps[0]
-        opt = tk.option_chain(target_date)
-        calls, puts = opt.calls, opt.puts
+        # 2. Obtener Opciones (foto compartida entre páginas, ver option_chain_store.py)
+        chain = option_chain_store.nearest_chain(ticker)
+        if chain is None: return None
+        calls, puts, target_date = chain
         
         if calls.empty or puts.empty: return None
         
@@ -105,16 +103,7 @@ def analyze_ticker_safe(ticker):
         put_wall = puts.loc[puts['openInterest'].idxmax()]['strike']
         
         # Max Pain Simplificado
-        strikes = sorted(list(set(calls['strike'].tolist() + puts['strike'].tolist())))
-        relevant_strikes = [s for s in strikes if current_price * 0.7 < s < current_price * 1.3]
-        
-        cash_values = []
-        for strike in relevant_strikes:
-            call_loss = calls.apply(lambda r: max(0, strike - r['strike']) * r['openInterest'], axis=1).sum()
-            put_loss = puts.apply(lambda r: max(0, r['strike'] - strike) * r['openInterest'], axis=1).sum()
-            cash_values.append(call_loss + put_loss)
-            
-        max_pain = relevant_strikes[np.argmin(cash_values)] if cash_values else current_price
+        max_pain = calc_max_pain(calls, puts, current_price, band=(0.7, 1.3))
         
         # 4. Calcular Sentimiento
         sentiment_calc = get_sentiment_label(pc_ratio)
@@ -137,10 +126,14 @@ def analyze_ticker_safe(ticker):
     except Exception as e:
         return {'Ticker': ticker, 'Status': 'Error', 'Price': 0}
 
+def scan_ticker(ticker):
+    """Resultado válido del ticker o None (los errores no se acumulan)"""
+    data = analyze_ticker_safe(ticker)
+    return data if data and data.get('Price', 0) > 0 else None
+
 # --- FUNCIÓN DE ESCANEO REUTILIZABLE ---
 def run_scan_process(ticker_list):
-    progress_bar = st.progress(0)
-    status_text = st.empty()
+    """Envía el escaneo a segundo plano (ver scan_jobs.py); la página solo consulta el avance"""
     existing_tickers = [d.get('Ticker') for d in st.session_state['accumulated_data']]
     
     # Filtramos los que ya existen para no perder tiempo, a menos que sea una lista muy corta
@@ -149,23 +142,9 @@ def run_scan_process(ticker_list):
     
     if skipped > 0:
         st.toast(f"Saltando {skipped} activos ya analizados...", icon="⏭️")
-
-    for i, ticker in enumerate(target_tickers):
-        status_text.markdown(f"🔎 Analizando **{ticker}**...")
-        
-        data = analyze_ticker_safe(ticker)
-        
-        if data and 'Price' in data and data['Price'] > 0:
-            st.session_state['accumulated_data'].append(data)
-        
-        progress_bar.progress((i + 1) / len(target_tickers))
-        time.sleep(1.2) # Pausa de seguridad
-        
-    status_text.success("✅ Análisis finalizado.")
-    time.sleep(1)
-    status_text.empty()
-    progress_bar.empty()
-    st.rerun()
+    if target_tickers:
+        st.session_state['options_job'] = scan_jobs.submit('options_oportunidad', target_tickers, scan_ticker,
+                                                           subscriber=scan_jobs.subscriber(st.session_state))
 
 # --- BARRA LATERAL ---
 with st.sidebar:
@@ -209,7 +188,19 @@ with st.sidebar:
     # --- LIMPIEZA ---
     if st.button("🗑️ Borrar Resultados"):
         st.session_state['accumulated_data'] = []
+        scan_jobs.leave(st.session_state, 'options_job')
         st.rerun()
+    
+    # Avance del escaneo en segundo plano: los resultados se suman a medida que terminan
+    job = scan_jobs.merge(st.session_state.get('options_job'), st.session_state['accumulated_data'])
+    if job:
+        st.caption(scan_jobs.describe(job))
+        if job['state'] in scan_jobs.ACTIVE:
+            st.progress(job['done'] / max(job['total'], 1))
+            if st.button("⏹️ Cancelar escaneo"):
+                # Solo se desuscribe esta sesión: si otra sigue el mismo escaneo, continúa para ella
+                scan_jobs.leave(st.session_state, 'options_job')
+                st.rerun()
         
     st.metric("Activos en Memoria", len(st.session_state['accumulated_data']))
 
@@ -319,3 +310,8 @@ if st.session_state['accumulated_data']:
 
 else:
     st.info("👈 Selecciona un **Lote** o usa la **Lista Personalizada** en el menú para comenzar.")
+
+# Escaneo en curso: se vuelve a consultar el trabajo (ver scan_jobs.py)
+if job and job['state'] in scan_jobs.ACTIVE:
+    time.sleep(scan_jobs.POLL_S)
+    st.rerun()
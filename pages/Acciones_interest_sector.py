@@ -1,8 +1,9 @@
 import streamlit as st
-import yfinance as yf
+import ohlcv_store
 import pandas as pd
 import plotly.graph_objects as go
-import numpy as np
+from options_analytics import max_pain as calc_max_pain
+import option_chain_store
 import re # Importamos Regex para limpiar la lista de entrada
 
 # --- CONFIGURACIÓN ---
@@ -39,17 +40,13 @@ def generate_links(ticker, has_cedear):
 @st.cache_data(ttl=1800)
 def analyze_options_chain(ticker):
     try:
-        tk = yf.Ticker(ticker)
-        hist = tk.history(period="1d")
+        hist = ohlcv_store.yf_history(ticker, period="1d")
         if hist.empty: return None
         current_price = hist['Close'].iloc[-1]
         
-        exps = tk.options
-        if not exps: return None
-        target_date = exps[0]
-        opts = tk.option_chain(target_date)
-        calls = opts.calls
-        puts = opts.puts
+        chain = option_chain_store.nearest_chain(ticker)
+        if chain is None: return None
+        calls, puts, target_date = chain
         
         total_call_oi = calls['openInterest'].sum()
         total_put_oi = puts['openInterest'].sum()
@@ -58,16 +55,7 @@ def analyze_options_chain(ticker):
         pc_ratio = total_put_oi / total_call_oi
         
         # Max Pain
-        strikes = sorted(list(set(calls['strike'].tolist() + puts['strike'].tolist())))
-        strikes = [s for s in strikes if current_price * 0.7 < s < current_price * 1.3]
-        
-        cash_values = []
-        for strike in strikes:
-            intrinsic_calls = calls.apply(lambda row: max(0, strike - row['strike']) * row['openInterest'], axis=1).sum()
-            intrinsic_puts = puts.apply(lambda row: max(0, row['strike'] - strike) * row['openInterest'], axis=1).sum()
-            cash_values.append(intrinsic_calls + intrinsic_puts)
-        
-        max_pain = strikes[np.argmin(cash_values)] if cash_values else current_price
+        max_pain = calc_max_pain(calls, puts, current_price, band=(0.7, 1.3))
         
         return {
             'Ticker': ticker, 'Price': current_price, 'Max_Pain': max_pain,
@@ -1,8 +1,9 @@
 import streamlit as st
-import yfinance as yf
+import ohlcv_store
 import pandas as pd
 import plotly.express as px
 from datetime import datetime
+from seasonality import close_panel, seasonality_table
 
 # --- CONFIGURACIÓN ---
 st.set_page_config(layout="wide", page_title="SystemaTrader - Radar Risk/Reward")
@@ -49,57 +50,13 @@ MONTH_DICT = {name: i+1 for i, name in enumerate(MONTH_NAMES)}
 @st.cache_data
 def get_monthly_stats(tickers, start_year=2010):
     start_date = f"{start_year}-01-01"
-    try:
-        data = yf.download(tickers, start=start_date, progress=False, group_by='ticker', auto_adjust=True)
-    except Exception: return pd.DataFrame()
+    data = ohlcv_store.yf_download(tickers, start=start_date, progress=False, group_by='ticker', auto_adjust=True)
+    if data.empty: return pd.DataFrame()
 
-    stats_list = []
-    if len(tickers) == 1: data_dict = {tickers[0]: data}
-    else: data_dict = {t: data[t] for t in tickers}
-
-    for ticker in tickers:
-        try:
-            if ticker not in data_dict: continue
-            df = data_dict[ticker]
-            if 'Close' not in df.columns: continue
-            
-            monthly_ret = df['Close'].resample('M').last().pct_change() * 100
-            monthly_ret = monthly_ret.dropna()
-            
-            temp_df = pd.DataFrame(monthly_ret)
-            temp_df.columns = ['Return']
-            temp_df['Month'] = temp_df.index.month
-            
-            def avg_win(x): return x[x > 0].mean() if len(x[x > 0]) > 0 else 0
-            def avg_loss(x): return x[x < 0].mean() if len(x[x < 0]) > 0 else 0
-            
-            grouped = temp_df.groupby('Month')['Return'].agg([
-                'mean', 'median', 'count', 
-                lambda x: (x > 0).mean() * 100,
-                avg_win,
-                avg_loss
-            ])
-            grouped.columns = ['Avg_Return', 'Median_Return', 'Years', 'Win_Rate', 'Avg_Win', 'Avg_Loss']
-            
-            is_cedear = ticker in CEDEAR_UNIVERSE
-            
-            for m in range(1, 13):
-                if m in grouped.index:
-                    stats_list.append({
-                        'Ticker': ticker,
-                        'Is_Cedear': is_cedear,
-                        'Month_Num': m,
-                        'Month_Name': MONTH_NAMES[m-1],
-                        'Avg_Return': grouped.loc[m, 'Avg_Return'],
-                        'Median_Return': grouped.loc[m, 'Median_Return'],
-                        'Win_Rate': grouped.loc[m, 'Win_Rate'],
-                        'Avg_Win': grouped.loc[m, 'Avg_Win'],
-                        'Avg_Loss': grouped.loc[m, 'Avg_Loss'],
-                        'Years': grouped.loc[m, 'Years']
-                    })
-        except Exception: continue
-            
-    return pd.DataFrame(stats_list)
+    # Un solo cálculo para todo el universo (ver seasonality.py)
+    stats = seasonality_table(close_panel(data, tickers))
+    stats.insert(1, 'Is_Cedear', stats['Ticker'].isin(CEDEAR_UNIVERSE))
+    return stats
 
 def generate_tv_link(ticker, is_cedear):
     # Fix: Url encoding simple para asegurar compatibilidad
@@ -1,6 +1,7 @@
 import streamlit as st
-import yfinance as yf
 import pandas as pd
+from heikin_ashi import calculate_heikin_ashi as ha_engine
+from matrix_refresh import refresh
 
 # --- CONFIGURACIÓN ---
 st.set_page_config(layout="wide", page_title="SystemaTrader - Stocks HA Matrix Pro")
@@ -67,27 +68,8 @@ def calculate_heikin_ashi(df):
     if 'Open' not in df.columns or 'Close' not in df.columns:
         return pd.DataFrame()
 
-    df_ha = df.copy()
-    
-    # HA Close
-    df_ha['HA_Close'] = (df['Open'] + df['High'] + df['Low'] + df['Close']) / 4
-    
-    # HA Open (Iterativo)
-    df_ha['HA_Open'] = 0.0
-    # Inicializamos
-    df_ha.iat[0, df_ha.columns.get_loc('HA_Open')] = (df.iloc[0]['Open'] + df.iloc[0]['Close']) / 2
-    
-    # Bucle vectorizado optimizado
-    ha_open_idx = df_ha.columns.get_loc('HA_Open')
-    ha_close_idx = df_ha.columns.get_loc('HA_Close')
-    
-    vals = df_ha.values
-    for i in range(1, len(vals)):
-        vals[i, ha_open_idx] = (vals[i-1, ha_open_idx] + vals[i-1, ha_close_idx]) / 2
-    
-    df_ha['HA_Open'] = vals[:, ha_open_idx]
-        
-    return df_ha
+    # HA Open vectorizado (motor compartido, semilla = (Open + Close) / 2)
+    return ha_engine(df, seed='mid')
 
 def get_candle_status(df_ha):
     """Determina si la última vela es Verde o Roja"""
@@ -98,114 +80,44 @@ def get_candle_status(df_ha):
     except:
         return "N/A"
 
-@st.cache_data(ttl=900) # Cache de 15 minutos
-def fetch_bulk_data(tickers):
-    """Descarga masiva optimizada"""
+def _status(tf, value):
+    """Mismas columnas que una evaluación exitosa, todas con `value`"""
+    return {tf: value, 'Mes_Prev': value} if tf == 'Mensual' else {tf: value}
+
+def evaluate_timeframe(tf, df):
+    """Columnas de la matriz para una temporalidad (solo se llama si cambió su última vela)"""
+    if df is None or df.empty: return _status(tf, "N/A")
     try:
-        # Descarga 1: Datos Horarios (Último mes para 1H y 4H)
-        data_1h = yf.download(tickers, period="1mo", interval="1h", group_by='ticker', progress=False, auto_adjust=True, threads=True)
-        
-        # Descarga 2: Datos Diarios (Últimos 2 años para asegurar Mensual correcto)
-        data_1d = yf.download(tickers, period="2y", interval="1d", group_by='ticker', progress=False, auto_adjust=True, threads=True)
-        
-        return data_1h, data_1d
-    except Exception as e:
-        return None, None
+        ha = calculate_heikin_ashi(df)
+        res = {tf: get_candle_status(ha)}
+        if tf == 'Mensual':
+            # Estado Mes ANTERIOR (Informativo)
+            if len(ha) >= 2:
+                prev_month = ha.iloc[-2]
+                res['Mes_Prev'] = "🟢" if prev_month['HA_Close'] > prev_month['HA_Open'] else "🔴"
+            else:
+                res['Mes_Prev'] = "N/A"
+        return res
+    except Exception:
+        return _status(tf, "Error")
 
 def process_market_matrix(tickers):
-    # 1. Descarga Masiva
+    # 1. Refresco delta: el almacén baja solo las barras nuevas (1H: 1 mes, Diario: 2 años)
+    #    y la pirámide deriva 4H / Semanal / Mensual; solo se re-evalúan las temporalidades
+    #    cuya última vela cambió desde el escaneo anterior.
+    prog = st.progress(0, text="Procesando Algoritmo Heikin Ashi...")
     with st.spinner(f"📡 Conectando con Wall Street ({len(tickers)} Activos)..."):
-        bulk_1h, bulk_1d = fetch_bulk_data(tickers)
-    
-    if bulk_1h is None or bulk_1d is None or bulk_1h.empty:
+        rows, stats = refresh('stocks_ha', tickers, evaluate_timeframe,
+                              on_progress=lambda done, total: prog.progress(done / total))
+    prog.empty()
+
+    if stats['evaluated'] + stats['reused'] == 0:
         st.error("Error: Yahoo Finance no respondió. Intenta de nuevo en 1 minuto.")
         return pd.DataFrame()
 
-    results = []
-    prog = st.progress(0, text="Procesando Algoritmo Heikin Ashi...")
-    total = len(tickers)
-    
-    # 2. Procesamiento Individual
-    for i, t in enumerate(tickers):
-        row = {'Activo': t}
-        
-        try:
-            # Extraer data de los dataframes masivos
-            try:
-                # Manejo robusto de MultiIndex de Pandas
-                df_intra = bulk_1h[t].copy().dropna() if t in bulk_1h.columns.levels[0] else pd.DataFrame()
-                df_daily = bulk_1d[t].copy().dropna() if t in bulk_1d.columns.levels[0] else pd.DataFrame()
-                
-                # Fallback si la estructura es plana (un solo ticker)
-                if df_intra.empty and len(tickers) == 1: df_intra = bulk_1h.copy().dropna()
-                if df_daily.empty and len(tickers) == 1: df_daily = bulk_1d.copy().dropna()
-                
-            except Exception:
-                continue
-
-            # --- PROCESAMIENTO INTRADÍA (1H, 4H) ---
-            if not df_intra.empty:
-                # 1 Hora
-                ha_1h = calculate_heikin_ashi(df_intra)
-                row['1H'] = get_candle_status(ha_1h)
-                
-                # 4 Horas (Resampling)
-                logic = {'Open': 'first', 'High': 'max', 'Low': 'min', 'Close': 'last'}
-                df_intra.columns = [c.capitalize() for c in df_intra.columns]
-                df_4h = df_intra.resample('4h').agg(logic).dropna()
-                ha_4h = calculate_heikin_ashi(df_4h)
-                row['4H'] = get_candle_status(ha_4h)
-            else:
-                row['1H'] = "N/A"
-                row['4H'] = "N/A"
-
-            # --- PROCESAMIENTO MACRO (Diario, Semanal, Mensual) ---
-            if not df_daily.empty:
-                # Diario
-                ha_1d = calculate_heikin_ashi(df_daily)
-                row['Diario'] = get_candle_status(ha_1d)
-                
-                # Asegurar nombres
-                df_daily.columns = [c.capitalize() for c in df_daily.columns]
-                logic = {'Open': 'first', 'High': 'max', 'Low': 'min', 'Close': 'last'}
-                
-                # Semanal
-                df_1w = df_daily.resample('W').agg(logic).dropna()
-                ha_1w = calculate_heikin_ashi(df_1w)
-                row['Semanal'] = get_candle_status(ha_1w)
-                
-                # Mensual
-                try:
-                    df_1m = df_daily.resample('ME').agg(logic).dropna()
-                except:
-                    df_1m = df_daily.resample('M').agg(logic).dropna()
-                    
-                ha_1m = calculate_heikin_ashi(df_1m)
-                
-                # 1. Estado Mes Actual (Para el puntaje)
-                row['Mensual'] = get_candle_status(ha_1m)
-                
-                # 2. Estado Mes ANTERIOR (Informativo)
-                if len(ha_1m) >= 2:
-                    prev_month = ha_1m.iloc[-2]
-                    row['Mes_Prev'] = "🟢" if prev_month['HA_Close'] > prev_month['HA_Open'] else "🔴"
-                else:
-                    row['Mes_Prev'] = "N/A"
-
-            else:
-                row['Diario'] = "N/A"
-                row['Semanal'] = "N/A"
-                row['Mensual'] = "N/A"
-                row['Mes_Prev'] = "N/A"
-        
-        except Exception:
-            row['1H'] = "Error"
-        
-        results.append(row)
-        prog.progress((i + 1) / total)
-        
-    prog.empty()
-    return pd.DataFrame(results)
+    st.caption(f"⚡ Datos en {stats['load_s']:.1f} s | temporalidades recalculadas: {stats['evaluated']} "
+               f"| sin cambios: {stats['reused']}")
+    return pd.DataFrame(rows)
 
 # --- INTERFAZ ---
 st.title("🏙️ SystemaTrader: Wall Street Heikin Ashi Matrix (Pro)")
@@ -1,10 +1,14 @@
 import streamlit as st
-import yfinance as yf
 import pandas as pd
 import plotly.graph_objects as go
-import numpy as np
+import option_chain_store
+import fundamentals_store
+import ohlcv_store
+import provider_guard
+import fetch_planner
+import scan_jobs
 import time
-from datetime import datetime
+from scoring_360 import score_fundamental
 
 # --- CONFIGURACIÓN ---
 st.set_page_config(layout="wide", page_title="SystemaTrader 360: Platinum V3 Fixed")
@@ -46,26 +50,21 @@ DB_CATEGORIES = {
 }
 CEDEAR_DATABASE = sorted(list(set([item for sublist in DB_CATEGORIES.values() for item in sublist])))
 
+# --- VENTANA DE HISTORIA (ver fetch_planner.py) ---
+# MA200, RSI y ATR de 14 (medias simples), HA de dos velas en D / W / M y la estacionalidad
+# del mes sobre SEASONALITY_YEARS años. La estacionalidad es la que fija la ventana.
+SEASONALITY_YEARS = 10
+HISTORY_PLAN = fetch_planner.plan({
+    '1d': ([('sma', 200), ('rolling_diff', 14), ('ha_fast',), ('seasonality', SEASONALITY_YEARS)], 1),
+    '1wk': ([('ha_fast',)], 1),
+    '1mo': ([('ha_fast',)], 1),
+})
+HISTORY_PERIOD = HISTORY_PLAN['fetch']['1d']
+
 # --- ESTADO (V15 - FIX CRASH) ---
 # Cambiamos el nombre de la variable para forzar limpieza de memoria
 if 'st360_db_v15' not in st.session_state: st.session_state['st360_db_v15'] = []
 
-# --- HELPERS MATEMÁTICOS ---
-def calculate_rsi(series, period=14):
-    delta = series.diff()
-    gain = (delta.where(delta > 0, 0)).rolling(window=period).mean()
-    loss = (-delta.where(delta < 0, 0)).rolling(window=period).mean()
-    rs = gain / loss
-    return 100 - (100 / (1 + rs))
-
-def calculate_atr(df, period=14):
-    high_low = df['High'] - df['Low']
-    high_close = np.abs(df['High'] - df['Close'].shift())
-    low_close = np.abs(df['Low'] - df['Close'].shift())
-    ranges = pd.concat([high_low, high_close, low_close], axis=1)
-    true_range = np.max(ranges, axis=1)
-    return true_range.rolling(period).mean()
-
 # --- ALERTAS VISUALES ---
 def get_rsi_alert(rsi):
     if rsi > 70: return "⚠️ SOBRECOMPRA", "#FFEBEE", "#C62828"
@@ -79,231 +78,67 @@ def get_atr_alert(atr, price):
     if atr_pct < 1.5: return f"🐢 LENTO ({atr_pct:.1f}%)", "#F3E5F5", "#6A1B9A"
     return f"✨ NORMAL ({atr_pct:.1f}%)", "#E0F2F1", "#00695C"
 
-# --- MOTOR DE CÁLCULO ---
-
-def get_technical_score(df):
-    try:
-        score = 0; details = []
-        # HA Matrix
-        ha_close = (df['Open']+df['High']+df['Low']+df['Close'])/4
-        ha_open = (df['Open'].shift(1)+df['Close'].shift(1))/2
-        if ha_close.iloc[-1] > ha_open.iloc[-1]: score+=1; details.append("HA Diario Alcista")
-        
-        df_w = df.resample('W').agg({'Open':'first','High':'max','Low':'min','Close':'last'})
-        if not df_w.empty:
-            ha_cw = (df_w['Open']+df_w['High']+df_w['Low']+df_w['Close'])/4
-            ha_ow = (df_w['Open'].shift(1)+df_w['Close'].shift(1))/2
-            if ha_cw.iloc[-1] > ha_ow.iloc[-1]: score+=1; details.append("HA Semanal Alcista")
-        
-        df_m = df.resample('ME').agg({'Open':'first','High':'max','Low':'min','Close':'last'})
-        if not df_m.empty:
-            ha_cm = (df_m['Open']+df_m['High']+df_m['Low']+df_m['Close'])/4
-            ha_om = (df_m['Open'].shift(1)+df_m['Close'].shift(1))/2
-            if ha_cm.iloc[-1] > ha_om.iloc[-1]: score+=1; details.append("HA Mensual Alcista")
-
-        # Medias
-        price = df['Close'].iloc[-1]
-        ma20 = df['Close'].rolling(20).mean().iloc[-1]
-        ma50 = df['Close'].rolling(50).mean().iloc[-1]
-        ma200 = df['Close'].rolling(200).mean().iloc[-1]
-        if price > ma20: score+=1; details.append("> MA20")
-        if ma20 > ma50: score+=2; details.append("MA20 > MA50")
-        if price > ma200: score+=2; details.append("> MA200")
-
-        rsi = calculate_rsi(df['Close']).iloc[-1]
-        if 40 <= rsi <= 65: score += 2 
-        elif rsi > 70: score -= 2
-        elif rsi < 30: score += 1
-            
-        return max(0, min(10, score)), details, rsi
-    except: return 0, ["Error Tec"], 50
-
-def get_options_data(ticker, price, tk_obj):
-    def_res = (5, "Sin Opciones", 0, 0, 0, "N/A", 0)
-    try:
-        try: exps = tk_obj.options
-        except: return def_res
-        if not exps: return def_res
-        
-        opt = tk_obj.option_chain(exps[0])
-        calls, puts = opt.calls, opt.puts
-        if calls.empty or puts.empty: return def_res
-        
-        t_call, t_put = calls['openInterest'].sum(), puts['openInterest'].sum()
-        pcr = t_put / t_call if t_call > 0 else 0
-        if pcr < 0.6: sentiment = "🚀 EUFORIA"
-        elif pcr > 1.4: sentiment = "🐻 MIEDO"
-        else: sentiment = "⚖️ NEUTRAL"
-
-        cw = calls.loc[calls['openInterest'].idxmax()]['strike']
-        pw = puts.loc[puts['openInterest'].idxmax()]['strike']
-        
-        strikes = sorted(list(set(calls['strike'].tolist() + puts['strike'].tolist())))
-        rel = [s for s in strikes if price*0.7 < s < price*1.3] or strikes
-        cash = []
-        for s in rel:
-            c_loss = calls.apply(lambda r: max(0, s-r['strike'])*r['openInterest'], axis=1).sum()
-            p_loss = puts.apply(lambda r: max(0, r['strike']-s)*r['openInterest'], axis=1).sum()
-            cash.append(c_loss+p_loss)
-        mp = rel[np.argmin(cash)] if cash else price
-
-        score = 5
-        detail = "Rango Medio"
-        if price > cw: score=10; detail="🚀 Breakout"
-        elif price < pw: score=1; detail="💀 Breakdown"
-        else:
-            rng = cw - pw
-            if rng > 0:
-                score = 10 - ((price - pw)/rng * 10)
-                if score > 8: detail="🟢 Soporte"
-                elif score < 2: detail="🧱 Resistencia"
-        
-        return score, detail, cw, pw, mp, sentiment, pcr
-    except: return def_res
-
-def get_seasonality_score(df):
-    try:
-        curr_m = datetime.now().month
-        m_ret = df['Close'].resample('ME').last().pct_change()
-        hist = m_ret[m_ret.index.month == curr_m]
-        
-        if len(hist)<2: return 5, "N/A", 0
-        
-        win = (hist>0).mean()
-        avg = hist.mean()
-        score = win * 6
-        if avg > 0.01: score += 4
-        elif avg > 0: score += 2
-        else: score -= 2
-        
-        wins = hist[hist>0]; losses = hist[hist<0]
-        avg_w = wins.mean() if not wins.empty else 0
-        avg_l = abs(losses.mean()) if not losses.empty else 0
-        
-        warning = ""
-        if avg_l > (avg_w * 2) and avg_l > 0.03:
-            score -= 3; warning = "⚠️ RIESGO"
-            
-        return max(0, min(10, score)), f"WR: {win:.0%}", avg
-    except: return 5, "N/A", 0
-
-def get_fundamental_score(tk_obj):
-    score = 0; details = []; tags = []
-    try:
-        info = tk_obj.info
-        if not info: return 5, ["Sin datos"], []
-        
-        # 1. Valuation
-        peg = info.get('pegRatio', None)
-        if peg:
-            if peg < 1.0: score+=3; details.append(f"Subvaluada (PEG {peg})"); tags.append("💎 BARATA")
-            elif peg < 2.0: score+=2; details.append(f"Precio Justo (PEG {peg})")
-            else: details.append(f"Cara (PEG {peg})"); tags.append("💰 CARA")
-        else:
-            pe = info.get('forwardPE', 25)
-            if pe < 15: score+=2; details.append("P/E Bajo"); tags.append("💎 BARATA")
-            else: score+=1
-            
-        # 2. Rentabilidad
-        marg = info.get('profitMargins', 0)
-        if marg > 0.2: score+=3; details.append("Márgenes Top"); tags.append("👑 CALIDAD")
-        elif marg > 0.1: score+=2; details.append("Rentable")
-        elif marg > 0: score+=1
-        else: details.append("⚠️ Pierde Dinero"); tags.append("🔥 QUEMA CAJA")
-        
-        # 3. Crecimiento
-        rev_g = info.get('revenueGrowth', 0)
-        if rev_g > 0.15: score+=2; details.append("Alto Crecimiento"); tags.append("🚀 GROWTH")
-        elif rev_g > 0: score+=1
-        
-        # 4. Analistas
-        curr = info.get('currentPrice', 0)
-        tgt = info.get('targetMeanPrice', 0)
-        if tgt > 0 and curr > 0:
-            upside = (tgt - curr)/curr
-            if upside > 0.2: score+=2; details.append(f"Analistas: +{upside:.0%}"); tags.append("📈 UPSIDE")
-            elif upside > 0.05: score+=1
-            
-        return min(10, score), details, tags
-    except: return 5, ["Error"], []
+# --- CARGA (I/O) ---
+def load_inputs(ticker):
+    """I/O de un ticker (corre en el pool de hilos de parallel_scoring.py)"""
+    try: df = ohlcv_store.history(ticker, "1d", HISTORY_PERIOD)
+    except Exception: df = None
+    try: chain = option_chain_store.nearest_chain(ticker)
+    except Exception: chain = None
+    return {'df': df, 'chain': chain, 'info': fundamentals_store.get(ticker)}
 
 def analyze_complete(ticker):
-    try:
-        tk = yf.Ticker(ticker)
-        df = tk.history(period="10y") 
-        if df.empty: return None
-        price = df['Close'].iloc[-1]
-        
-        s_tec, d_tec, rsi = get_technical_score(df)
-        s_opt, d_opt, cw, pw, mp, sent, pcr = get_options_data(ticker, price, tk)
-        s_sea, d_sea, avg_ret = get_seasonality_score(df)
-        s_fun, d_fun, fun_tags = get_fundamental_score(tk)
-        
-        atr = calculate_atr(df).iloc[-1]
-        sl = price - (2 * atr)
-        tp = price + (3 * atr)
-        
-        final = (s_tec * 3.0) + (s_opt * 2.5) + (s_sea * 2.0) + (s_fun * 2.5)
-        
-        verdict = "NEUTRAL"
-        if final >= 75: verdict = "🔥 COMPRA FUERTE"
-        elif final >= 60: verdict = "✅ COMPRA"
-        elif final <= 30: verdict = "💀 VENTA FUERTE"
-        elif final <= 45: verdict = "🔻 VENTA"
-        
-        # Parsing WR
-        wr_val = 0
-        if "WR:" in d_sea:
-            try: wr_val = float(d_sea.split("%")[0].split(":")[-1].strip())
-            except: pass
-        
-        return {
-            "Ticker": ticker, "Price": price, "Score": final, "Verdict": verdict,
-            "S_Tec": s_tec, "RSI": rsi, "D_Tec": d_tec,
-            "S_Opt": s_opt, "Sentiment": sent, "CW": cw, "PW": pw, "Max_Pain": mp, "D_Opt": d_opt,
-            "S_Sea": s_sea, "D_Sea": d_sea, "WR": wr_val,
-            "S_Fun": s_fun, "D_Fun": d_fun, "Fun_Tags": fun_tags,
-            "ATR": atr, "SL": sl, "TP": tp,
-            "History": df
-        }
-    except: return None
+    return score_fundamental(ticker, load_inputs(ticker))
 
 # --- UI ---
 with st.sidebar:
     st.header("⚙️ Panel de Control")
     st.info(f"Base de Datos: {len(CEDEAR_DATABASE)} Activos")
     
-    batch_size = st.slider("Tamaño del Lote", 1, 10, 3)
+    batch_size = st.slider("Tamaño del Lote", 1, 50, 10)
     batches = [CEDEAR_DATABASE[i:i + batch_size] for i in range(0, len(CEDEAR_DATABASE), batch_size)]
     batch_labels = [f"Lote {i+1}: {b[0]} ... {b[-1]}" for i, b in enumerate(batches)]
     sel_batch = st.selectbox("Seleccionar Lote:", range(len(batches)), format_func=lambda x: batch_labels[x])
+    scan_all = st.checkbox(f"Universo completo ({len(CEDEAR_DATABASE)})")
     
     c1, c2 = st.columns(2)
     if c1.button("▶️ ESCANEAR", type="primary"):
-        targets = batches[sel_batch]
+        targets = CEDEAR_DATABASE if scan_all else batches[sel_batch]
         prog = st.progress(0)
+        # Fundamentales de todo el universo (solo los que no son del día van a la red)
+        fundamentals_store.load_snapshot(CEDEAR_DATABASE, on_progress=lambda i, n: prog.progress(i / n, text=f"Fundamentales {i}/{n}"))
+        prog.empty()
         # USAMOS V15 PARA EVITAR ERROR
-        mem = [x['Ticker'] for x in st.session_state['st360_db_v15']]
-        run = [t for t in targets if t not in mem]
-        for i, t in enumerate(run):
-            r = analyze_complete(t)
-            if r: st.session_state['st360_db_v15'].append(r)
-            prog.progress((i+1)/len(run))
-            time.sleep(0.5) 
-        prog.empty(); st.rerun()
+        st.session_state['st360_job_v15'] = scan_jobs.submit('fundamental_360', targets, load_inputs, score_fundamental,
+                                                             subscriber=scan_jobs.subscriber(st.session_state))
         
-    if c2.button("🗑️ Limpiar"): st.session_state['st360_db_v15'] = []; st.rerun()
+    if c2.button("🗑️ Limpiar"): st.session_state['st360_db_v15'] = []; scan_jobs.leave(st.session_state, 'st360_job_v15'); st.rerun()
+    # Avance del escaneo en segundo plano: los resultados se suman a medida que terminan
+    job = scan_jobs.merge(st.session_state.get('st360_job_v15'), st.session_state['st360_db_v15'])
+    if job:
+        st.caption(scan_jobs.describe(job))
+        if job['state'] in scan_jobs.ACTIVE:
+            st.progress(job['done'] / max(job['total'], 1))
+            if st.button("⏹️ Cancelar escaneo"):
+                # Solo se desuscribe esta sesión: si otra sigue el mismo escaneo, continúa para ella
+                scan_jobs.leave(st.session_state, 'st360_job_v15')
+                st.rerun()
     st.divider()
     mt = st.text_input("Ticker Manual:").upper().strip()
     if st.button("Analizar"):
         if mt:
             with st.spinner("Descargando Fundamentales..."):
+                fundamentals_store.load_snapshot([mt])
                 r = analyze_complete(mt)
                 if r:
                     st.session_state['st360_db_v15'] = [x for x in st.session_state['st360_db_v15'] if x['Ticker']!=mt]
                     st.session_state['st360_db_v15'].append(r)
                     st.rerun()
 
+    # Salud de los proveedores (ver provider_guard.py): errores, rechazos y latencias
+    with st.expander("📡 Proveedores"):
+        for line in provider_guard.report(): st.caption(line)
+
 st.title("SystemaTrader 360: Fundamental Edition")
 
 if st.session_state['st360_db_v15']:
@@ -443,4 +278,9 @@ if st.session_state['st360_db_v15']:
                 fig.update_layout(height=500, xaxis_rangeslider_visible=False, template="plotly_white", margin=dict(t=30, b=0, l=0, r=0))
                 st.plotly_chart(fig, use_container_width=True)
 
-else: st.info("👈 Escanea un lote (Paciencia: Fundamentales tardan más).")
+else: st.info("👈 Escanea un lote (los fundamentales se bajan una vez por día para todo el universo).")
+
+# Escaneo en curso: se vuelve a consultar el trabajo (ver scan_jobs.py)
+if job and job['state'] in scan_jobs.ACTIVE:
+    time.sleep(scan_jobs.POLL_S)
+    st.rerun()
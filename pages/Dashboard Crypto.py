@@ -1,5 +1,5 @@
 import streamlit as st
-import yfinance as yf
+import ohlcv_store
 import pandas as pd
 import numpy as np
 import time
@@ -95,7 +95,7 @@ def calculate_indicators(df):
 # --- CONTEXTO MACRO ---
 def get_macro():
     try:
-        btc = yf.Ticker("BTC-USD").history(period="3mo")
+        btc = ohlcv_store.yf_history("BTC-USD", period="3mo")
         if btc.empty: return "NEUTRAL", 0
         btc['EMA50'] = btc['Close'].ewm(span=50).mean()
         last = btc.iloc[-1]
@@ -108,7 +108,7 @@ def analyze(ticker_input):
     yf_symbol, display_name = resolve_ticker(ticker_input)
     
     try:
-        df = yf.Ticker(yf_symbol).history(period="6mo")
+        df = ohlcv_store.yf_history(yf_symbol, period="6mo")
         if df.empty: return None
         
         df = calculate_indicators(df)
@@ -1,11 +1,14 @@
 import streamlit as st
-import yfinance as yf
+import ohlcv_store
 import pandas as pd
 import pandas_ta as ta
 import plotly.graph_objects as go
 import numpy as np
 import time
 import re
+from heikin_ashi import calculate_heikin_ashi as ha_engine
+from panel_indicators import signal_state
+import scan_jobs
 
 # --- CONFIGURACIÓN ---
 st.set_page_config(page_title="Escáner Pro: Master Database", layout="wide")
@@ -74,43 +77,35 @@ TICKERS_DB = sorted([
     'GLD', 'SLV', 'GDX' # Commodities
 ])
 
+# Velas visibles en el gráfico por temporalidad y ventana de descarga del escaneo
+CHART_BARS = {"1mo": 1000, "1wk": 200, "1d": 200, "1h": 200}
+SCAN_PERIODS = {"1mo": "max", "1wk": "10y", "1d": "5y", "1h": "730d"}
+
 # --- FUNCIONES DE CÁLCULO (INTACTAS) ---
 
 def calculate_heikin_ashi(df):
-    """Calcula Heikin Ashi iterativo"""
-    df_ha = df.copy()
-    df_ha['HA_Close'] = (df['Open'] + df['High'] + df['Low'] + df['Close']) / 4
-    
-    ha_open = [df['Open'].iloc[0]]
-    for i in range(1, len(df)):
-        prev_open = ha_open[-1]
-        prev_close = df_ha['HA_Close'].iloc[i-1]
-        ha_open.append((prev_open + prev_close) / 2)
-        
-    df_ha['HA_Open'] = ha_open
-    df_ha['HA_High'] = df_ha[['High', 'HA_Open', 'HA_Close']].max(axis=1)
-    df_ha['HA_Low'] = df_ha[['Low', 'HA_Open', 'HA_Close']].min(axis=1)
-    
+    """Calcula Heikin Ashi (motor vectorizado compartido, con mechas)"""
     # 1 Verde, -1 Rojo
-    df_ha['Color'] = np.where(df_ha['HA_Close'] > df_ha['HA_Open'], 1, -1)
-    return df_ha
+    return ha_engine(df, seed='open', wicks=True)
 
-@st.cache_data(ttl=3600)
-def get_data(ticker, interval, period):
+def fetch_data(ticker, interval, period):
     try:
-        df = yf.download(ticker, interval=interval, period=period, progress=False, auto_adjust=True)
+        df = ohlcv_store.yf_download(ticker, interval=interval, period=period, progress=False, auto_adjust=True)
         if df.empty: return None
         if isinstance(df.columns, pd.MultiIndex):
             df.columns = df.columns.get_level_values(0)
         return df
     except: return None
 
-def analyze_ticker(ticker, interval, period, adx_len, adx_th):
+# Caché de Streamlit para el gráfico; los trabajos en segundo plano usan fetch_data (sin contexto de script)
+get_data = st.cache_data(ttl=3600)(fetch_data)
+
+def analyze_ticker(ticker, interval, period, adx_len, adx_th, fetch=get_data):
     """
     Devuelve la última señal y los datos para el gráfico.
     IMPORTANTE: Ahora devuelve también el 'interval' en los datos para guardarlo.
     """
-    df = get_data(ticker, interval, period)
+    df = fetch(ticker, interval, period)
     if df is None: return None, None, []
 
     # 1. Calcular ADX
@@ -123,25 +118,14 @@ def analyze_ticker(ticker, interval, period, adx_len, adx_th):
     # 2. Calcular HA
     df_ha = calculate_heikin_ashi(df)
     
-    # 3. Lógica de Señal
-    signals = []
-    in_position = False
-    
-    for i in range(1, len(df_ha)):
-        date = df_ha.index[i]
-        ha_color = df_ha['Color'].iloc[i]
-        adx_val = df_ha[adx_col].iloc[i]
-        price = df_ha['Close'].iloc[i]
-        
-        # Compra
-        if not in_position and ha_color == 1 and adx_val > adx_th:
-            in_position = True
-            signals.append({'Fecha': date, 'Tipo': '🟢 COMPRA', 'Precio': price, 'ADX': adx_val})
-            
-        # Venta
-        elif in_position and ha_color == -1:
-            in_position = False
-            signals.append({'Fecha': date, 'Tipo': '🔴 VENTA', 'Precio': price, 'ADX': adx_val})
+    # 3. Lógica de Señal (máquina de estados vectorizada)
+    res = signal_state(df_ha['Color'].to_numpy(), df_ha[adx_col].to_numpy(dtype=float), adx_th)
+    events = res['events'][0]
+    idx = np.flatnonzero(events)
+    closes = df_ha['Close'].to_numpy(dtype=float)
+    adxs = df_ha[adx_col].to_numpy(dtype=float)
+    signals = [{'Fecha': df_ha.index[i], 'Tipo': '🟢 COMPRA' if events[i] > 0 else '🔴 VENTA',
+                'Precio': closes[i], 'ADX': adxs[i]} for i in idx]
     
     last_signal = signals[-1] if signals else None
     
@@ -159,13 +143,16 @@ with st.sidebar:
     # Selección de Temporalidad
     interval = st.selectbox("Temporalidad de Escaneo", ["1mo", "1wk", "1d", "1h"], index=0)
     
-    # Mapeo de periodos automáticos
-    period_map = {"1mo": "max", "1wk": "10y", "1d": "5y", "1h": "730d"}
-    
     st.divider()
     st.subheader("Estrategia (ADX + HA)")
     adx_len = st.number_input("Longitud ADX", value=14)
     adx_th = st.number_input("Umbral ADX", value=20)
+
+    # Ventana por temporalidad. No sale del calentamiento (fetch_planner): el escaneo informa la
+    # última señal de toda la historia bajada y la máquina de posición depende del camino, así
+    # que acortar la ventana perdería señales viejas y podría cambiar la última.
+    period_map = SCAN_PERIODS
+    st.caption(f"Descarga {interval}: {period_map[interval]}")
     
     st.divider()
     st.subheader("1. Escaneo por Lotes")
@@ -186,6 +173,7 @@ with st.sidebar:
     st.divider()
     if st.button("🗑️ Borrar Resultados"):
         st.session_state['scan_results'] = []
+        scan_jobs.leave(st.session_state, 'scan_job')
         st.rerun()
 
 # --- APP PRINCIPAL ---
@@ -196,10 +184,7 @@ if 'scan_results' not in st.session_state:
 
 # --- FUNCIÓN DE PROCESAMIENTO ---
 def process_tickers(ticker_list, selected_interval):
-    prog_bar = st.progress(0)
-    status_text = st.empty()
-    new_results = []
-    
+    """Envía el escaneo a segundo plano (ver scan_jobs.py); las señales se suman al consultar el trabajo"""
     # 1. Limpieza de memoria INTELIGENTE
     current_data = st.session_state['scan_results']
     # Mantener los que NO son (Ticker actual Y Intervalo actual)
@@ -209,27 +194,16 @@ def process_tickers(ticker_list, selected_interval):
     ]
     st.session_state['scan_results'] = filtered_data
 
-    # 2. Escaneo
-    for i, t in enumerate(ticker_list):
-        status_text.text(f"Analizando {t} en {selected_interval}...")
-        
-        last_sig, _, _ = analyze_ticker(t, selected_interval, period_map[selected_interval], adx_len, adx_th)
-        
-        if last_sig:
-            last_sig['Ticker'] = t
-            new_results.append(last_sig)
-            
-        prog_bar.progress((i + 1) / len(ticker_list))
-        time.sleep(0.1) 
-    
-    # 3. Guardado
-    st.session_state['scan_results'].extend(new_results)
-    
-    status_text.empty(); prog_bar.empty()
-    if new_results:
-        st.success(f"Se actualizaron {len(new_results)} activos en temporalidad {selected_interval}.")
-    else:
-        st.warning(f"No se encontraron señales en {selected_interval} para estos activos.")
+    # 2. Escaneo (la última señal de cada ticker, o None)
+    period = period_map[selected_interval]
+    def scan(t):
+        last_sig, _, _ = analyze_ticker(t, selected_interval, period, adx_len, adx_th, fetch=fetch_data)
+        if last_sig: last_sig['Ticker'] = t
+        return last_sig
+    
+    st.session_state['scan_job'] = scan_jobs.submit('escaner_pro', ticker_list, scan,
+                                                    params=(selected_interval, period, int(adx_len), float(adx_th)),
+                                                    subscriber=scan_jobs.subscriber(st.session_state))
 
 # --- HANDLERS ---
 if scan_btn:
@@ -245,6 +219,20 @@ if custom_btn and custom_input:
     else:
         st.error("Lista vacía.")
 
+# 3. Guardado: las señales del trabajo se suman a medida que terminan
+job = scan_jobs.merge(st.session_state.get('scan_job'), st.session_state['scan_results'],
+                      key=lambda r: (r['Ticker'], r['Temporalidad']))
+if job:
+    st.caption(scan_jobs.describe(job))
+    if job['state'] in scan_jobs.ACTIVE:
+        st.progress(job['done'] / max(job['total'], 1))
+        if st.button("⏹️ Cancelar escaneo"):
+            # Solo se desuscribe esta sesión: si otra sigue el mismo escaneo, continúa para ella
+            scan_jobs.leave(st.session_state, 'scan_job')
+            st.rerun()
+    elif job['state'] == 'done' and not scan_jobs.results(job['id']):
+        st.warning("No se encontraron señales para estos activos.")
+
 # --- MOSTRAR RESULTADOS ---
 if st.session_state['scan_results']:
     
@@ -312,8 +300,7 @@ if st.session_state['scan_results']:
             
             if df_chart is not None:
                 # Filtrado visual
-                chart_limit = 200 if sel_interval != "1mo" else 1000
-                chart_data = df_chart.tail(chart_limit)
+                chart_data = df_chart.tail(CHART_BARS[sel_interval])
                 
                 fig = go.Figure()
 
@@ -364,3 +351,8 @@ if st.session_state['scan_results']:
 
 else:
     st.info("👈 Selecciona una temporalidad y escanea un lote.")
+
+# Escaneo en curso: se vuelve a consultar el trabajo (ver scan_jobs.py)
+if job and job['state'] in scan_jobs.ACTIVE:
+    time.sleep(scan_jobs.POLL_S)
+    st.rerun()
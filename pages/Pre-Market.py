@@ -1,7 +1,7 @@
 import streamlit as st
-import yfinance as yf
 import pandas as pd
-import time
+import quote_engine
+import single_flight
 
 # --- CONFIGURACIÓN ---
 st.set_page_config(layout="wide", page_title="SystemaTrader - Pre-Market Monitor")
@@ -51,50 +51,38 @@ def color_change(val):
     return ''
 
 # --- MOTOR DE DATOS EN VIVO (PRE-MARKET) ---
-# Cache corta de 1 minuto para no saturar pero mantener frescura
-@st.cache_data(ttl=60)
-def get_live_data(ticker_list):
+# Todo el universo se cotiza una sola vez (ver quote_engine.py) y cada panel filtra su lista
+def quotes_frame(quotes, ticker_list):
     data = []
-    
-    # Barra de progreso
-    prog = st.progress(0, text="Conectando con NYSE/NASDAQ (Live/Pre-Market)...")
-    total = len(ticker_list)
-    
-    # Creamos objeto Tickers para optimizar la inicialización
-    tickers_obj = yf.Tickers(" ".join(ticker_list))
-    
-    for i, t in enumerate(ticker_list):
-        try:
-            # fast_info accede a la data en tiempo real sin descargar histórico
-            info = tickers_obj.tickers[t].fast_info
-            
-            # last_price: Precio actual (incluye Pre-Market si el mercado está cerrado)
-            last_price = info.last_price
-            # previous_close: Cierre de la sesión anterior
-            prev_close = info.previous_close
-            
-            if last_price and prev_close:
-                change = last_price - prev_close
-                pct_change = ((last_price - prev_close) / prev_close) * 100
-                
-                data.append({
-                    "Symbol": t,
-                    "Precio Vivo ($)": last_price,
-                    "Cierre Ayer ($)": prev_close,
-                    "Cambio ($)": change,
-                    "% Var": pct_change
-                })
-        except:
-            # Si falla un ticker puntual, lo saltamos y seguimos
-            pass
-        
-        # Actualizamos la barra cada 3 activos para que sea visualmente fluido
-        if i % 3 == 0: 
-            prog.progress((i + 1) / total)
-            
-    prog.empty()
+    for t in ticker_list:
+        q = quotes.get(t)
+        # last: Precio actual (incluye Pre-Market) | prev: Cierre de la sesión anterior
+        if not q or not q['last'] or not q['prev']: continue
+        data.append({
+            "Symbol": t,
+            "Precio Vivo ($)": q['last'],
+            "Cierre Ayer ($)": q['prev'],
+            "Cambio ($)": q['last'] - q['prev'],
+            "% Var": ((q['last'] - q['prev']) / q['prev']) * 100
+        })
     return pd.DataFrame(data)
 
+SUMMARY_CONFIG = {
+    "Symbol": st.column_config.TextColumn("Activo", width="small"),
+    "Precio Vivo ($)": st.column_config.NumberColumn("Precio (Live)", format="$%.2f"),
+    "Cierre Ayer ($)": st.column_config.NumberColumn("Cierre Ayer", format="$%.2f"),
+    "Cambio ($)": st.column_config.NumberColumn("Dif", format="%.2f"),
+    "% Var": st.column_config.NumberColumn("Var %", format="%.2f%%")
+}
+
+def show_summary(slot, df):
+    if df.empty: return
+    slot.dataframe(
+        df.style.map(color_change, subset=['Cambio ($)', '% Var']),
+        column_config=SUMMARY_CONFIG,
+        use_container_width=True, hide_index=True, height=600
+    )
+
 # --- INTERFAZ ---
 st.title("🚀 SystemaTrader: Pre-Market Monitor")
 st.caption("Detecta Gaps y Movimientos en Tiempo Real (Datos de Mercado de Origen)")
@@ -102,61 +90,54 @@ st.caption("Detecta Gaps y Movimientos en Tiempo Real (Datos de Mercado de Orige
 col_btn, col_info = st.columns([1, 3])
 with col_btn:
     if st.button("⚡ ESCANEAR AHORA", type="primary"):
-        st.cache_data.clear()
+        quote_engine.clear()
         st.rerun()
 with col_info:
-    st.info("Nota: Este escáner revisa precio por precio. El escaneo total puede tardar unos 45 segundos.")
+    st.info("Nota: Las cotizaciones se piden en lotes y se refrescan cada 60 segundos.")
 
 # --- PESTAÑAS ---
 tab1, tab2 = st.tabs(["📺 Tablero Resumen", "🌎 Mercado Total (Todos)"])
 
 # === PESTAÑA 1: RESUMEN ===
+# Selección estratégica de Wall Street
+USA_SEL = MARKET_DATA["🇺🇸 Big Tech & AI"][:10] + ["MELI", "TSLA", "KO", "XOM"]
+UNIVERSE = sorted(set(ALL_TICKERS) | set(USA_SEL))
+
 with tab1:
     col1, col2 = st.columns(2)
     
     # ARGENTINA
     with col1:
         st.subheader("🇦🇷 Argentina (ADRs)")
-        df_arg = get_live_data(MARKET_DATA["🇦🇷 Argentina (ADRs)"])
-        
-        if not df_arg.empty:
-            st.dataframe(
-                df_arg.style.map(color_change, subset=['Cambio ($)', '% Var']),
-                column_config={
-                    "Symbol": st.column_config.TextColumn("Activo", width="small"),
-                    "Precio Vivo ($)": st.column_config.NumberColumn("Precio (Live)", format="$%.2f"),
-                    "Cierre Ayer ($)": st.column_config.NumberColumn("Cierre Ayer", format="$%.2f"),
-                    "Cambio ($)": st.column_config.NumberColumn("Dif", format="%.2f"),
-                    "% Var": st.column_config.NumberColumn("Var %", format="%.2f%%")
-                },
-                use_container_width=True, hide_index=True, height=600
-            )
+        slot_arg = st.empty()
 
     # EEUU
     with col2:
         st.subheader("🇺🇸 Wall Street (Selección)")
-        # Selección estratégica
-        usa_sel = MARKET_DATA["🇺🇸 Big Tech & AI"][:10] + ["MELI", "TSLA", "KO", "XOM"]
-        df_usa = get_live_data(usa_sel)
-        
-        if not df_usa.empty:
-            st.dataframe(
-                df_usa.style.map(color_change, subset=['Cambio ($)', '% Var']),
-                column_config={
-                    "Symbol": st.column_config.TextColumn("Activo", width="small"),
-                    "Precio Vivo ($)": st.column_config.NumberColumn("Precio (Live)", format="$%.2f"),
-                    "Cierre Ayer ($)": st.column_config.NumberColumn("Cierre Ayer", format="$%.2f"),
-                    "Cambio ($)": st.column_config.NumberColumn("Dif", format="%.2f"),
-                    "% Var": st.column_config.NumberColumn("Var %", format="%.2f%%")
-                },
-                use_container_width=True, hide_index=True, height=600
-            )
+        slot_usa = st.empty()
+
+def show_tab1(quotes):
+    show_summary(slot_arg, quotes_frame(quotes, MARKET_DATA["🇦🇷 Argentina (ADRs)"]))
+    show_summary(slot_usa, quotes_frame(quotes, USA_SEL))
+
+# Una sola pasada para ambas pestañas; las tablas se completan a medida que llegan los lotes
+prog = st.progress(0, text="Conectando con NYSE/NASDAQ (Live/Pre-Market)...")
+
+def on_partial(quotes):
+    prog.progress(min(len(quotes) / len(UNIVERSE), 1.0))
+    show_tab1(quotes)
+
+QUOTES = quote_engine.get_quotes(UNIVERSE, on_partial=on_partial)
+prog.empty()
+show_tab1(QUOTES)
+sf = single_flight.totals()
+col_info.caption(f"Pedidos de datos: {sf['issued']} emitidos | {sf['coalesced']} compartidos con otras sesiones")
 
 # === PESTAÑA 2: TODO EL MERCADO ===
 with tab2:
     c_sel, c_kpi = st.columns([3, 1])
     with c_sel:
-        sector = st.selectbox("Seleccionar Sector:", ["TODOS (Puede tardar 1 min)"] + list(MARKET_DATA.keys()))
+        sector = st.selectbox("Seleccionar Sector:", ["TODOS"] + list(MARKET_DATA.keys()))
     
     # Lógica de Selección
     if "TODOS" in sector:
@@ -165,8 +146,7 @@ with tab2:
         target = MARKET_DATA[sector]
     
     if st.button("🔎 Analizar Sector en Vivo"):
-        with st.spinner(f"Escaneando {len(target)} activos en tiempo real..."):
-            df_all = get_live_data(target)
+        df_all = quotes_frame(QUOTES, target)
         
         if not df_all.empty:
             # Ordenar por Mayor Variación (Volatilidad Pre-Market)
@@ -1,8 +1,15 @@
+import os
 import streamlit as st
-import ccxt
 import pandas as pd
 import pandas_ta as ta
 import time
+from heikin_ashi import calculate_heikin_ashi as ha_engine, OHLC_LOWER
+import crypto_fetch
+import crypto_stream
+import exchange_pool
+import fetch_planner
+import ohlcv_store
+import provider_guard
 
 # --- CONFIGURACIÓN ---
 st.set_page_config(layout="wide", page_title="SystemaTrader - KuCoin Matrix Pro")
@@ -32,19 +39,49 @@ DEEP_TASKS = [
     ('1W',  '1w',  True, False, False)  # Solo RSI
 ]
 
+# Velas por pedido según el calentamiento de cada indicador (ver fetch_planner.py):
+# HA recursivo -> 50 + la vela actual; RSI 14 de Wilder -> 140 + las dos últimas (variaciones)
+HA_BARS = fetch_planner.bars_needed([('ha',)])
+DEEP_BARS = fetch_planner.bars_needed([('rsi', 14)], keep=2)
+
+# --- STREAMING (WEBSOCKET) ---
+# Velas por WebSocket (ccxt.pro) para los activos de la tabla. Con CRYPTO_STREAM_REPLAY=<cinta.jsonl>
+# se reproduce una cinta grabada en lugar del exchange (ver crypto_stream.py).
+STREAM_TFS = {'1H': '1h', '4H': '4h', 'Diario': '1d'}
+STREAM_MAX = 30
+STREAM_REFRESH = 2
+STREAM_REPLAY = os.environ.get("CRYPTO_STREAM_REPLAY")
+
+def make_stream_source():
+    if STREAM_REPLAY: return crypto_stream.replay_source(STREAM_REPLAY)
+    return crypto_stream.pro_source('kucoinfutures')
+
+def seed_stream(symbol, tf):
+    if STREAM_REPLAY: return []
+    return ohlcv_store.fetch_ohlcv(exchange_pool.get_client('kucoinfutures'), symbol, tf, 100)
+
+def stream_frame(store):
+    views = crypto_stream.snapshot(store)
+    rows = []
+    for symbol in dict.fromkeys(sym for sym, _ in store['series']):
+        row = {'Activo': symbol.replace(':USDT', '')}
+        for lbl, tf in STREAM_TFS.items():
+            v = views.get((symbol, tf))
+            row[lbl] = "⚪" if v is None else ("🟢" if v['ha_color'] == 1 else "🔴")
+        v = views.get((symbol, '1h'))
+        if v is None: continue
+        quote = store['quotes'].get(symbol) or {}
+        row['Precio'] = quote.get('last') or v['price']
+        row['RSI 1H'] = v['rsi']
+        row['P% 1H'] = v['p_chg']
+        row['V% 1H'] = v['v_chg']
+        rows.append(row)
+    return pd.DataFrame(rows)
+
 # --- FUNCIONES MATEMÁTICAS ---
 def calculate_heikin_ashi(df):
     if df is None or df.empty or len(df) < 2: return pd.DataFrame()
-    df_ha = df.copy()
-    df_ha['HA_Close'] = (df['open'] + df['high'] + df['low'] + df['close']) / 4
-    df_ha['HA_Open'] = 0.0
-    df_ha.iat[0, df_ha.columns.get_loc('HA_Open')] = (df.iloc[0]['open'] + df.iloc[0]['close']) / 2
-    vals = df_ha.values
-    idx_open, idx_close = df_ha.columns.get_loc('HA_Open'), df_ha.columns.get_loc('HA_Close')
-    for i in range(1, len(vals)):
-        vals[i, idx_open] = (vals[i-1, idx_open] + vals[i-1, idx_close]) / 2
-    df_ha['HA_Open'] = vals[:, idx_open]
-    return df_ha
+    return ha_engine(df, seed='mid', cols=OHLC_LOWER)
 
 def get_metrics(df, length=14):
     """Calcula RSI, Variación Precio y Variación Volumen"""
@@ -75,90 +112,100 @@ def get_metrics(df, length=14):
 @st.cache_data(ttl=3600)
 def get_active_pairs():
     try:
-        exchange = ccxt.kucoinfutures({'enableRateLimit': True})
-        markets = exchange.load_markets()
+        # Mercados del pool (disco / memoria): sin load_markets al abrir la página
+        markets = exchange_pool.get_client('kucoinfutures').markets
         valid = [s for s in markets if markets[s]['quote'] == 'USDT' and markets[s]['active']]
         majors = ['BTC/USDT:USDT', 'ETH/USDT:USDT', 'SOL/USDT:USDT', 'XRP/USDT:USDT', 'BNB/USDT:USDT']
         return [p for p in majors if p in valid] + sorted([p for p in valid if p not in majors])
     except: return []
 
+def _ha_row(symbol, fetched):
+    row = {'Activo': symbol.replace(':USDT', ''), 'Symbol_Raw': symbol}
+    greens = 0
+    valid_tfs = 0
+    
+    for tf_lbl, tf_code in TIMEFRAMES_HA.items():
+        try:
+            ohlcv = fetched.get(tf_code)
+            if isinstance(ohlcv, Exception): raise ohlcv
+            if not ohlcv or len(ohlcv) < 2:
+                row[tf_lbl] = "⚪"
+                continue
+            
+            df = pd.DataFrame(ohlcv, columns=['time','open','high','low','close','vol'])
+            df_ha = calculate_heikin_ashi(df)
+            last = df_ha.iloc[-1]
+            
+            if last['HA_Close'] >= last['HA_Open']:
+                row[tf_lbl] = "🟢"
+                greens += 1
+            else:
+                row[tf_lbl] = "🔴"
+            valid_tfs += 1
+        except: row[tf_lbl] = "⚠️"
+    
+    if valid_tfs == 0: return None
+    ratio = greens / valid_tfs
+    if ratio == 1.0: row['Diagnóstico'] = "🔥 FULL ALCISTA"
+    elif ratio == 0.0: row['Diagnóstico'] = "❄️ FULL BAJISTA"
+    elif ratio >= 0.75: row['Diagnóstico'] = "✅ ALCISTA FUERTE"
+    elif ratio <= 0.25: row['Diagnóstico'] = "🔻 BAJISTA FUERTE"
+    else: row['Diagnóstico'] = "⚖️ MIXTO"
+    return row
+
 def scan_batch_ha(targets):
-    exchange = ccxt.kucoinfutures({'enableRateLimit': True, 'timeout': 30000})
-    results = []
+    """Todas las temporalidades de todo el lote en paralelo (ver crypto_fetch.py)"""
+    results = {}
     prog = st.progress(0, text="Escaneando Tendencias...")
     total = len(targets)
-    
-    for idx, symbol in enumerate(targets):
-        prog.progress((idx)/total, text=f"Tendencia: {symbol}")
-        row = {'Activo': symbol.replace(':USDT', ''), 'Symbol_Raw': symbol}
-        greens = 0
-        valid_tfs = 0
-        
-        for tf_lbl, tf_code in TIMEFRAMES_HA.items():
-            try:
-                limit = 12 if tf_code == '1M' else 30
-                ohlcv = exchange.fetch_ohlcv(symbol, timeframe=tf_code, limit=limit)
-                if not ohlcv or len(ohlcv) < 2:
-                    row[tf_lbl] = "⚪"
-                    continue
-                
+    jobs = [(tf_code, HA_BARS) for tf_code in TIMEFRAMES_HA.values()]
+
+    done = [0]
+
+    def on_symbol(symbol, fetched):
+        row = _ha_row(symbol, fetched)
+        if row: results[symbol] = row
+        done[0] += 1
+        prog.progress(done[0] / total, text=f"Tendencia: {symbol}")
+
+    crypto_fetch.scan_symbols(targets, jobs, on_symbol)
+    prog.empty()
+    # Mismo orden que el lote (las respuestas llegan en cualquier orden)
+    return pd.DataFrame([results[s] for s in targets if s in results])
+
+def _deep_row(symbol, fetched):
+    row = {'Activo': symbol.replace(':USDT', '')}
+    for lbl, tf, get_rsi, get_price, get_vol in DEEP_TASKS:
+        try:
+            ohlcv = fetched.get(tf)
+            if isinstance(ohlcv, Exception): continue  # Si falla, queda vacío
+            if ohlcv:
                 df = pd.DataFrame(ohlcv, columns=['time','open','high','low','close','vol'])
-                df_ha = calculate_heikin_ashi(df)
-                last = df_ha.iloc[-1]
+                m = get_metrics(df)
                 
-                if last['HA_Close'] >= last['HA_Open']:
-                    row[tf_lbl] = "🟢"
-                    greens += 1
-                else:
-                    row[tf_lbl] = "🔴"
-                valid_tfs += 1
-            except: row[tf_lbl] = "⚠️"
-        
-        if valid_tfs > 0:
-            ratio = greens / valid_tfs
-            if ratio == 1.0: row['Diagnóstico'] = "🔥 FULL ALCISTA"
-            elif ratio == 0.0: row['Diagnóstico'] = "❄️ FULL BAJISTA"
-            elif ratio >= 0.75: row['Diagnóstico'] = "✅ ALCISTA FUERTE"
-            elif ratio <= 0.25: row['Diagnóstico'] = "🔻 BAJISTA FUERTE"
-            else: row['Diagnóstico'] = "⚖️ MIXTO"
-            results.append(row)
-        
-        time.sleep(0.2)
-    prog.empty()
-    return pd.DataFrame(results)
+                if get_rsi: row[f'RSI {lbl}'] = m['rsi']
+                if get_price: row[f'P% {lbl}'] = m['p_chg']
+                if get_vol: row[f'V% {lbl}'] = m['v_chg']
+            else:
+                if get_rsi: row[f'RSI {lbl}'] = 50.0
+        except:
+            pass
+    return row
 
 def scan_deep_metrics(targets):
     """Escaneo profundo: RSI + Precio + Volumen"""
-    exchange = ccxt.kucoinfutures({'enableRateLimit': True, 'timeout': 30000})
-    results = []
+    results = {}
     prog = st.progress(0, text="Analizando Métricas...")
     total = len(targets)
-    
-    for idx, symbol in enumerate(targets):
-        prog.progress((idx)/total, text=f"Analizando: {symbol}")
-        clean_name = symbol.replace(':USDT', '')
-        row = {'Activo': clean_name}
-        
-        for lbl, tf, get_rsi, get_price, get_vol in DEEP_TASKS:
-            try:
-                ohlcv = exchange.fetch_ohlcv(symbol, timeframe=tf, limit=30)
-                if ohlcv:
-                    df = pd.DataFrame(ohlcv, columns=['time','open','high','low','close','vol'])
-                    m = get_metrics(df)
-                    
-                    if get_rsi: row[f'RSI {lbl}'] = m['rsi']
-                    if get_price: row[f'P% {lbl}'] = m['p_chg']
-                    if get_vol: row[f'V% {lbl}'] = m['v_chg']
-                else:
-                    if get_rsi: row[f'RSI {lbl}'] = 50.0
-            except:
-                pass # Si falla, queda vacío
-        
-        results.append(row)
-        time.sleep(0.25) # Pausa necesaria
-        
+    jobs = [(tf, DEEP_BARS) for _, tf, _, _, _ in DEEP_TASKS]
+
+    def on_symbol(symbol, fetched):
+        results[symbol] = _deep_row(symbol, fetched)
+        prog.progress(len(results) / total, text=f"Analizando: {symbol}")
+
+    crypto_fetch.scan_symbols(targets, jobs, on_symbol)
     prog.empty()
-    return pd.DataFrame(results)
+    return pd.DataFrame([results[s] for s in targets if s in results])
 
 # --- UI PRINCIPAL ---
 st.title("⚡ SystemaTrader: KuCoin Matrix Pro")
@@ -175,7 +222,9 @@ with st.sidebar:
         st.divider()
         st.header("1. Escaneo de Tendencia")
         
-        BATCH_SIZE = st.selectbox("Tamaño Lote:", [10, 20, 50], index=1)
+        # Con la descarga concurrente se puede escanear todo el mercado de una vez
+        BATCH_SIZE = st.selectbox("Tamaño Lote:", [10, 20, 50, 0], index=1, format_func=lambda x: "Todos" if x == 0 else x)
+        BATCH_SIZE = BATCH_SIZE or len(all_symbols)
         batches = [all_symbols[i:i + BATCH_SIZE] for i in range(0, len(all_symbols), BATCH_SIZE)]
         batch_opts = [f"Lote {i+1} ({b[0].split('/')[0]}...)" for i, b in enumerate(batches)]
         sel_batch = st.selectbox("Elegir Lote:", range(len(batches)), format_func=lambda x: batch_opts[x])
@@ -199,8 +248,45 @@ with st.sidebar:
         if st.button("Limpiar Tabla"):
             st.session_state['crypto_results'] = []
             st.rerun()
+
+        st.divider()
+        st.header("2. Modo Streaming")
+        live = st.toggle("📡 En vivo (WebSocket)", value=False, help=f"Primeros {STREAM_MAX} activos de la tabla")
     else:
         st.error("Error de conexión.")
+        live = False
+
+    # Salud de los proveedores (ver provider_guard.py): errores, rechazos y latencias
+    with st.expander("📡 Proveedores"):
+        for line in provider_guard.report(): st.caption(line)
+
+# --- SECCIÓN 0: STREAMING ---
+stream_symbols = [x['Symbol_Raw'] for x in st.session_state['crypto_results']][:STREAM_MAX]
+stream_key = (STREAM_REPLAY or 'kucoinfutures', tuple(stream_symbols))
+if st.session_state.get('stream_key') not in (None, stream_key) or not live:
+    # Cambió la tabla o se apagó el modo en vivo: se corta el stream anterior
+    if st.session_state.get('stream_key'): crypto_stream.stop(st.session_state.pop('stream_key'))
+
+if live and stream_symbols:
+    store = crypto_stream.start(stream_key, make_stream_source, stream_symbols, list(STREAM_TFS.values()), seed=seed_stream)
+    st.session_state['stream_key'] = stream_key
+    st.subheader("📡 En Vivo (WebSocket)")
+    df_live = stream_frame(store)
+    if store['error']: st.error(f"Stream detenido: {store['error']}")
+    if not df_live.empty:
+        st.dataframe(
+            df_live,
+            column_config={
+                "Activo": st.column_config.TextColumn("Crypto", width="small"),
+                "Precio": st.column_config.NumberColumn("Precio", format="$%.4f"),
+                "RSI 1H": st.column_config.NumberColumn("RSI 1h", format="%.0f"),
+                "P% 1H": st.column_config.NumberColumn("P% 1H", format="%.2f%%"),
+                "V% 1H": st.column_config.NumberColumn("V% 1H", format="%.2f%%"),
+            },
+            use_container_width=True, hide_index=True
+        )
+    st.caption(f"Eventos: {store['stats']['events']} | Velas cerradas: {store['stats']['closes']}")
+    st.divider()
 
 # --- SECCIÓN 1: TABLA DE TENDENCIAS ---
 if st.session_state['crypto_results']:
@@ -292,3 +378,8 @@ if st.session_state['crypto_results']:
 
 else:
     st.info("👈 Escanea un lote para comenzar.")
+
+# --- REFRESCO DEL MODO EN VIVO ---
+if live and stream_symbols:
+    time.sleep(STREAM_REFRESH)
+    st.rerun()
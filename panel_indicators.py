@@ -0,0 +1,188 @@
+import numpy as np
+import pandas as pd
+from heikin_ashi import ha_close, ha_open
+
+# --- MOTOR DE PANEL (TICKERS x BARRAS) ---
+# Todo el universo se calcula de una vez sobre arrays de forma (n_tickers, n_barras).
+# Para respetar el `dropna()` por ticker de los bots, las barras válidas de cada ticker
+# se compactan a la izquierda ("pack"): así las historias más cortas o con huecos
+# producen exactamente la misma recurrencia que la serie individual, y el relleno
+# (NaN) queda al final de cada fila, donde no contamina ningún cálculo.
+
+FIELDS = ('Open', 'High', 'Low', 'Close', 'Volume')
+
+def panel_from_download(data, tickers, fields=FIELDS):
+    """
+    Convierte el resultado de yf.download(..., group_by='ticker') en un panel:
+    {'tickers', 'index', 'Open': array(n_tickers, n_barras), ...}.
+    Tickers ausentes quedan como filas NaN.
+    """
+    tickers = list(tickers)
+    n_bars = len(data.index)
+    panel = {'tickers': tickers, 'index': data.index}
+    multi = isinstance(data.columns, pd.MultiIndex)
+    top = set(data.columns.get_level_values(0)) if multi else set()
+
+    for f in fields:
+        block = np.full((len(tickers), n_bars), np.nan)
+        for i, t in enumerate(tickers):
+            if multi and t in top and f in data[t].columns:
+                block[i] = data[t][f].to_numpy(dtype=float)
+            elif not multi and len(tickers) == 1 and f in data.columns:
+                block[i] = data[f].to_numpy(dtype=float)
+        panel[f] = block
+    return panel
+
+def panel_from_frame(df, fields=FIELDS):
+    """Panel de un solo ticker a partir de un DataFrame OHLC"""
+    panel = {'tickers': [None], 'index': df.index}
+    for f in fields:
+        if f in df.columns: panel[f] = df[f].to_numpy(dtype=float)[None, :]
+    return panel
+
+def pack_panel(panel, fields=FIELDS):
+    """
+    Compacta a la izquierda las barras válidas (todos los campos finitos) de cada ticker.
+    Agrega 'pos' (índice de columna original, -1 en el relleno) y 'n_valid'.
+    """
+    present = [f for f in fields if f in panel]
+    valid = np.ones(panel[present[0]].shape, dtype=bool)
+    for f in present: valid &= np.isfinite(panel[f])
+
+    # Orden estable: válidas primero, respetando el orden temporal
+    order = np.argsort(~valid, axis=1, kind='stable')
+    n_valid = valid.sum(axis=1)
+    pad = np.arange(valid.shape[1])[None, :] >= n_valid[:, None]
+
+    packed = {'tickers': panel['tickers'], 'index': panel['index'], 'n_valid': n_valid}
+    packed['pos'] = np.where(pad, -1, order)
+    for f in present:
+        vals = np.take_along_axis(panel[f], order, axis=1)
+        vals[pad] = np.nan
+        packed[f] = vals
+    return packed
+
+# --- PRIMITIVAS ---
+def _shift(x):
+    out = np.empty_like(x)
+    out[:, 0] = np.nan
+    out[:, 1:] = x[:, :-1]
+    return out
+
+def _ewm(x, alpha, adjust=False, min_periods=0):
+    """EWM de pandas por fila (misma semántica de NaN que la versión por ticker)"""
+    return pd.DataFrame(x.T).ewm(alpha=alpha, adjust=adjust, min_periods=min_periods).mean().to_numpy().T
+
+def wilder(x, period):
+    return _ewm(x, 1 / period)
+
+def true_range(high, low, close):
+    prev_close = _shift(close)
+    # max(axis=1) de pandas ignora NaN: en la primera barra TR = High - Low
+    return np.fmax(high - low, np.fmax(np.abs(high - prev_close), np.abs(low - prev_close)))
+
+# --- INDICADORES ---
+def panel_adx(p, period=14):
+    """ADX de Wilder (idéntico a calculate_adx de los bots) para todo el panel"""
+    high, low, close = p['High'], p['Low'], p['Close']
+    tr = true_range(high, low, close)
+
+    up = high - _shift(high)
+    down = _shift(low) - low
+    with np.errstate(invalid='ignore'):
+        p_dm = np.where((up > down) & (up > 0), up, 0.0)
+        n_dm = np.where((down > up) & (down > 0), down, 0.0)
+
+    tr_s = wilder(tr, period)
+    tr_s = np.where(tr_s == 0, 1.0, tr_s)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        p_di = 100 * (wilder(p_dm, period) / tr_s)
+        n_di = 100 * (wilder(n_dm, period) / tr_s)
+        dx = 100 * np.abs(p_di - n_di) / (p_di + n_di)
+    return wilder(dx, period)
+
+def panel_ha(p, seed='open'):
+    """Heikin Ashi del panel: devuelve (HA_Close, HA_Open, Color 1/-1)"""
+    o, c = p['Open'], p['Close']
+    hc = ha_close(o, p['High'], p['Low'], c)
+    first = o[:, 0] if seed == 'open' else (o[:, 0] + c[:, 0]) / 2
+    ho = ha_open(hc, first)
+    with np.errstate(invalid='ignore'):
+        color = np.where(hc > ho, 1, -1).astype(np.int8)
+    return hc, ho, color
+
+def panel_rsi(close, period=14):
+    """RSI de Wilder (misma fórmula que pandas_ta.rsi)"""
+    delta = close - _shift(close)
+    with np.errstate(invalid='ignore'):
+        gain = np.where(delta > 0, delta, np.where(np.isnan(delta), np.nan, 0.0))
+        loss = np.where(delta < 0, -delta, np.where(np.isnan(delta), np.nan, 0.0))
+    avg_gain = _ewm(gain, 1 / period, adjust=True, min_periods=period)
+    avg_loss = _ewm(loss, 1 / period, adjust=True, min_periods=period)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return 100 * avg_gain / (avg_gain + avg_loss)
+
+def panel_atr(p, period=14):
+    """ATR como media simple del True Range (igual que calculate_atr de las páginas 360)"""
+    tr = true_range(p['High'], p['Low'], p['Close'])
+    return pd.DataFrame(tr.T).rolling(period).mean().to_numpy().T
+
+def with_indicators(p, adx_len=14, ha_seed='open'):
+    """Agrega ADX y Color HA al panel una sola vez (los reportes que comparten panel los reutilizan)"""
+    if p.get('adx_len') != adx_len:
+        p['ADX'], p['adx_len'] = panel_adx(p, adx_len), adx_len
+    if p.get('ha_seed') != ha_seed:
+        p['HA_Close'], p['HA_Open'], p['HA_Color'] = panel_ha(p, ha_seed)
+        p['ha_seed'] = ha_seed
+    return p
+
+# --- MÁQUINA DE ESTADOS HA + ADX ---
+def signal_state(color, adx, adx_th, n_valid=None):
+    """
+    Versión vectorizada del recorrido de get_last_signal:
+    entra cuando la vela HA es verde y ADX > umbral, sale con la primera vela roja.
+    Una vela verde con ADX débil no cambia el estado, así que el estado tras cada barra
+    es el último evento (entrada=1 / salida=0) propagado hacia adelante.
+    Devuelve {'state', 'events' (+1 compra, -1 venta, 0 nada), 'last_idx' (-1 sin señal)}.
+    """
+    color = np.atleast_2d(color)
+    adx = np.atleast_2d(adx)
+    n_bars = color.shape[1]
+    bar = np.arange(n_bars)[None, :]
+    if n_valid is None: n_valid = np.full(color.shape[0], n_bars)
+    inside = (bar < np.asarray(n_valid)[:, None]) & (bar > 0)  # el recorrido empieza en la barra 1
+
+    with np.errstate(invalid='ignore'):
+        entry = inside & (color == 1) & (adx > adx_th)
+    exit_ = inside & (color == -1)
+    mark = np.where(entry, 1, np.where(exit_, 0, -1)).astype(np.int8)
+
+    # Forward-fill del último evento: índice de la última barra marcada
+    last_mark = np.maximum.accumulate(np.where(mark >= 0, bar, 0), axis=1)
+    state = np.take_along_axis(mark, last_mark, axis=1)
+    state[state < 0] = 0
+
+    events = np.diff(state, axis=1, prepend=0).astype(np.int8)
+    last_idx = np.where(events != 0, bar, -1).max(axis=1)
+    return {'state': state, 'events': events, 'last_idx': last_idx}
+
+# --- LECTURA ---
+def last_values(x, n_valid, offset=1):
+    """Valor de la barra n_valid - offset de cada ticker (NaN si no existe)"""
+    idx = n_valid - offset
+    ok = idx >= 0
+    out = np.full(len(n_valid), np.nan)
+    out[ok] = x[np.nonzero(ok)[0], idx[ok]]
+    return out
+
+def ticker_bars(p, i, fields=('Open', 'High', 'Low', 'Close')):
+    """(index, *campos) con las barras válidas del ticker i de un panel compactado"""
+    n = int(p['n_valid'][i])
+    return (p['index'][p['pos'][i, :n]], *(p[f][i, :n] for f in fields))
+
+def unpack(x, p, fill=np.nan):
+    """Devuelve un array compactado a las posiciones originales del índice"""
+    out = np.full((x.shape[0], len(p['index'])), fill, dtype=float)
+    rows, cols = np.nonzero(p['pos'] >= 0)
+    out[rows, p['pos'][rows, cols]] = x[rows, cols]
+    return out
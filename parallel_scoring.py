@@ -0,0 +1,136 @@
+import multiprocessing
+import os
+import pickle
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+
+# --- PUNTUACIÓN EN PARALELO (HILOS PARA I/O + PROCESOS PARA CPU) ---
+# Cada ticker pasa por dos etapas:
+#   load(ticker)          -> datos (historia, cadena de opciones, fundamentales...). Corre en
+#                            un pool de hilos: las esperas de red se solapan.
+#   compute(ticker, data) -> resultado. Corre en un pool de procesos compartido (Max Pain,
+#                            resampleos y ventanas móviles sin pelear por el GIL), así que
+#                            compute tiene que ser una función de módulo (picklable).
+# Apenas termina la carga de un ticker su cálculo entra al pool de procesos, sin esperar al
+# resto. Los resultados vuelven en el mismo orden que `tickers` y on_progress se llama desde
+# el hilo que invoca (Streamlit solo deja tocar la UI desde el hilo del script).
+# Si el pool de procesos no está disponible, se rompe o no puede serializar los datos, el
+# cálculo corre en el hilo llamador; un error del propio cálculo deja None sin repetirlo.
+
+IO_WORKERS = 8
+CPU_WORKERS = max(1, min(4, (os.cpu_count() or 2) - 1))
+
+_POOL = None
+_LOCK = threading.Lock()
+
+def _process_pool():
+    """Pool de procesos compartido entre sesiones. 'spawn': hacer fork de un proceso con hilos no es seguro"""
+    global _POOL
+    with _LOCK:
+        if _POOL is None:
+            try: _POOL = ProcessPoolExecutor(max_workers=CPU_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+            except (OSError, ValueError, NotImplementedError): return None
+        return _POOL
+
+def _pool_failure(e):
+    """True si la excepción es del pool (roto o datos no picklables) y no del cálculo"""
+    if type(e).__name__ == 'BrokenProcessPool' or isinstance(e, pickle.PicklingError): return True
+    # "cannot pickle '...' object" / "Can't pickle local object ..."
+    return isinstance(e, (TypeError, AttributeError)) and 'pickle' in str(e).lower()
+
+def _discard_pool(pool):
+    global _POOL
+    with _LOCK:
+        if _POOL is pool: _POOL = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+def score(tickers, load, compute, processes=True, io_workers=IO_WORKERS, on_progress=None, on_result=None):
+    """
+    [compute(t, load(t)) for t in tickers] con las cargas en hilos y los cálculos en procesos.
+    Una carga o cálculo que lanza deja None en su lugar. on_progress(hechos, total, ticker) y
+    on_result(índice, ticker, resultado) se llaman a medida que termina cada ticker.
+    """
+    tickers = list(tickers)
+    results = [None] * len(tickers)
+    if not tickers: return results
+    cpu = _process_pool() if processes else None
+    loaded = {}
+    done = 0
+
+    def finish(i, value):
+        nonlocal done
+        results[i] = value
+        loaded.pop(i, None)
+        done += 1
+        if on_result: on_result(i, tickers[i], value)
+        if on_progress: on_progress(done, len(tickers), tickers[i])
+
+    def inline(i):
+        try: return compute(tickers[i], loaded[i])
+        except Exception: return None
+
+    with ThreadPoolExecutor(max_workers=io_workers, thread_name_prefix="scoring_io") as io:
+        pending = {io.submit(load, t): ('load', i) for i, t in enumerate(tickers)}
+        while pending:
+            finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in finished:
+                stage, i = pending.pop(fut)
+                if stage == 'load':
+                    try: loaded[i] = fut.result()
+                    except Exception:
+                        finish(i, None)
+                        continue
+                    if cpu is None:
+                        finish(i, inline(i))
+                        continue
+                    try: pending[cpu.submit(compute, tickers[i], loaded[i])] = ('compute', i)
+                    except RuntimeError:  # pool cerrado / roto
+                        _discard_pool(cpu); cpu = None
+                        finish(i, inline(i))
+                    continue
+                try: finish(i, fut.result())
+                except Exception as e:
+                    # Pool roto o datos no picklables: se recalcula acá. Un error del cálculo queda None
+                    if not _pool_failure(e):
+                        finish(i, None)
+                        continue
+                    if cpu is not None and type(e).__name__ == 'BrokenProcessPool':
+                        _discard_pool(cpu); cpu = None
+                    finish(i, inline(i))
+    return results
+
+# --- BENCHMARK (python parallel_scoring.py) ---
+def _synthetic_load(ticker, io_delay=0.15):
+    """Datos sintéticos deterministas por ticker con una espera de red simulada"""
+    import numpy as np
+    import pandas as pd
+    from options_analytics import _random_chain
+    time.sleep(io_delay)
+    rng = np.random.default_rng(sum(map(ord, ticker)))
+    idx = pd.bdate_range(end="2026-06-30", periods=504)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, len(idx))))
+    df = pd.DataFrame({'Open': close * (1 + rng.normal(0, 0.005, len(idx))), 'High': close * 1.01,
+                       'Low': close * 0.99, 'Close': close, 'Volume': rng.integers(1e5, 1e6, len(idx)).astype(float)},
+                      index=idx)
+    calls, puts = _random_chain(float(close[-1]), step=0.5, seed=len(ticker))
+    return {'df': df, 'chain': (calls, puts, "2026-07-17"), 'macro': ("BULLISH", "✅ Alcista en S&P 500", 15.0, "🟢 Calma", "S&P 500")}
+
+def run_benchmark(n=60):
+    from scoring_360 import score_gatillo
+    tickers = [f"T{i:03d}" for i in range(n)]
+
+    t0 = time.perf_counter()
+    ref = [score_gatillo(t, _synthetic_load(t)) for t in tickers]
+    t_seq = time.perf_counter() - t0
+
+    score(tickers[:1], _synthetic_load, score_gatillo)  # arranque del pool de procesos
+    t0 = time.perf_counter(); par = score(tickers, _synthetic_load, score_gatillo); t_par = time.perf_counter() - t0
+    t0 = time.perf_counter(); thr = score(tickers, _synthetic_load, score_gatillo, processes=False); t_thr = time.perf_counter() - t0
+
+    same = all(a['Score'] == b['Score'] == c['Score'] and a['Ticker'] == b['Ticker'] == c['Ticker'] for a, b, c in zip(ref, par, thr))
+    print(f"Puntuación 360 de {n} tickers | secuencial: {t_seq:.2f} s | hilos + procesos: {t_par:.2f} s | "
+          f"solo hilos: {t_thr:.2f} s | mismos resultados y orden: {same}")
+
+if __name__ == "__main__":
+    run_benchmark()
@@ -0,0 +1,236 @@
+import asyncio
+import bisect
+import functools
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+# --- GUARDIA DE PROVEEDORES (DEADLINE + REINTENTOS + CIRCUIT BREAKER) ---
+# Toda llamada a yfinance, ccxt o Telegram pasa por call() / call_async() con el nombre de
+# su endpoint ('proveedor.operación'). Cada endpoint tiene:
+#   - deadline: tiempo total (intentos + esperas) antes de abandonar la llamada.
+#   - reintentos con backoff exponencial y jitter completo (uniforme entre 0 y base * 2^k).
+#   - circuit breaker: tras `trip` fallas seguidas el endpoint queda abierto `cooldown`
+#     segundos y las llamadas fallan al instante (CircuitOpen); luego se deja pasar una de
+#     prueba (semiabierto) que lo cierra o lo vuelve a abrir.
+# Se registran latencias en un histograma de buckets logarítmicos (p50 / p95 / p99) y
+# contadores de llamadas, errores, timeouts, reintentos y rechazos por endpoint.
+# Las llamadas síncronas corren en un hilo del pool de su endpoint (`workers` hilos) para
+# poder cortar por deadline: si todavía no arrancó se cancela, y si ya corre el llamador
+# sigue y el hilo abandonado termina solo (además se pasa el timeout nativo de cada
+# librería cuando existe). Un endpoint colgado solo ocupa su propio pool.
+
+ENDPOINTS = {
+    'yf.download':   {'deadline': 60, 'retries': 1, 'base': 1.0},
+    'yf.history':    {'deadline': 20, 'retries': 1, 'base': 1.0},
+    'yf.info':       {'deadline': 20, 'retries': 1, 'base': 1.0},
+    'yf.options':    {'deadline': 20, 'retries': 1, 'base': 1.0},
+    'ccxt.ohlcv':    {'deadline': 20, 'retries': 2, 'base': 0.5},
+    'ccxt.markets':  {'deadline': 30, 'retries': 1, 'base': 1.0},
+    'telegram.send': {'deadline': 15, 'retries': 3, 'base': 1.0, 'workers': 2},
+}
+DEFAULT = {'deadline': 30, 'retries': 1, 'base': 0.5, 'cap': 8.0, 'trip': 5, 'cooldown': 30.0, 'workers': 16}
+
+# Buckets de latencia: 5 ms * 1.25^k hasta ~5 min
+BOUNDS = [0.005 * 1.25 ** k for k in range(50)]
+
+_LOCK = threading.Lock()
+_STATE = {}
+_POOLS = {}
+
+class CircuitOpen(RuntimeError):
+    """El endpoint está fallando: se rechaza sin ir a la red"""
+
+class DeadlineExceeded(TimeoutError):
+    """La llamada superó el deadline del endpoint"""
+
+class BadResponse(RuntimeError):
+    """Respuesta recibida pero inválida (vacía, HTTP de error): cuenta como falla"""
+
+class EmptyResult(BadResponse):
+    """Respuesta vacía para un solo símbolo (inválido o deslistado): error del llamador, no del endpoint"""
+    fatal = True
+
+def ccxt_fatal(e):
+    """Errores de ccxt que no se arreglan reintentando (símbolo inválido, pedido mal formado,
+    credenciales). Se reconocen por nombre de clase: CI no instala ccxt."""
+    return any(c.__name__ in ('BadRequest', 'BadSymbol', 'AuthenticationError', 'NotSupported')
+               for c in type(e).__mro__)
+
+def config(endpoint):
+    return {**DEFAULT, **ENDPOINTS.get(endpoint, {})}
+
+def _state(endpoint):
+    s = _STATE.get(endpoint)
+    if s is None:
+        s = _STATE[endpoint] = {'hist': [0] * (len(BOUNDS) + 1), 'calls': 0, 'errors': 0, 'timeouts': 0,
+                                'retries': 0, 'rejected': 0, 'failures': 0, 'open_until': 0.0, 'probing': False}
+    return s
+
+def _pool(endpoint, cfg):
+    with _LOCK:
+        pool = _POOLS.get(endpoint)
+        if pool is None:
+            pool = _POOLS[endpoint] = ThreadPoolExecutor(max_workers=cfg['workers'], thread_name_prefix=f"guard_{endpoint}")
+        return pool
+
+# --- CIRCUIT BREAKER ---
+def _admit(endpoint, cfg):
+    """True si la llamada puede salir. Semiabierto: solo una de prueba a la vez"""
+    now = time.monotonic()
+    with _LOCK:
+        s = _state(endpoint)
+        if s['failures'] < cfg['trip']: return True
+        if now >= s['open_until'] and not s['probing']:
+            s['probing'] = True
+            return True
+        s['rejected'] += 1
+        return False
+
+def _record(endpoint, cfg, elapsed, error=None, fatal=False):
+    with _LOCK:
+        s = _state(endpoint)
+        s['hist'][bisect.bisect_left(BOUNDS, elapsed)] += 1
+        s['calls'] += 1
+        s['probing'] = False
+        if error is None:
+            s['failures'] = 0
+            return
+        s['errors'] += 1
+        if isinstance(error, (DeadlineExceeded, asyncio.TimeoutError)): s['timeouts'] += 1
+        # Un error del llamador (fatal) no dice nada de la salud del endpoint
+        if fatal: return
+        s['failures'] += 1
+        if s['failures'] >= cfg['trip']:
+            s['open_until'] = time.monotonic() + cfg['cooldown']
+
+def _backoff(cfg, attempt):
+    return random.uniform(0, min(cfg['cap'], cfg['base'] * 2 ** attempt))
+
+def _retry_wait(endpoint, cfg, attempt, deadline_at):
+    """Espera antes del próximo intento, o None si no hay más intentos / no alcanza el deadline"""
+    if attempt >= cfg['retries']: return None
+    wait = _backoff(cfg, attempt)
+    if time.monotonic() + wait >= deadline_at: return None
+    with _LOCK: _state(endpoint)['retries'] += 1
+    return wait
+
+# --- LLAMADAS ---
+def call(endpoint, fn, *args, validate=None, fatal=None, **kwargs):
+    """
+    fn(*args, **kwargs) con deadline, reintentos y circuit breaker del endpoint.
+    validate(resultado) -> False marca la respuesta como falla (se reintenta igual que una excepción);
+    puede lanzar EmptyResult para una respuesta vacía que es culpa del pedido (no se reintenta ni cuenta).
+    fatal(excepción) -> True: se propaga sin reintentar y sin contar para el circuit breaker
+    (también las excepciones con atributo `fatal = True`, p.ej. data_provider.FixtureMissing).
+    Lanza CircuitOpen, DeadlineExceeded o la última excepción de fn.
+    """
+    cfg = config(endpoint)
+    deadline_at = time.monotonic() + cfg['deadline']
+    attempt = 0
+    while True:
+        if not _admit(endpoint, cfg):
+            raise CircuitOpen(f"{endpoint}: circuito abierto")
+        t0 = time.monotonic()
+        try:
+            fut = _pool(endpoint, cfg).submit(fn, *args, **kwargs)
+            try: result = fut.result(timeout=max(0.0, deadline_at - t0))
+            except FutureTimeout:
+                # Desde 3.11 FutureTimeout es TimeoutError: si fn terminó, la excepción es suya
+                if not fut.done():
+                    fut.cancel()   # si seguía en cola no sale nunca (un reintento no duplica el envío)
+                    raise DeadlineExceeded(f"{endpoint}: sin respuesta en {cfg['deadline']} s") from None
+                result = fut.result()
+            if validate is not None and not validate(result):
+                raise BadResponse(f"{endpoint}: respuesta inválida")
+        except Exception as e:
+            is_fatal = getattr(e, 'fatal', False) or bool(fatal and fatal(e))
+            _record(endpoint, cfg, time.monotonic() - t0, e, is_fatal)
+            wait = None if is_fatal or isinstance(e, DeadlineExceeded) else _retry_wait(endpoint, cfg, attempt, deadline_at)
+            if wait is None: raise
+            time.sleep(wait)
+            attempt += 1
+            continue
+        _record(endpoint, cfg, time.monotonic() - t0)
+        return result
+
+async def call_async(endpoint, make_coro, validate=None, fatal=None):
+    """Versión asyncio: make_coro() crea la corrutina de cada intento (p.ej. throttle + fetch)"""
+    cfg = config(endpoint)
+    deadline_at = time.monotonic() + cfg['deadline']
+    attempt = 0
+    while True:
+        if not _admit(endpoint, cfg):
+            raise CircuitOpen(f"{endpoint}: circuito abierto")
+        t0 = time.monotonic()
+        try:
+            try: result = await asyncio.wait_for(make_coro(), timeout=max(0.0, deadline_at - t0))
+            except asyncio.TimeoutError:
+                raise DeadlineExceeded(f"{endpoint}: sin respuesta en {cfg['deadline']} s") from None
+            if validate is not None and not validate(result):
+                raise BadResponse(f"{endpoint}: respuesta inválida")
+        except Exception as e:
+            is_fatal = getattr(e, 'fatal', False) or bool(fatal and fatal(e))
+            _record(endpoint, cfg, time.monotonic() - t0, e, is_fatal)
+            wait = None if is_fatal or isinstance(e, DeadlineExceeded) else _retry_wait(endpoint, cfg, attempt, deadline_at)
+            if wait is None: raise
+            await asyncio.sleep(wait)
+            attempt += 1
+            continue
+        _record(endpoint, cfg, time.monotonic() - t0)
+        return result
+
+def guarded(endpoint, validate=None, fatal=None):
+    """Decorador: la función pasa por call(endpoint, ...)"""
+    def wrap(fn):
+        @functools.wraps(fn)
+        def inner(*args, **kwargs):
+            return call(endpoint, fn, *args, validate=validate, fatal=fatal, **kwargs)
+        return inner
+    return wrap
+
+# --- MÉTRICAS ---
+def percentile(hist, q):
+    """Cota superior del bucket que contiene el percentil q (0-100); None sin datos"""
+    total = sum(hist)
+    if not total: return None
+    rank, acc = q / 100 * total, 0
+    for i, n in enumerate(hist):
+        acc += n
+        if acc >= rank: return BOUNDS[i] if i < len(BOUNDS) else float('inf')
+    return float('inf')
+
+def _summary(s, open_=False):
+    h = s['hist']
+    return {'calls': s['calls'], 'errors': s['errors'], 'timeouts': s['timeouts'], 'retries': s['retries'],
+            'rejected': s['rejected'], 'p50': percentile(h, 50), 'p95': percentile(h, 95),
+            'p99': percentile(h, 99), 'open': open_}
+
+def stats():
+    """{endpoint: {'calls', 'errors', 'timeouts', 'retries', 'rejected', 'p50', 'p95', 'p99', 'open'}} (segundos)"""
+    now = time.monotonic()
+    with _LOCK:
+        return {ep: _summary(s, s['failures'] >= config(ep)['trip'] and now < s['open_until'])
+                for ep, s in _STATE.items()}
+
+def provider_stats():
+    """Las mismas métricas sumadas por proveedor ('yf', 'ccxt', 'telegram')"""
+    out = {}
+    with _LOCK:
+        for ep, s in _STATE.items():
+            acc = out.setdefault(ep.split('.')[0], {'hist': [0] * (len(BOUNDS) + 1), 'calls': 0, 'errors': 0,
+                                                     'timeouts': 0, 'retries': 0, 'rejected': 0})
+            acc['hist'] = [a + b for a, b in zip(acc['hist'], s['hist'])]
+            for k in ('calls', 'errors', 'timeouts', 'retries', 'rejected'): acc[k] += s[k]
+    return {p: _summary(acc) for p, acc in out.items()}
+
+def report():
+    """Una línea por proveedor, para logs y páginas"""
+    def ms(v): return "-" if v is None else f"{v * 1000:.0f}"
+    return [f"{p}: {s['calls']} llamadas, {s['errors']} errores ({s['timeouts']} timeouts, {s['rejected']} rechazadas) | "
+            f"p50/p95/p99 {ms(s['p50'])}/{ms(s['p95'])}/{ms(s['p99'])} ms"
+            for p, s in sorted(provider_stats().items())]
+
+def reset():
+    with _LOCK: _STATE.clear()
@@ -0,0 +1,99 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import data_provider
+import ohlcv_store
+import provider_guard
+import single_flight
+from seasonality import close_panel
+
+# --- MOTOR DE COTIZACIONES EN LOTE (PRE-MARKET) ---
+# En lugar de un fast_info por símbolo (2-3 pedidos HTTP cada uno), el universo se parte en
+# lotes y cada lote se resuelve con dos descargas masivas: velas de 1 minuto con pre/post
+# market (último precio) y diarias sin ajustar (cierre de la sesión anterior). Los lotes
+# corren en un pool de hilos acotado y cada uno se entrega por callback al terminar.
+# El resultado queda en un caché por proceso con TTL corto, compartido por todas las vistas.
+
+CHUNK_SIZE = 40
+MAX_WORKERS = 4
+TTL = 60
+
+_CACHE = {}  # ticker -> (ts, {'last', 'prev'})
+_LOCK = threading.Lock()
+
+def _download(tickers, **kw):
+    try: return provider_guard.call('yf.download', data_provider.download, tickers, group_by='ticker', progress=False,
+                                    auto_adjust=False, threads=False, validate=ohlcv_store.rows_check(tickers), **kw)
+    except Exception: return None
+
+@single_flight.shared('quotes.chunk')
+def fetch_chunk(tickers):
+    """{ticker: {'last', 'prev'}} de un lote: último precio (incluye pre-market) y cierre anterior"""
+    live = _download(tickers, period='5d', interval='1m', prepost=True)
+    daily = _download(tickers, period='10d', interval='1d')
+    if live is None or live.empty or daily is None or daily.empty: return {}
+    live, daily = close_panel(live, tickers), close_panel(daily, tickers)
+
+    out = {}
+    for t in tickers:
+        if t not in live or t not in daily: continue
+        s, d = live[t].dropna(), daily[t].dropna()
+        if s.empty: continue
+        # Cierre anterior = última sesión diaria antes del día de la última cotización
+        prev = d[d.index.date < s.index[-1].date()]
+        if prev.empty: continue
+        out[t] = {'last': float(s.iloc[-1]), 'prev': float(prev.iloc[-1])}
+    return out
+
+def get_quotes(tickers, on_partial=None, ttl=TTL, chunk_size=CHUNK_SIZE, max_workers=MAX_WORKERS):
+    """
+    {ticker: {'last', 'prev'}} para `tickers`. Solo se piden los que no están en caché (o vencieron).
+    on_partial(quotes): se llama en el hilo que invoca con todo lo disponible hasta el momento.
+    """
+    now = time.time()
+    with _LOCK:
+        out = {t: _CACHE[t][1] for t in tickers if t in _CACHE and now - _CACHE[t][0] < ttl}
+    missing = [t for t in dict.fromkeys(tickers) if t not in out]
+    if on_partial and out: on_partial(dict(out))
+    if not missing: return out
+
+    chunks = [missing[i:i + chunk_size] for i in range(0, len(missing), chunk_size)]
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(chunks))) as pool:
+        futures = [pool.submit(fetch_chunk, c) for c in chunks]
+        for fut in as_completed(futures):
+            try: res = fut.result()
+            except Exception: res = {}
+            ts = time.time()
+            with _LOCK:
+                for t, q in res.items(): _CACHE[t] = (ts, q)
+            out.update(res)
+            if on_partial: on_partial(dict(out))
+    return out
+
+def clear():
+    with _LOCK: _CACHE.clear()
+
+# --- BENCHMARK (python quote_engine.py) ---
+def _legacy_quotes(tickers):
+    """Recorrido original: fast_info símbolo por símbolo"""
+    out = {}
+    for t in tickers:
+        try:
+            info = data_provider.fast_info(t)
+            if info['last_price'] and info['previous_close']:
+                out[t] = {'last': info['last_price'], 'prev': info['previous_close']}
+        except Exception: pass
+    return out
+
+def run_benchmark(tickers=('AAPL', 'MSFT', 'NVDA', 'GGAL', 'YPF', 'MELI', 'KO', 'XOM', 'SPY', 'QQQ',
+                           'JPM', 'BAC', 'PBR', 'VALE', 'GLD', 'AMZN', 'META', 'TSM', 'BABA', 'DIS')):
+    tickers = list(tickers)
+    t0 = time.perf_counter(); ref = _legacy_quotes(tickers); t_loop = time.perf_counter() - t0
+    clear()
+    t0 = time.perf_counter(); new = get_quotes(tickers); t_new = time.perf_counter() - t0
+    same_prev = sum(abs(ref[t]['prev'] - new[t]['prev']) < 1e-2 for t in ref if t in new)
+    print(f"Cotizaciones {len(tickers)} tickers | fast_info: {t_loop:.1f} s ({len(ref)}) | "
+          f"lotes: {t_new:.1f} s ({len(new)}) | mismo cierre anterior: {same_prev}/{len(ref)}")
+
+if __name__ == "__main__":
+    run_benchmark()
@@ -0,0 +1,87 @@
+from itertools import combinations
+import data_provider
+
+# --- PLANIFICADOR DE PEDIDOS OHLCV (CCXT) ---
+# Muchas temporalidades se pueden armar localmente a partir de una más fina: 4H, 12H y 1D
+# son grupos exactos de velas de 1H (o 15m), y 1W de velas de 12H / 1D. El planificador
+# elige el conjunto mínimo de temporalidades "base" a descargar para cubrir todas las
+# pedidas (respetando el límite de velas por pedido del exchange) y deriva el resto.
+# Los cortes de cada vela son múltiplos de su duración desde el epoch (UTC); las semanas
+# arrancan el lunes 00:00 UTC.
+
+MAX_LIMIT = 1000                 # velas por pedido (Gate.io swap)
+WEEK_OFFSET_MS = 4 * 86_400_000  # el epoch fue jueves: +4 días = lunes
+UNIT_MS = {'m': 60_000, 'h': 3_600_000, 'd': 86_400_000, 'w': 604_800_000}
+
+def tf_ms(tf):
+    return int(tf[:-1]) * UNIT_MS[tf[-1]]
+
+def tf_offset(tf):
+    return WEEK_OFFSET_MS if tf.endswith('w') else 0
+
+def can_derive(base, tf, bars, max_limit=MAX_LIMIT):
+    """tf se arma con velas de base si los cortes coinciden y alcanzan las velas de un pedido"""
+    if tf[-1] not in UNIT_MS or base[-1] not in UNIT_MS: return False
+    b, t = tf_ms(base), tf_ms(tf)
+    if t % b or (tf_offset(tf) - tf_offset(base)) % b: return False
+    return (bars + 1) * (t // b) <= max_limit
+
+def base_limit(base, derived, needs):
+    """Velas de base necesarias: la mayor demanda entre ella misma y lo que se deriva de ella"""
+    need = needs.get(base, 0)
+    for tf, src in derived.items():
+        # +1 vela destino: la primera puede quedar incompleta y se descarta
+        if src == base: need = max(need, (needs[tf] + 1) * (tf_ms(tf) // tf_ms(base)))
+    return need
+
+def plan_requests(needs, max_limit=MAX_LIMIT):
+    """
+    needs: {tf: velas}. Devuelve {'fetch': {base: limit}, 'derive': {tf: base},
+    'requests': pedidos por símbolo, 'saved': pedidos ahorrados vs. uno por temporalidad}.
+    """
+    tfs = sorted(needs, key=lambda tf: tf_ms(tf) if tf[-1] in UNIT_MS else float('inf'))
+    for size in range(1, len(tfs) + 1):
+        best = None
+        for bases in combinations(tfs, size):
+            derived = {}
+            for tf in tfs:
+                if tf in bases: continue
+                # La base más gruesa posible = menos velas a bajar
+                src = [b for b in reversed(bases) if can_derive(b, tf, needs[tf], max_limit)]
+                if not src: break
+                derived[tf] = src[0]
+            else:
+                fetch = {b: base_limit(b, derived, needs) for b in bases}
+                if best is None or sum(fetch.values()) < sum(best['fetch'].values()):
+                    best = {'fetch': fetch, 'derive': derived}
+        if best:
+            best['requests'] = len(best['fetch'])
+            best['saved'] = len(needs) - best['requests']
+            return best
+    return {'fetch': dict(needs), 'derive': {}, 'requests': len(needs), 'saved': 0}
+
+def derive(rows, base, tf, limit):
+    """Agrupa velas [ts, o, h, l, c, v] de `base` en velas de `tf` (la última puede estar abierta)"""
+    size, off = tf_ms(tf), tf_offset(tf)
+    out = []
+    for ts, o, h, l, c, v in rows:
+        start = (ts - off) // size * size + off
+        if out and out[-1][0] == start:
+            bar = out[-1]
+            bar[2] = max(bar[2], h); bar[3] = min(bar[3], l); bar[4] = c; bar[5] += v
+        else:
+            out.append([start, o, h, l, c, v])
+    # La primera vela queda incompleta si la ventana no arranca en su corte
+    if out and rows and rows[0][0] != out[0][0]: out = out[1:]
+    return out[-limit:]
+
+def fetch_planned(exchange, symbol, plan, needs):
+    """Ejecuta el plan para un símbolo: {tf: velas} para todas las temporalidades pedidas"""
+    data = {}
+    for base, limit in plan['fetch'].items():
+        try: data[base] = data_provider.exchange_call(exchange, 'fetch_ohlcv', symbol, timeframe=base, limit=limit)
+        except Exception: data[base] = []
+    out = {tf: data[tf][-needs[tf]:] for tf in plan['fetch'] if tf in needs}
+    for tf, base in plan['derive'].items():
+        out[tf] = derive(data[base], base, tf, needs[tf])
+    return out
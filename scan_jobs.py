@@ -0,0 +1,260 @@
+import gzip
+import hashlib
+import os
+import pickle
+import queue
+import threading
+import time
+import uuid
+import pandas as pd
+import market_hours
+import parallel_scoring
+from ohlcv_store import STORE_DIR
+from single_flight import freeze
+
+# --- TRABAJOS DE ESCANEO EN SEGUNDO PLANO ---
+# Los escaneos largos (lotes de los analizadores 360, opciones, escáner multi-temporalidad)
+# corren en hilos del proceso de Streamlit, fuera del hilo del script: la página solo envía
+# el trabajo y en cada rerun consulta el avance y los resultados parciales. Un cambio de
+# página o un rerun no corta el escaneo.
+#   - id del trabajo = hash(tipo, tickers, parámetros): el mismo escaneo pedido desde varias
+#     sesiones es un solo trabajo compartido (mientras corre, o ya terminado y vigente).
+#   - cola con JOB_WORKERS hilos; cada trabajo usa parallel_scoring (I/O en hilos, cálculo
+#     en procesos si compute es una función de módulo) por tandas de CHUNK tickers, así que
+#     se puede cancelar entre tandas.
+#   - el estado y los resultados se guardan en <STORE_DIR>/jobs/<id>.pkl.gz (como mucho cada
+#     PERSIST_EVERY segundos y al terminar), fuera del lock. Los resultados con DataFrames
+#     (History, Calls_DF...) no se guardan: pesan MB por ticker y se recalculan al retomar.
+#     Si el proceso se reinicia, volver a enviar el mismo trabajo retoma desde los tickers
+#     que faltaban.
+#   - cada sesión que envía un trabajo queda suscrita; cancel() la desuscribe y el escaneo
+#     solo se corta cuando no queda ninguna sesión mirándolo.
+
+JOBS_DIR = os.path.join(STORE_DIR, "jobs")
+JOB_WORKERS = 2
+CHUNK = 16
+JOB_TTL = 15 * 60        # un escaneo terminado se reutiliza este tiempo con el mercado abierto
+RETENTION = 2 * 86400    # archivos de trabajos viejos que se borran al arrancar
+PERSIST_EVERY = 2.0
+POLL_S = 1.0             # cada cuánto una página vuelve a consultar un trabajo en curso
+
+ACTIVE = ('queued', 'running')
+# Campos de un trabajo que solo viven en memoria
+RUNTIME = ('load', 'compute', 'cancel', 'saved_at', 'subscribers', 'io', 'seq', 'written')
+
+_JOBS = {}
+_QUEUE = queue.Queue()
+_WORKERS = []
+_LOCK = threading.Lock()
+
+def job_id(kind, tickers, params=()):
+    return hashlib.md5(repr((kind, tuple(tickers), freeze(params))).encode()).hexdigest()[:16]
+
+def _passthrough(ticker, data):
+    return data
+
+# --- DISCO ---
+def _path(jid):
+    return os.path.join(JOBS_DIR, jid + ".pkl.gz")
+
+def _storable(result):
+    return not isinstance(result, dict) or not any(isinstance(v, (pd.DataFrame, pd.Series)) for v in result.values())
+
+def _runtime(subscribers=()):
+    return {'cancel': threading.Event(), 'subscribers': set(subscribers), 'io': threading.Lock(), 'seq': 0, 'written': 0}
+
+def _snapshot(job):
+    snap = {k: v for k, v in job.items() if k not in RUNTIME}
+    snap['results'] = {i: r for i, r in job['results'].items() if _storable(r)}
+    return snap
+
+def _persist(job, force=False):
+    """Foto liviana del trabajo si toca guardarla, o None. Llamar con _LOCK tomado y pasarla a _write"""
+    now = time.time()
+    if not force and now - job.get('saved_at', 0) < PERSIST_EVERY: return None
+    job['saved_at'] = now
+    job['seq'] += 1
+    return job['seq'], _snapshot(job)
+
+def _write(job, snap):
+    """Escribe la foto a disco fuera de _LOCK (una foto vieja no pisa a una más nueva)"""
+    if snap is None: return
+    seq, data = snap
+    with job['io']:
+        if seq <= job['written']: return
+        os.makedirs(JOBS_DIR, exist_ok=True)
+        tmp = f"{_path(job['id'])}.{threading.get_ident()}.tmp"
+        try:
+            with gzip.open(tmp, 'wb', compresslevel=3) as f: pickle.dump(data, f, protocol=4)
+            os.replace(tmp, _path(job['id']))
+            job['written'] = seq
+        except Exception:
+            if os.path.exists(tmp): os.remove(tmp)
+
+def _restore(jid):
+    try:
+        with gzip.open(_path(jid), 'rb') as f: job = pickle.load(f)
+    except (OSError, EOFError, pickle.UnpicklingError, AttributeError): return None
+    # Un trabajo que estaba en curso cuando se cortó el proceso queda interrumpido; uno terminado
+    # cuyos resultados con DataFrames no se guardaron también (al retomarlo se recalculan)
+    job['done'] = len(job['results'])
+    if job['state'] in ACTIVE or (job['state'] == 'done' and job['done'] < job['total']): job['state'] = 'interrupted'
+    return {**job, **_runtime()}
+
+def _cleanup():
+    if not os.path.isdir(JOBS_DIR): return
+    cutoff = time.time() - RETENTION
+    for name in os.listdir(JOBS_DIR):
+        path = os.path.join(JOBS_DIR, name)
+        try:
+            if os.path.getmtime(path) < cutoff: os.remove(path)
+        except OSError: pass
+
+# --- WORKERS ---
+def _ensure_workers():
+    """Arranca los hilos de la cola la primera vez. Llamar con _LOCK tomado"""
+    if _WORKERS: return
+    _cleanup()
+    for n in range(JOB_WORKERS):
+        t = threading.Thread(target=_worker, name=f"scan_jobs_{n}", daemon=True)
+        t.start()
+        _WORKERS.append(t)
+
+def _worker():
+    while True:
+        job = _QUEUE.get()
+        try: _run(job)
+        except Exception as e:
+            with _LOCK:
+                job.update(state='error', error=str(e), finished=time.time())
+                snap = _persist(job, force=True)
+            _write(job, snap)
+        finally: _QUEUE.task_done()
+
+def _run(job):
+    with _LOCK:
+        cancelled = job['cancel'].is_set()
+        if cancelled: job.update(state='cancelled', finished=time.time())
+        else: job.update(state='running', started=time.time())
+        pending = [i for i in range(job['total']) if i not in job['results']]
+        snap = _persist(job, force=True)
+    _write(job, snap)
+    if cancelled: return
+
+    def on_result(i, ticker, result):
+        with _LOCK:
+            job['results'][i] = result
+            job['done'] = len(job['results'])
+            job['current'] = ticker
+            snap = _persist(job)
+        _write(job, snap)
+
+    # El corte se decide con _LOCK tomado: una sesión que se suma (submit limpia el evento)
+    # o ve el trabajo todavía activo y lo continúa, o lo ve ya cerrado y lo retoma
+    for k in range(0, len(pending) + CHUNK, CHUNK):
+        with _LOCK:
+            if k >= len(pending) or job['cancel'].is_set():
+                cancelled = job['cancel'].is_set() and len(job['results']) < job['total']
+                job.update(state='cancelled' if cancelled else 'done', finished=time.time(), current=None)
+                snap = _persist(job, force=True)
+                break
+        idx = pending[k:k + CHUNK]
+        parallel_scoring.score([job['tickers'][i] for i in idx], job['load'], job['compute'], processes=job['processes'],
+                               on_result=lambda j, t, r, idx=idx: on_result(idx[j], t, r))
+    _write(job, snap)
+
+# --- API ---
+def subscriber(session_state):
+    """Id de suscriptor de la sesión (se guarda en st.session_state)"""
+    return session_state.setdefault('scan_jobs_subscriber', uuid.uuid4().hex)
+
+def submit(kind, tickers, load, compute=None, params=(), processes=None, subscriber=None):
+    """
+    Encola el escaneo (o se suma al que ya corre / terminó hace poco) y devuelve su id.
+    load(ticker) corre en hilos; compute(ticker, datos), si se pasa, en procesos (función de
+    módulo). Sin compute, load hace todo y su resultado es el del ticker.
+    params: lo que cambia el resultado además de los tickers (temporalidad, umbrales...).
+    subscriber: id de la sesión que lo sigue (ver subscriber() y cancel()).
+    """
+    tickers = list(tickers)
+    jid = job_id(kind, tickers, params)
+    with _LOCK:
+        job = _JOBS.get(jid) or _restore(jid)
+        if job is not None:
+            if job['state'] in ACTIVE:
+                # Si la última sesión lo había cancelado y todavía no cortó, sigue para esta
+                job['subscribers'].add(subscriber)
+                job['cancel'].clear()
+                return jid
+            if job['state'] == 'done' and market_hours.is_fresh(job['finished'], JOB_TTL):
+                _JOBS[jid] = job
+                return jid
+        # Retoma un trabajo interrumpido o cancelado; uno terminado y vencido arranca de cero
+        results = job['results'] if job is not None and job['state'] in ('interrupted', 'cancelled') else {}
+        job = _JOBS[jid] = {
+            'id': jid, 'kind': kind, 'tickers': tickers, 'params': params, 'state': 'queued',
+            'total': len(tickers), 'done': len(results), 'current': None, 'results': dict(results),
+            'submitted': time.time(), 'started': None, 'finished': None, 'error': None,
+            'load': load, 'compute': compute or _passthrough,
+            'processes': compute is not None if processes is None else processes, **_runtime([subscriber])}
+        snap = _persist(job, force=True)
+        _ensure_workers()
+    _write(job, snap)
+    _QUEUE.put(job)
+    return jid
+
+def _get(jid):
+    """Trabajo en memoria o, tras un reinicio, el guardado en disco. Llamar con _LOCK tomado"""
+    if jid is None: return None
+    job = _JOBS.get(jid)
+    if job is None:
+        job = _restore(jid)
+        if job is not None: _JOBS[jid] = job
+    return job
+
+def status(jid):
+    """{'id', 'kind', 'state', 'done', 'total', 'current', 'submitted', 'started', 'finished', 'error'} o None"""
+    with _LOCK:
+        job = _get(jid)
+        if job is None: return None
+        return {k: job[k] for k in ('id', 'kind', 'state', 'done', 'total', 'current', 'submitted', 'started', 'finished', 'error')}
+
+def results(jid):
+    """Resultados ya terminados (sin los None), en el orden de los tickers enviados"""
+    with _LOCK:
+        job = _get(jid)
+        if job is None: return []
+        return [job['results'][i] for i in sorted(job['results']) if job['results'][i] is not None]
+
+def merge(jid, rows, key=lambda r: r.get('Ticker')):
+    """Agrega a `rows` los resultados del trabajo cuya clave todavía no está. Devuelve status(jid)"""
+    seen = {key(r) for r in rows}
+    rows.extend(r for r in results(jid) if key(r) not in seen)
+    return status(jid)
+
+def cancel(jid, subscriber=None):
+    """Desuscribe la sesión; el escaneo se corta solo si ya no lo sigue ninguna"""
+    with _LOCK:
+        job = _get(jid)
+        if job is None or job['state'] not in ACTIVE: return
+        job['subscribers'].discard(subscriber)
+        if not job['subscribers']: job['cancel'].set()
+
+def leave(session_state, key):
+    """La sesión deja de seguir el trabajo guardado en session_state[key] (lo cancela si era la última)"""
+    cancel(session_state.pop(key, None), subscriber(session_state))
+
+def jobs():
+    """Estado de todos los trabajos conocidos por este proceso (más recientes primero)"""
+    with _LOCK: ids = sorted(_JOBS, key=lambda j: _JOBS[j]['submitted'], reverse=True)
+    return [status(j) for j in ids]
+
+def describe(s):
+    """Línea de avance para las páginas"""
+    if s is None: return ""
+    label = {'queued': "En cola", 'running': "Escaneando", 'done': "Listo", 'cancelled': "Cancelado",
+             'interrupted': "Interrumpido", 'error': "Error"}.get(s['state'], s['state'])
+    line = f"{label}: {s['done']}/{s['total']}"
+    if s['state'] == 'running' and s['current']: line += f" (último: {s['current']})"
+    if s['state'] == 'error' and s['error']: line += f" | {s['error']}"
+    return line
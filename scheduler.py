@@ -0,0 +1,175 @@
+import importlib
+import json
+import os
+import sys
+import time
+import pandas as pd
+import bot_runner
+import market_hours
+from ohlcv_store import STORE_DIR
+
+# --- SCHEDULER DE LOS BOTS (DEMONIO CON CALENDARIO NYSE) ---
+# Alternativa de larga duración a los crons fijos de bot_final.yml. Duerme hasta el próximo
+# evento del calendario y corre por bot_runner solo los plugins a los que les cerró una vela:
+#   - cierre de sesión (+ SCHEDULER_CLOSE_DELAY min para que el proveedor publique la vela):
+#     cierra '1d' siempre, '1wk' si es el último día hábil de la semana y '1mo' si es el
+#     último del mes. Un plugin corre si alguna de sus TIMEFRAMES cerró (alerta_bot todos los
+#     días, mtf_bot solo en cierres de semana / mes).
+#   - intradía (opcional): cada SCHEDULER_INTRADAY min con el mercado abierto, los plugins
+#     con '1d' se evalúan sobre la vela en curso. 0 = apagado.
+# Feriados, fines de semana y cierres anticipados salen de market_hours: con el mercado
+# cerrado no se hace nada. Las descargas son incrementales (ohlcv_store). Yahoo sirve la vela
+# en curso con la misma etiqueta que la cerrada, así que la etiqueta sola no dice si es final:
+# hasta que la última cotización regular del SPY (regularMarketTime) no llega al cierre, o si
+# falta la vela, no se evalúa ni se envía nada y se reintenta cada SCHEDULER_RETRY min hasta
+# SCHEDULER_MAX_WAIT min después del cierre.
+# Lo ya enviado se guarda en <STORE_DIR>/scheduler.json: un reinicio no repite reportes y al
+# arrancar se pone al día con el último cierre si el mercado todavía no reabrió.
+#   python scheduler.py          demonio
+#   python scheduler.py --once   corre lo pendiente y sale (para un cron frecuente)
+#   python scheduler.py --plan   muestra los próximos eventos sin correr nada
+
+CLOSE_DELAY = pd.Timedelta(minutes=float(os.environ.get("SCHEDULER_CLOSE_DELAY", "10")))
+INTRADAY = pd.Timedelta(minutes=float(os.environ.get("SCHEDULER_INTRADAY", "0")))
+RETRY = pd.Timedelta(minutes=float(os.environ.get("SCHEDULER_RETRY", "5")))
+MAX_WAIT = pd.Timedelta(minutes=float(os.environ.get("SCHEDULER_MAX_WAIT", "120")))
+MAX_SLEEP = 15 * 60   # se despierta al menos así de seguido (cambios de hora, suspensión del equipo)
+
+STATE_PATH = os.path.join(STORE_DIR, "scheduler.json")
+
+# --- CALENDARIO DE VELAS ---
+def closed_intervals(day):
+    """Intervalos cuya vela cierra con la sesión de `day` (día hábil)"""
+    nxt = market_hours.next_trading_day(day)
+    day = market_hours.now_ny(day)
+    closed = ['1d']
+    if nxt.isocalendar()[:2] != day.isocalendar()[:2]: closed.append('1wk')
+    if (nxt.year, nxt.month) != (day.year, day.month): closed.append('1mo')
+    return closed
+
+def bar_start(day, interval):
+    """Etiqueta de Yahoo de la vela de `interval` que contiene a `day` (día, lunes de la semana, 1° del mes)"""
+    day = pd.Timestamp(day.date())
+    if interval == '1wk': return day - pd.Timedelta(days=day.weekday())
+    if interval == '1mo': return day.replace(day=1)
+    return day
+
+def close_event(now):
+    """(hora de cierre, intervalos) del último cierre ya disparable (cierre + CLOSE_DELAY <= now)"""
+    close = market_hours.last_close(market_hours.now_ny(now) - CLOSE_DELAY)
+    return close, closed_intervals(close)
+
+def intraday_slot(now):
+    """Último turno intradía <= now de la sesión en curso, o None"""
+    now = market_hours.now_ny(now)
+    if INTRADAY <= pd.Timedelta(0) or not market_hours.is_open(now): return None
+    opened = market_hours._at(now, market_hours.OPEN)
+    slot = opened + INTRADAY * ((now - opened) // INTRADAY)
+    return slot if slot > opened else None
+
+def upcoming(now, n=10):
+    """Próximos n eventos [(hora, tipo, intervalos)] después de now"""
+    now = market_hours.now_ny(now)
+    events = []
+    day = now.normalize()
+    while len(events) < n:
+        if market_hours.is_trading_day(day):
+            close = market_hours.session_close(day)
+            if INTRADAY > pd.Timedelta(0):
+                slot = market_hours._at(day, market_hours.OPEN) + INTRADAY
+                while slot < close:
+                    if slot > now: events.append((slot, 'intraday', ['1d']))
+                    slot += INTRADAY
+            if close + CLOSE_DELAY > now: events.append((close + CLOSE_DELAY, 'close', closed_intervals(day)))
+        day += pd.DateOffset(days=1)
+    return events[:n]
+
+# --- PLUGINS ---
+def plugins_for(intervals, plugins=bot_runner.PLUGINS):
+    """Plugins con alguna temporalidad en `intervals`"""
+    return [name for name in plugins if {i for i, _, _ in importlib.import_module(name).TIMEFRAMES} & set(intervals)]
+
+# --- ESTADO ---
+def load_state():
+    try:
+        with open(STATE_PATH) as f: return json.load(f)
+    except (OSError, ValueError): return {}
+
+def save_state(state):
+    os.makedirs(STORE_DIR, exist_ok=True)
+    tmp = STATE_PATH + ".tmp"
+    with open(tmp, 'w') as f: json.dump(state, f, indent=1)
+    os.replace(tmp, STATE_PATH)
+
+def _done(state, kind, ts):
+    return kind in state and pd.Timestamp(state[kind]) >= ts
+
+# --- CICLO ---
+def tick(now=None, state=None, run=bot_runner.run):
+    """Corre los eventos pendientes a `now`. Devuelve [(tipo, hora, plugins, resultado)]"""
+    now = market_hours.now_ny(now)
+    state = load_state() if state is None else state
+    ran = []
+
+    close, intervals = close_event(now)
+    if not _done(state, 'close', close):
+        # Si el mercado ya reabrió el cierre quedó viejo: se da por visto sin reportar
+        if now >= market_hours.next_open(close): result = 'vencido'
+        else:
+            names = plugins_for(intervals)
+            tfs = {i for n in names for i, _, _ in importlib.import_module(n).TIMEFRAMES}
+            expect = {i: bar_start(close, i) for i in intervals if i in tfs}
+            ok = run(names, expect=expect, closed_at=close) if names else True
+            if ok: result = 'ok'
+            elif now - close >= MAX_WAIT: result = 'sin datos'
+            else:
+                state['retry'] = str(now + RETRY)
+                ran.append(('close', close, names, 'reintento'))
+                return ran
+        state['close'] = str(close)
+        state.pop('retry', None)
+        save_state(state)
+        ran.append(('close', close, intervals, result))
+
+    slot = intraday_slot(now)
+    if slot is not None and not _done(state, 'intraday', slot):
+        names = plugins_for(['1d'])
+        if names: run(names)
+        state['intraday'] = str(slot)
+        save_state(state)
+        ran.append(('intraday', slot, names, 'ok'))
+    return ran
+
+def next_wake(now=None, state=None):
+    """Hora del próximo evento (o reintento pendiente)"""
+    now = market_hours.now_ny(now)
+    wake = upcoming(now, 1)[0][0]
+    if state and 'retry' in state: wake = min(wake, pd.Timestamp(state['retry']).tz_convert(market_hours.TZ))
+    return wake
+
+def run_forever():
+    state = load_state()
+    print(f"[scheduler] estado: {STATE_PATH} | cierre +{CLOSE_DELAY} | intradía: {INTRADAY or 'apagado'}")
+    while True:
+        for kind, ts, names, result in tick(state=state):
+            print(f"[scheduler] {kind} {ts:%Y-%m-%d %H:%M} {names}: {result}")
+        now = market_hours.now_ny()
+        wake = next_wake(now, state)
+        print(f"[scheduler] próximo evento: {wake:%Y-%m-%d %H:%M %Z}")
+        time.sleep(min(max((wake - now).total_seconds(), 1), MAX_SLEEP))
+
+def print_plan(n=10):
+    now = market_hours.now_ny()
+    state = load_state()
+    print(f"Ahora: {now:%Y-%m-%d %H:%M %Z} | mercado {'abierto' if market_hours.is_open(now) else 'cerrado'} | "
+          f"último cierre enviado: {state.get('close', '-')}")
+    for ts, kind, intervals in upcoming(now, n):
+        print(f"  {ts:%a %Y-%m-%d %H:%M}  {kind:<8} {'/'.join(intervals):<12} {', '.join(plugins_for(intervals))}")
+
+if __name__ == "__main__":
+    arg = sys.argv[1] if len(sys.argv) > 1 else None
+    if arg == '--plan': print_plan(int(sys.argv[2]) if len(sys.argv) > 2 else 10)
+    elif arg == '--once':
+        for kind, ts, names, result in tick():
+            print(f"[scheduler] {kind} {ts:%Y-%m-%d %H:%M} {names}: {result}")
+    else: run_forever()
@@ -0,0 +1,554 @@
+import numpy as np
+import pandas as pd
+from datetime import datetime
+from options_analytics import max_pain
+from panel_indicators import panel_from_frame
+from bar_pyramid import get_pyramid, frame
+
+# --- PUNTAJES 360 (CÁLCULO PURO) ---
+# La parte de CPU de los analizadores 360 (Acciones Gatillo, Acciones Gatillo V2 y Analisis
+# Fundamental): técnico, opciones (Max Pain, muros, PCR), estacionalidad y niveles. Cada
+# score_*(ticker, data) recibe lo ya descargado por la página y no hace I/O; son funciones
+# de módulo para poder correr en el pool de procesos de parallel_scoring.py.
+
+# --- HELPERS MATEMÁTICOS ---
+def calculate_rsi(series, period=14):
+    delta = series.diff()
+    gain = (delta.where(delta > 0, 0)).rolling(window=period).mean()
+    loss = (-delta.where(delta < 0, 0)).rolling(window=period).mean()
+    rs = gain / loss
+    return 100 - (100 / (1 + rs))
+
+def calculate_atr(df, period=14):
+    high_low = df['High'] - df['Low']
+    high_close = np.abs(df['High'] - df['Close'].shift())
+    low_close = np.abs(df['Low'] - df['Close'].shift())
+    ranges = pd.concat([high_low, high_close, low_close], axis=1)
+    true_range = np.max(ranges, axis=1)
+    return true_range.rolling(period).mean()
+
+# --- GATILLO (V12) ---
+def gatillo_technical(df, ticker=None):
+    try:
+        score = 0; details = []
+        
+        # 1. HA Matrix (3 pts)
+        ha_close = (df['Open']+df['High']+df['Low']+df['Close'])/4
+        ha_open = (df['Open'].shift(1)+df['Close'].shift(1))/2
+        daily_green = ha_close.iloc[-1] > ha_open.iloc[-1]
+        
+        # Semanal / Mensual desde la pirámide de velas (misma agregación que resample, sin dropna)
+        tf = get_pyramid(('gatillo_1d', ticker), panel_from_frame(df), ('W', 'ME'))['tf']
+        df_w = frame(tf['W'], None, dropna=False)
+        if not df_w.empty:
+            ha_close_w = (df_w['Open']+df_w['High']+df_w['Low']+df_w['Close'])/4
+            ha_open_w = (df_w['Open'].shift(1)+df_w['Close'].shift(1))/2
+            weekly_green = ha_close_w.iloc[-1] > ha_open_w.iloc[-1]
+        else: weekly_green = False
+        
+        df_m = frame(tf['ME'], None, dropna=False)
+        if not df_m.empty:
+            ha_close_m = (df_m['Open']+df_m['High']+df_m['Low']+df_m['Close'])/4
+            ha_open_m = (df_m['Open'].shift(1)+df_m['Close'].shift(1))/2
+            m_green = ha_close_m.iloc[-1] > ha_open_m.iloc[-1]
+        else: m_green = False
+
+        if daily_green: score+=1; details.append("HA Diario Alcista")
+        if weekly_green: score+=1; details.append("HA Semanal Alcista")
+        if m_green: score+=1; details.append("HA Mensual Alcista")
+
+        # 2. Medias (5 pts)
+        price = df['Close'].iloc[-1]
+        ma20 = df['Close'].rolling(20).mean().iloc[-1]
+        ma50 = df['Close'].rolling(50).mean().iloc[-1]
+        ma200 = df['Close'].rolling(200).mean().iloc[-1]
+        
+        if price > ma20: score+=1; details.append("> MA20")
+        if ma20 > ma50: score+=2; details.append("MA20 > MA50")
+        if price > ma200: score+=2; details.append("> MA200")
+
+        # 3. RSI (2 pts)
+        rsi = calculate_rsi(df['Close']).iloc[-1]
+        if 40 <= rsi <= 65: score += 2 
+        elif rsi > 70: score -= 2
+        elif rsi < 30: score += 1
+            
+        return max(0, min(10, score)), details, rsi
+    except: return 0, ["Error"], 50
+
+def gatillo_options(chain, price):
+    # Valores default seguros para evitar crash
+    def_res = (5, "Sin Opciones", 0, 0, 0, "N/A", 0)
+    try:
+        if chain is None: return def_res
+        calls, puts, _ = chain
+        if calls.empty or puts.empty: return def_res
+        
+        # --- SENTIMIENTO MEJORADO ---
+        total_call = calls['openInterest'].sum()
+        total_put = puts['openInterest'].sum()
+        pcr = total_put / total_call if total_call > 0 else 0
+        
+        if pcr < 0.6: sentiment = "🚀 EUFORIA (Alerta: Techo)"
+        elif pcr > 1.4: sentiment = "🐻 MIEDO (Posible Piso)"
+        else: sentiment = "⚖️ NEUTRAL (Sano)"
+
+        # Muros
+        cw = calls.loc[calls['openInterest'].idxmax()]['strike']
+        pw = puts.loc[puts['openInterest'].idxmax()]['strike']
+        
+        mp = max_pain(calls, puts, price, band=(0.7, 1.3), fallback_all=True)
+
+        score = 5
+        detail = "Rango Medio"
+        if price > cw: score=10; detail="🚀 Breakout Gamma"
+        elif price < pw: score=1; detail="💀 Breakdown Gamma"
+        else:
+            rng = cw - pw
+            if rng > 0:
+                pos = (price - pw)/rng
+                score = 10 - (pos*10)
+                if score > 8: detail="🟢 Soporte (PW)"
+                elif score < 2: detail="🧱 Resistencia (CW)"
+                else: detail=f"Rango ${pw}-${cw}"
+                
+        return score, detail, cw, pw, mp, sentiment, pcr
+    except: return def_res
+
+def gatillo_seasonality(df):
+    try:
+        curr_m = datetime.now().month
+        m_ret = df['Close'].resample('ME').last().pct_change()
+        hist = m_ret[m_ret.index.month == curr_m]
+        
+        win = (hist>0).mean() if len(hist)>1 else 0
+        score = win * 6
+        avg = hist.mean() if len(hist)>1 else 0
+        
+        if avg > 0.01: score += 4
+        elif avg > 0: score += 2
+        else: score -= 2
+        
+        wins = hist[hist>0]; losses = hist[hist<0]
+        avg_w = wins.mean() if not wins.empty else 0
+        avg_l = abs(losses.mean()) if not losses.empty else 0
+        
+        warning = ""
+        if avg_l > (avg_w * 2) and avg_l > 0.03:
+            score -= 3; warning = "⚠️ RIESGO (Loss > 2x Win)"
+            
+        return max(0, min(10, score)), f"WR: {win:.0%} | {warning}", avg
+    except: return 5, "N/A", 0
+
+def calculate_levels(df, price):
+    try:
+        atr = calculate_atr(df).iloc[-1]
+        sl = price - (2 * atr)
+        tp = price + (3 * atr)
+        return atr, sl, tp
+    except: return 0, 0, 0
+
+def score_gatillo(ticker, data):
+    """data: {'df': historia diaria 2y, 'chain': (calls, puts, vto) o None, 'macro': contexto de get_market_context_dynamic}"""
+    # Objeto de error por defecto para que SIEMPRE devuelva algo
+    error_res = {
+        "Ticker": ticker, "Price": 0, "Score": 0, "Verdict": "⚠️ ERROR DATOS",
+        "S_Tec": 0, "RSI": 0, "D_Tec_List": [],
+        "S_Opt": 0, "Sentiment": "N/A", "PCR": 0, "CW": 0, "PW": 0, "Max_Pain": 0, "D_Opt": "N/A",
+        "S_Sea": 0, "D_Sea": "N/A", "Avg_Ret": 0,
+        "ATR": 0, "SL": 0, "TP": 0,
+        "Macro_Msg": "N/A", "Bench": "N/A", "VIX": 0, "VIX_St": "N/A",
+        "History": None
+    }
+    
+    try:
+        df = data['df']
+        
+        if df is None or df.empty: return error_res
+        
+        price = df['Close'].iloc[-1]
+        
+        s_tec, d_tec_list, rsi = gatillo_technical(df, ticker)
+        d_tec_str = ", ".join([d for d in d_tec_list if "(+" in d or "RSI" in d])
+        
+        s_opt, d_opt, cw, pw, mp, sent, pcr_val = gatillo_options(data['chain'], price)
+        s_sea, d_sea, avg_ret = gatillo_seasonality(df)
+        atr, sl, tp = calculate_levels(df, price)
+        macro_st, macro_msg, vix, vix_st, bench = data['macro']
+        
+        final = (s_tec * 4) + (s_opt * 3) + (s_sea * 3)
+        if macro_st == "BEARISH": final -= 10
+        if vix > 25: final -= 5
+        
+        verdict = "NEUTRAL"
+        if final >= 75: verdict = "🔥 COMPRA FUERTE"
+        elif final >= 60: verdict = "✅ COMPRA"
+        elif final <= 25: verdict = "💀 VENTA FUERTE"
+        elif final <= 40: verdict = "🔻 VENTA"
+        
+        return {
+            "Ticker": ticker, "Price": price, "Score": final, "Verdict": verdict,
+            "S_Tec": s_tec, "RSI": rsi, "D_Tec_List": d_tec_list,
+            "S_Opt": s_opt, "Sentiment": sent, "PCR": pcr_val,
+            "CW": cw, "PW": pw, "Max_Pain": mp, "D_Opt": d_opt,
+            "S_Sea": s_sea, "D_Sea": d_sea, "Avg_Ret": avg_ret,
+            "ATR": atr, "SL": sl, "TP": tp,
+            "Macro_Msg": macro_msg, "Bench": bench, "VIX": vix, "VIX_St": vix_st,
+            "History": df
+        }
+    except: return error_res
+
+# --- GATILLO V2 (TÁCTICO) ---
+def calculate_adx(df, period=14):
+    """Calcula el ADX (Fuerza de la tendencia)"""
+    try:
+        plus_dm = df['High'].diff()
+        minus_dm = df['Low'].diff()
+        plus_dm[plus_dm < 0] = 0
+        minus_dm[minus_dm > 0] = 0
+        
+        tr1 = pd.DataFrame(df['High'] - df['Low'])
+        tr2 = pd.DataFrame(abs(df['High'] - df['Close'].shift(1)))
+        tr3 = pd.DataFrame(abs(df['Low'] - df['Close'].shift(1)))
+        frames = [tr1, tr2, tr3]
+        tr = pd.concat(frames, axis=1, join='inner').max(axis=1)
+        atr = tr.rolling(period).mean()
+        
+        plus_di = 100 * (plus_dm.ewm(alpha=1/period).mean() / atr)
+        minus_di = 100 * (abs(minus_dm).ewm(alpha=1/period).mean() / atr)
+        dx = (abs(plus_di - minus_di) / abs(plus_di + minus_di)) * 100
+        adx = dx.rolling(period).mean()
+        return adx.iloc[-1]
+    except: return 0
+
+def check_squeeze(df):
+    """Detecta compresión de Bollinger Bands (Energía acumulada)"""
+    try:
+        sma = df['Close'].rolling(20).mean()
+        std = df['Close'].rolling(20).std()
+        upper = sma + (2 * std)
+        lower = sma - (2 * std)
+        bandwidth = (upper - lower) / sma
+        
+        # Si el ancho actual es menor al promedio de 6 meses, es squeeze
+        avg_bw = bandwidth.rolling(120).mean().iloc[-1]
+        current_bw = bandwidth.iloc[-1]
+        
+        is_squeeze = current_bw < (avg_bw * 0.8) # 20% más estrecho que lo normal
+        return is_squeeze, current_bw
+    except: return False, 0
+
+def get_rvol(df):
+    """Volumen Relativo (Interés Institucional)"""
+    try:
+        vol_avg = df['Volume'].rolling(20).mean().iloc[-1]
+        vol_curr = df['Volume'].iloc[-1]
+        if vol_avg == 0: return 0
+        return vol_curr / vol_avg
+    except: return 0
+
+def tactical_technical(df):
+    try:
+        score = 0; details = []
+        # HA
+        ha_c = (df['Open']+df['High']+df['Low']+df['Close'])/4
+        ha_o = (df['Open'].shift(1)+df['Close'].shift(1))/2
+        if ha_c.iloc[-1] > ha_o.iloc[-1]: score+=1; details.append("HA Diario 🟢")
+        # Medias
+        p = df['Close'].iloc[-1]
+        m20 = df['Close'].rolling(20).mean().iloc[-1]
+        m50 = df['Close'].rolling(50).mean().iloc[-1]
+        if p>m20: score+=1; details.append(">MA20")
+        if m20>m50: score+=2; details.append("Tendencia Sana")
+        # RSI
+        delta = df['Close'].diff()
+        gain = (delta.where(delta>0, 0)).rolling(14).mean()
+        loss = (-delta.where(delta<0, 0)).rolling(14).mean()
+        rsi = 100 - (100/(1+(gain/loss))).iloc[-1]
+        if 40<=rsi<=65: score+=2
+        elif rsi>70: score-=2
+        
+        return max(0, min(10, score)), details, rsi
+    except: return 0, [], 50
+
+def tactical_options(chain, price):
+    # Opciones (Simplificado para velocidad, misma lógica V12)
+    def_res = (5, "Neutro", 0, 0, 0, "N/A", 0)
+    try:
+        if chain is None: return def_res
+        c, p, _ = chain
+        if c.empty or p.empty: return def_res
+        
+        cw = c.loc[c['openInterest'].idxmax()]['strike']
+        pw = p.loc[p['openInterest'].idxmax()]['strike']
+        
+        t_c, t_p = c['openInterest'].sum(), p['openInterest'].sum()
+        pcr = t_p/t_c if t_c > 0 else 0
+        sent = "🚀 Euforia" if pcr<0.6 else "🐻 Miedo" if pcr>1.4 else "⚖️ Neutro"
+        
+        # Max Pain (Aprox rapida)
+        mp = max_pain(c, p, price, band=(0.8, 1.2), fallback_all=True)
+        
+        score = 5
+        if price>cw: score=10
+        elif price<pw: score=1
+        else:
+            rng = cw-pw
+            if rng>0: score = 10-((price-pw)/rng*10)
+            
+        return score, "Rango", cw, pw, mp, sent, pcr
+    except: return def_res
+
+def get_tactical_data(df):
+    rvol = get_rvol(df)
+    adx = calculate_adx(df)
+    is_sqz, bw = check_squeeze(df)
+    
+    tactical_score = 0
+    alerts = []
+    
+    # RVOL Logic
+    if rvol > 2.0: tactical_score += 3; alerts.append(f"🔥 VOLUMEN EXPLOSIVO (x{rvol:.1f})")
+    elif rvol > 1.2: tactical_score += 1; alerts.append(f"⚡ Volumen Alto (x{rvol:.1f})")
+    elif rvol < 0.6: tactical_score -= 1; alerts.append("🧊 Sin Interés")
+    
+    # ADX Logic
+    if adx > 25: tactical_score += 2; alerts.append(f"💪 Tendencia Fuerte (ADX {adx:.0f})")
+    elif adx < 20: tactical_score -= 2; alerts.append("💤 Lateral/Débil")
+    
+    # Squeeze Logic
+    if is_sqz: 
+        alerts.append("💣 BOLLINGER SQUEEZE")
+        # El squeeze no suma puntos por sí solo (es neutro), pero avisa explosión
+    
+    return tactical_score, alerts, rvol, adx, is_sqz
+
+def score_tactical(ticker, data):
+    """data: {'df': historia diaria 2y, 'chain': (calls, puts, vto) o None}"""
+    try:
+        df = data['df'] # Necesitamos historia para ADX y Bandas
+        if df is None or df.empty: return None
+        price = df['Close'].iloc[-1]
+        
+        # 1. Técnico Base
+        s_tec, d_tec, rsi = tactical_technical(df)
+        
+        # 2. Táctico (Energía)
+        s_tac, d_tac, rvol, adx, is_sqz = get_tactical_data(df)
+        
+        # 3. Opciones
+        s_opt, _, cw, pw, mp, sent, pcr = tactical_options(data['chain'], price)
+        
+        # 4. Estacional (Simplificado)
+        curr_m = datetime.now().month
+        m_ret = df['Close'].resample('ME').last().pct_change()
+        hist = m_ret[m_ret.index.month == curr_m]
+        win = (hist>0).mean() if len(hist)>1 else 0
+        s_sea = win * 10
+        
+        # Niveles ATR
+        h, l, c = df['High'], df['Low'], df['Close']
+        tr = np.maximum((h-l), np.maximum(abs(h-c.shift()), abs(l-c.shift())))
+        atr = tr.rolling(14).mean().iloc[-1]
+        
+        # --- SCORE FINAL RECALIBRADO ---
+        # Tec(30%) + Tactico(20%) + Estructura(30%) + Estacional(20%)
+        # El Táctico funciona como "Booster"
+        raw_score = (s_tec * 3) + (s_opt * 3) + (s_sea * 2) + s_tac
+        final = max(0, min(100, raw_score))
+        
+        verdict = "NEUTRAL"
+        if final >= 75: verdict = "🔥 COMPRA FUERTE"
+        elif final >= 60: verdict = "✅ COMPRA"
+        elif final <= 30: verdict = "💀 VENTA FUERTE"
+        elif final <= 45: verdict = "🔻 VENTA"
+        
+        return {
+            "Ticker": ticker, "Price": price, "Score": final, "Verdict": verdict,
+            "RSI": rsi, "ATR": atr,
+            "S_Tec": s_tec, "D_Tec": d_tec,
+            "S_Tac": s_tac, "D_Tac": d_tac, "RVOL": rvol, "ADX": adx, "Squeeze": is_sqz,
+            "S_Opt": s_opt, "Sentiment": sent, "CW": cw, "PW": pw, "Max_Pain": mp,
+            "S_Sea": s_sea,
+            "History": df
+        }
+    except: return None
+
+# --- FUNDAMENTAL ---
+def fundamental_technical(df, ticker=None):
+    try:
+        score = 0; details = []
+        # HA Matrix
+        ha_close = (df['Open']+df['High']+df['Low']+df['Close'])/4
+        ha_open = (df['Open'].shift(1)+df['Close'].shift(1))/2
+        if ha_close.iloc[-1] > ha_open.iloc[-1]: score+=1; details.append("HA Diario Alcista")
+        
+        # Semanal / Mensual desde la pirámide de velas (misma agregación que resample, sin dropna)
+        tf = get_pyramid(('fundamental_1d', ticker), panel_from_frame(df), ('W', 'ME'))['tf']
+        df_w = frame(tf['W'], None, dropna=False)
+        if not df_w.empty:
+            ha_cw = (df_w['Open']+df_w['High']+df_w['Low']+df_w['Close'])/4
+            ha_ow = (df_w['Open'].shift(1)+df_w['Close'].shift(1))/2
+            if ha_cw.iloc[-1] > ha_ow.iloc[-1]: score+=1; details.append("HA Semanal Alcista")
+        
+        df_m = frame(tf['ME'], None, dropna=False)
+        if not df_m.empty:
+            ha_cm = (df_m['Open']+df_m['High']+df_m['Low']+df_m['Close'])/4
+            ha_om = (df_m['Open'].shift(1)+df_m['Close'].shift(1))/2
+            if ha_cm.iloc[-1] > ha_om.iloc[-1]: score+=1; details.append("HA Mensual Alcista")
+
+        # Medias
+        price = df['Close'].iloc[-1]
+        ma20 = df['Close'].rolling(20).mean().iloc[-1]
+        ma50 = df['Close'].rolling(50).mean().iloc[-1]
+        ma200 = df['Close'].rolling(200).mean().iloc[-1]
+        if price > ma20: score+=1; details.append("> MA20")
+        if ma20 > ma50: score+=2; details.append("MA20 > MA50")
+        if price > ma200: score+=2; details.append("> MA200")
+
+        rsi = calculate_rsi(df['Close']).iloc[-1]
+        if 40 <= rsi <= 65: score += 2 
+        elif rsi > 70: score -= 2
+        elif rsi < 30: score += 1
+            
+        return max(0, min(10, score)), details, rsi
+    except: return 0, ["Error Tec"], 50
+
+def fundamental_options(chain, price):
+    def_res = (5, "Sin Opciones", 0, 0, 0, "N/A", 0)
+    try:
+        if chain is None: return def_res
+        calls, puts, _ = chain
+        if calls.empty or puts.empty: return def_res
+        
+        t_call, t_put = calls['openInterest'].sum(), puts['openInterest'].sum()
+        pcr = t_put / t_call if t_call > 0 else 0
+        if pcr < 0.6: sentiment = "🚀 EUFORIA"
+        elif pcr > 1.4: sentiment = "🐻 MIEDO"
+        else: sentiment = "⚖️ NEUTRAL"
+
+        cw = calls.loc[calls['openInterest'].idxmax()]['strike']
+        pw = puts.loc[puts['openInterest'].idxmax()]['strike']
+        
+        mp = max_pain(calls, puts, price, band=(0.7, 1.3), fallback_all=True)
+
+        score = 5
+        detail = "Rango Medio"
+        if price > cw: score=10; detail="🚀 Breakout"
+        elif price < pw: score=1; detail="💀 Breakdown"
+        else:
+            rng = cw - pw
+            if rng > 0:
+                score = 10 - ((price - pw)/rng * 10)
+                if score > 8: detail="🟢 Soporte"
+                elif score < 2: detail="🧱 Resistencia"
+        
+        return score, detail, cw, pw, mp, sentiment, pcr
+    except: return def_res
+
+def fundamental_seasonality(df):
+    try:
+        curr_m = datetime.now().month
+        m_ret = df['Close'].resample('ME').last().pct_change()
+        hist = m_ret[m_ret.index.month == curr_m]
+        
+        if len(hist)<2: return 5, "N/A", 0
+        
+        win = (hist>0).mean()
+        avg = hist.mean()
+        score = win * 6
+        if avg > 0.01: score += 4
+        elif avg > 0: score += 2
+        else: score -= 2
+        
+        wins = hist[hist>0]; losses = hist[hist<0]
+        avg_w = wins.mean() if not wins.empty else 0
+        avg_l = abs(losses.mean()) if not losses.empty else 0
+        
+        warning = ""
+        if avg_l > (avg_w * 2) and avg_l > 0.03:
+            score -= 3; warning = "⚠️ RIESGO"
+            
+        return max(0, min(10, score)), f"WR: {win:.0%}", avg
+    except: return 5, "N/A", 0
+
+def get_fundamental_score(info):
+    """info: campos de la foto diaria (ver fundamentals_store.py)"""
+    score = 0; details = []; tags = []
+    try:
+        if not info: return 5, ["Sin datos"], []
+        
+        # 1. Valuation
+        peg = info.get('pegRatio', None)
+        if peg:
+            if peg < 1.0: score+=3; details.append(f"Subvaluada (PEG {peg})"); tags.append("💎 BARATA")
+            elif peg < 2.0: score+=2; details.append(f"Precio Justo (PEG {peg})")
+            else: details.append(f"Cara (PEG {peg})"); tags.append("💰 CARA")
+        else:
+            pe = info.get('forwardPE', 25)
+            if pe < 15: score+=2; details.append("P/E Bajo"); tags.append("💎 BARATA")
+            else: score+=1
+            
+        # 2. Rentabilidad
+        marg = info.get('profitMargins', 0)
+        if marg > 0.2: score+=3; details.append("Márgenes Top"); tags.append("👑 CALIDAD")
+        elif marg > 0.1: score+=2; details.append("Rentable")
+        elif marg > 0: score+=1
+        else: details.append("⚠️ Pierde Dinero"); tags.append("🔥 QUEMA CAJA")
+        
+        # 3. Crecimiento
+        rev_g = info.get('revenueGrowth', 0)
+        if rev_g > 0.15: score+=2; details.append("Alto Crecimiento"); tags.append("🚀 GROWTH")
+        elif rev_g > 0: score+=1
+        
+        # 4. Analistas
+        curr = info.get('currentPrice', 0)
+        tgt = info.get('targetMeanPrice', 0)
+        if tgt > 0 and curr > 0:
+            upside = (tgt - curr)/curr
+            if upside > 0.2: score+=2; details.append(f"Analistas: +{upside:.0%}"); tags.append("📈 UPSIDE")
+            elif upside > 0.05: score+=1
+            
+        return min(10, score), details, tags
+    except: return 5, ["Error"], []
+
+def score_fundamental(ticker, data):
+    """data: {'df': historia diaria, 'chain': (calls, puts, vto) o None, 'info': foto de fundamentales}"""
+    try:
+        df = data['df']
+        if df is None or df.empty: return None
+        price = df['Close'].iloc[-1]
+        
+        s_tec, d_tec, rsi = fundamental_technical(df, ticker)
+        s_opt, d_opt, cw, pw, mp, sent, pcr = fundamental_options(data['chain'], price)
+        s_sea, d_sea, avg_ret = fundamental_seasonality(df)
+        s_fun, d_fun, fun_tags = get_fundamental_score(data['info'])
+        
+        atr = calculate_atr(df).iloc[-1]
+        sl = price - (2 * atr)
+        tp = price + (3 * atr)
+        
+        final = (s_tec * 3.0) + (s_opt * 2.5) + (s_sea * 2.0) + (s_fun * 2.5)
+        
+        verdict = "NEUTRAL"
+        if final >= 75: verdict = "🔥 COMPRA FUERTE"
+        elif final >= 60: verdict = "✅ COMPRA"
+        elif final <= 30: verdict = "💀 VENTA FUERTE"
+        elif final <= 45: verdict = "🔻 VENTA"
+        
+        # Parsing WR
+        wr_val = 0
+        if "WR:" in d_sea:
+            try: wr_val = float(d_sea.split("%")[0].split(":")[-1].strip())
+            except: pass
+        
+        return {
+            "Ticker": ticker, "Price": price, "Score": final, "Verdict": verdict,
+            "S_Tec": s_tec, "RSI": rsi, "D_Tec": d_tec,
+            "S_Opt": s_opt, "Sentiment": sent, "CW": cw, "PW": pw, "Max_Pain": mp, "D_Opt": d_opt,
+            "S_Sea": s_sea, "D_Sea": d_sea, "WR": wr_val,
+            "S_Fun": s_fun, "D_Fun": d_fun, "Fun_Tags": fun_tags,
+            "ATR": atr, "SL": sl, "TP": tp,
+            "History": df
+        }
+    except: return None
@@ -0,0 +1,110 @@
+import time
+import numpy as np
+import pandas as pd
+
+# --- MOTOR ESTACIONAL (UNIVERSO COMPLETO) ---
+# Un solo resample a fin de mes sobre el panel ancho de cierres (fechas x tickers) y
+# reducciones agrupadas por mes con máscaras (>0 / <0), sin lambdas por ticker.
+# Resultado: una tabla "tidy" con una fila por ticker x mes con datos.
+
+MONTH_NAMES = ['Ene', 'Feb', 'Mar', 'Abr', 'May', 'Jun', 'Jul', 'Ago', 'Sep', 'Oct', 'Nov', 'Dic']
+STAT_COLS = ['Avg_Return', 'Median_Return', 'Win_Rate', 'Avg_Win', 'Avg_Loss', 'Years']
+
+def close_panel(data, tickers):
+    """Cierres de yf.download(..., group_by='ticker') como DataFrame ancho (fechas x tickers)"""
+    if isinstance(data.columns, pd.MultiIndex):
+        top = set(data.columns.get_level_values(0))
+        cols = {t: data[t]['Close'] for t in tickers if t in top and 'Close' in data[t].columns}
+    elif len(tickers) == 1 and 'Close' in data.columns:
+        cols = {tickers[0]: data['Close']}
+    else:
+        cols = {}
+    return pd.DataFrame(cols, index=data.index)
+
+def month_end(close):
+    """Último cierre de cada mes ('ME' en pandas >= 2.2, 'M' en versiones anteriores)"""
+    try: return close.resample('ME').last()
+    except ValueError: return close.resample('M').last()
+
+def monthly_returns(close):
+    """Retorno mensual % por ticker. Meses sin cotización arrastran el último cierre (como pct_change clásico)"""
+    return month_end(close).ffill().pct_change(fill_method=None) * 100
+
+def seasonality_table(close):
+    """
+    Estadística mensual de todo el universo:
+    Ticker, Month_Num, Month_Name, Avg_Return, Median_Return, Win_Rate, Avg_Win, Avg_Loss, Years.
+    """
+    if close.empty or not isinstance(close.index, pd.DatetimeIndex):
+        return pd.DataFrame(columns=['Ticker', 'Month_Num', 'Month_Name'] + STAT_COLS)
+
+    ret = monthly_returns(close)
+    month = ret.index.month
+    g = ret.groupby(month)
+    count = g.count()
+
+    stats = {
+        'Avg_Return': g.mean(),
+        'Median_Return': g.median(),
+        'Win_Rate': (ret > 0).groupby(month).sum() / count * 100,
+        # Sin meses ganadores / perdedores el promedio es 0 (no NaN)
+        'Avg_Win': ret.where(ret > 0).groupby(month).mean().fillna(0),
+        'Avg_Loss': ret.where(ret < 0).groupby(month).mean().fillna(0),
+        'Years': count,
+    }
+
+    # Forma larga: ticker por fuera, mes por dentro (mismo orden que el recorrido por ticker)
+    tickers, months = count.columns, count.index.to_numpy()
+    table = pd.DataFrame({
+        'Ticker': np.repeat(tickers.to_numpy(), len(months)),
+        'Month_Num': np.tile(months, len(tickers)),
+    })
+    table['Month_Name'] = [MONTH_NAMES[m - 1] for m in table['Month_Num']]
+    for col in STAT_COLS:
+        table[col] = stats[col].reindex(columns=tickers).to_numpy().T.ravel()
+
+    return table[table['Years'] > 0].reset_index(drop=True)
+
+# --- BENCHMARK (python seasonality.py) ---
+def _legacy_monthly(series):
+    """df['Close'].resample('M').last().pct_change() * 100 del código original, independiente de monthly_returns"""
+    try: monthly = series.resample('M').last()
+    except ValueError: monthly = series.resample('ME').last()   # pandas >= 3 ya no acepta 'M'
+    # pct_change() rellenaba hacia adelante por defecto hasta pandas 2.x; pandas 3 solo acepta None
+    try: return monthly.pct_change(fill_method='pad') * 100
+    except ValueError: return monthly.ffill().pct_change() * 100
+
+def _legacy_stats(close):
+    """Recorrido original por ticker con groupby + lambdas (referencia para validar y medir)"""
+    rows = []
+    for ticker in close.columns:
+        monthly_ret = _legacy_monthly(close[ticker]).dropna()
+        temp_df = pd.DataFrame({'Return': monthly_ret, 'Month': monthly_ret.index.month})
+
+        def avg_win(x): return x[x > 0].mean() if len(x[x > 0]) > 0 else 0
+        def avg_loss(x): return x[x < 0].mean() if len(x[x < 0]) > 0 else 0
+
+        grouped = temp_df.groupby('Month')['Return'].agg(
+            ['mean', 'median', 'count', lambda x: (x > 0).mean() * 100, avg_win, avg_loss])
+        grouped.columns = ['Avg_Return', 'Median_Return', 'Years', 'Win_Rate', 'Avg_Win', 'Avg_Loss']
+        for m in grouped.index:
+            rows.append({'Ticker': ticker, 'Month_Num': m, **grouped.loc[m, STAT_COLS].to_dict()})
+    return pd.DataFrame(rows)
+
+def run_benchmark(n_tickers=110, start='1995-01-01'):
+    rng = np.random.default_rng(7)
+    idx = pd.bdate_range(start, pd.Timestamp.today().normalize())
+    close = pd.DataFrame(100 * np.exp(np.cumsum(rng.normal(0, 0.015, (len(idx), n_tickers)), axis=0)),
+                         index=idx, columns=[f"T{i:03d}" for i in range(n_tickers)])
+    close.iloc[:rng.integers(0, len(idx) // 2), ::7] = np.nan  # historias más cortas
+
+    t0 = time.perf_counter(); ref = _legacy_stats(close); t_loop = time.perf_counter() - t0
+    t0 = time.perf_counter(); new = seasonality_table(close); t_vec = time.perf_counter() - t0
+
+    same = len(ref) == len(new) and np.allclose(ref[STAT_COLS].to_numpy(float), new[STAT_COLS].to_numpy(float))
+    print(f"Estacionalidad {n_tickers} tickers | por ticker: {t_loop*1000:.0f} ms | "
+          f"panel: {t_vec*1000:.1f} ms | x{t_loop / t_vec:.0f} | idéntico: {same}")
+    return t_loop, t_vec, same
+
+if __name__ == "__main__":
+    run_benchmark()
@@ -0,0 +1,69 @@
+import functools
+import threading
+
+# --- SINGLE-FLIGHT (PEDIDOS IDÉNTICOS COMPARTIDOS) ---
+# Si llega un pedido igual a uno que ya está en curso (misma clave), no se vuelve a ir a la
+# red: se espera al que está en vuelo y se devuelve el mismo resultado (o la misma
+# excepción) a todos. Vale entre hilos, es decir entre sesiones de Streamlit del mismo
+# proceso. No es un caché: al terminar, el siguiente pedido vuelve a salir.
+# El resultado es compartido, así que los llamadores no deben modificarlo.
+# Contadores por nombre: 'issued' (pedidos reales), 'coalesced' (esperas sobre otro), 'errors'.
+
+_LOCK = threading.Lock()
+_INFLIGHT = {}
+_STATS = {}
+
+def _count(name, field):
+    c = _STATS.setdefault(name, {'issued': 0, 'coalesced': 0, 'errors': 0})
+    c[field] += 1
+
+def freeze(x):
+    """Clave hasheable para argumentos con listas / dicts / sets"""
+    if isinstance(x, (list, tuple)): return tuple(freeze(v) for v in x)
+    if isinstance(x, dict): return tuple(sorted((k, freeze(v)) for k, v in x.items()))
+    if isinstance(x, set): return frozenset(x)
+    return x
+
+def do(key, fn, *args, **kwargs):
+    """Ejecuta fn(*args, **kwargs) una sola vez por clave en vuelo. key[0] es el nombre del contador"""
+    name = key[0] if isinstance(key, tuple) else key
+    with _LOCK:
+        call = _INFLIGHT.get(key)
+        leader = call is None
+        if leader: call = _INFLIGHT[key] = {'done': threading.Event(), 'result': None, 'error': None}
+        _count(name, 'issued' if leader else 'coalesced')
+
+    if not leader:
+        call['done'].wait()
+        if call['error'] is not None: raise call['error']
+        return call['result']
+
+    try:
+        call['result'] = fn(*args, **kwargs)
+    except BaseException as e:
+        call['error'] = e
+        with _LOCK: _count(name, 'errors')
+        raise
+    finally:
+        with _LOCK: _INFLIGHT.pop(key, None)
+        call['done'].set()
+    return call['result']
+
+def shared(name):
+    """Decorador: las llamadas concurrentes con los mismos argumentos comparten una ejecución"""
+    def wrap(fn):
+        @functools.wraps(fn)
+        def inner(*args, **kwargs):
+            return do((name, freeze(args), freeze(kwargs)), fn, *args, **kwargs)
+        return inner
+    return wrap
+
+def stats():
+    with _LOCK: return {k: dict(v) for k, v in _STATS.items()}
+
+def totals():
+    s = stats()
+    return {f: sum(c[f] for c in s.values()) for f in ('issued', 'coalesced', 'errors')}
+
+def reset_stats():
+    with _LOCK: _STATS.clear()
@@ -0,0 +1,220 @@
+import json
+import math
+import os
+import numpy as np
+import pandas as pd
+
+# --- INDICADORES INCREMENTALES (O(1) POR BARRA) ---
+# Cada indicador es un dict serializable (JSON) + una función `*_update` que consume
+# una barra nueva. Las EWM replican la recurrencia de pandas (adjust, min_periods,
+# manejo de NaN), por lo que el valor tras la barra N es el mismo que el del cálculo
+# completo sobre las N barras.
+
+NAN = float('nan')
+
+def _isnan(x):
+    return x != x
+
+# --- EWM GENÉRICA ---
+def ewm_init(alpha, adjust=False, min_periods=0):
+    return {'alpha': alpha, 'adjust': adjust, 'minp': max(min_periods, 1),
+            'weighted': NAN, 'old_wt': 1.0, 'nobs': 0}
+
+def ewm_update(s, x):
+    """Misma lógica que pandas ewm(...).mean() (ignore_na=False)"""
+    is_obs = not _isnan(x)
+    s['nobs'] += int(is_obs)
+    new_wt = 1.0 if s['adjust'] else s['alpha']
+    if not _isnan(s['weighted']):
+        s['old_wt'] *= 1.0 - s['alpha']
+        if is_obs:
+            if s['weighted'] != x:
+                s['weighted'] = (s['old_wt'] * s['weighted'] + new_wt * x) / (s['old_wt'] + new_wt)
+            s['old_wt'] = s['old_wt'] + new_wt if s['adjust'] else 1.0
+    elif is_obs:
+        s['weighted'] = x
+    return s['weighted'] if s['nobs'] >= s['minp'] else NAN
+
+# --- ADX (WILDER) ---
+def adx_init(period=14):
+    a = 1 / period
+    return {'period': period, 'prev': None, 'value': NAN,
+            'tr': ewm_init(a), 'p_dm': ewm_init(a), 'n_dm': ewm_init(a), 'dx': ewm_init(a)}
+
+def adx_update(s, high, low, close):
+    """Igual que calculate_adx de los bots, una barra a la vez"""
+    if s['prev'] is None:
+        tr = high - low
+        p_dm = n_dm = 0.0
+    else:
+        p_high, p_low, p_close = s['prev']
+        tr = max(high - low, abs(high - p_close), abs(low - p_close))
+        up, down = high - p_high, p_low - low
+        p_dm = up if (up > down and up > 0) else 0.0
+        n_dm = down if (down > up and down > 0) else 0.0
+    s['prev'] = [high, low, close]
+
+    tr_s = ewm_update(s['tr'], tr)
+    if tr_s == 0: tr_s = 1.0
+    p_di = 100 * (ewm_update(s['p_dm'], p_dm) / tr_s)
+    n_di = 100 * (ewm_update(s['n_dm'], n_dm) / tr_s)
+    dx = 100 * abs(p_di - n_di) / (p_di + n_di) if (p_di + n_di) != 0 else NAN
+    s['value'] = ewm_update(s['dx'], dx)
+    return s['value']
+
+# --- HEIKIN ASHI ---
+def ha_init(seed='open'):
+    return {'seed': seed, 'ha_open': None, 'ha_close': None, 'color': 0}
+
+def ha_update(s, o, h, l, c):
+    hc = (o + h + l + c) / 4
+    if s['ha_open'] is None:
+        ho = o if s['seed'] == 'open' else (o + c) / 2
+    else:
+        ho = (s['ha_open'] + s['ha_close']) / 2
+    s['ha_open'], s['ha_close'] = ho, hc
+    # 1 Verde, -1 Rojo
+    s['color'] = 1 if hc > ho else -1
+    return s['color']
+
+# --- EMA ---
+def ema_init(span, adjust=True):
+    """adjust=True reproduce df['Close'].ewm(span=...).mean()"""
+    return {'value': NAN, 'ewm': ewm_init(2 / (span + 1), adjust=adjust)}
+
+def ema_update(s, close):
+    s['value'] = ewm_update(s['ewm'], close)
+    return s['value']
+
+# --- RSI (WILDER, COMO pandas_ta) ---
+def rsi_init(period=14):
+    a = 1 / period
+    return {'prev': None, 'value': NAN,
+            'gain': ewm_init(a, adjust=True, min_periods=period),
+            'loss': ewm_init(a, adjust=True, min_periods=period)}
+
+def rsi_update(s, close):
+    delta = NAN if s['prev'] is None else close - s['prev']
+    s['prev'] = close
+    gain = delta if _isnan(delta) else max(delta, 0.0)
+    loss = delta if _isnan(delta) else max(-delta, 0.0)
+    g, l = ewm_update(s['gain'], gain), ewm_update(s['loss'], loss)
+    s['value'] = 100 * g / (g + l) if (g + l) != 0 else NAN
+    return s['value']
+
+# --- ESTADO COMPLETO POR TICKER/TEMPORALIDAD ---
+def ticker_state_init(adx_len=14, ha_seed='open'):
+    return {'first_ts': None, 'last_ts': None, 'bars': 0, 'adx': adx_init(adx_len), 'ha': ha_init(ha_seed),
+            'in_position': False, 'last_signal': None}
+
+def ticker_state_update(s, ts, o, h, l, c, adx_th=20):
+    """Una barra nueva: ADX + HA + máquina de posición de get_last_signal"""
+    adx = adx_update(s['adx'], h, l, c)
+    color = ha_update(s['ha'], o, h, l, c)
+    # El recorrido original empieza en la barra 1 (la 0 solo inicializa)
+    if s['bars'] > 0:
+        if not s['in_position'] and color == 1 and adx > adx_th:
+            s['in_position'] = True
+            s['last_signal'] = {"Tipo": "🟢 COMPRA", "Fecha": ts, "Precio": c, "ADX": adx}
+        elif s['in_position'] and color == -1:
+            s['in_position'] = False
+            s['last_signal'] = {"Tipo": "🔴 VENTA", "Fecha": ts, "Precio": c, "ADX": adx}
+    s['bars'] += 1
+    s['last_ts'] = ts
+    s['last_close'] = c
+    return s
+
+def _copy(s):
+    """Copia del estado (dicts y listas anidados; los valores son inmutables)"""
+    return {k: _copy(v) if isinstance(v, dict) else list(v) if isinstance(v, list) else v for k, v in s.items()}
+
+def advance_bars(s, index, o, h, l, c, adx_th=20, last_is_open=True):
+    """
+    Igual que advance sobre arrays: index (DatetimeIndex ordenado) y Open/High/Low/Close.
+    Evita armar un DataFrame por ticker cuando los datos salen de un panel.
+    """
+    start = 0
+    if s['last_ts'] is not None:
+        ts = pd.Timestamp(s['last_ts'])
+        k = index.searchsorted(ts)
+        # Historia revisada desde el checkpoint (ajuste por dividendo/split o barra que ya no está)
+        # o ventana corrida (period fijo: las barras viejas salen por adelante y el estado todavía
+        # las arrastra): se reinicia el estado y se recorre completa
+        if s.get('first_ts') is None or pd.Timestamp(s['first_ts']) != index[0] or k >= len(index) \
+                or index[k] != ts or not math.isclose(float(c[k]), s.get('last_close', NAN), rel_tol=1e-6):
+            fresh = ticker_state_init(s['adx']['period'], s['ha']['seed'])
+            s.clear(); s.update(fresh)
+        else: start = k + 1
+    if s['last_ts'] is None and len(index): s['first_ts'] = index[0]
+    rows = list(zip(index[start:], *(np.asarray(x[start:], dtype=float).tolist() for x in (o, h, l, c))))
+    closed, pending = (rows[:-1], rows[-1:]) if last_is_open else (rows, [])
+
+    for ts, o_, h_, l_, c_ in closed: ticker_state_update(s, ts, o_, h_, l_, c_, adx_th)
+    view = _copy(s)
+    for ts, o_, h_, l_, c_ in pending: ticker_state_update(view, ts, o_, h_, l_, c_, adx_th)
+    return view
+
+def advance(s, df, adx_th=20, last_is_open=True):
+    """
+    Procesa solo las barras posteriores a s['last_ts'].
+    Si last_is_open, la última barra (vela en curso) NO se consolida en `s`:
+    se devuelve una copia con esa barra aplicada para leer el estado actual.
+    Si la historia fue revisada desde el checkpoint o la ventana empieza en otra barra, `s` se
+    reinicia y se recorre completa (mismo resultado que recalcular sobre `df`).
+    """
+    return advance_bars(s, df.index, df['Open'].to_numpy(), df['High'].to_numpy(), df['Low'].to_numpy(),
+                        df['Close'].to_numpy(), adx_th, last_is_open)
+
+# --- CHECKPOINT EN DISCO ---
+# Las claves de JSON son texto: las tuplas (ticker, temporalidad) se guardan como '__tuple__["a", "b"]'
+TUPLE_KEY = '__tuple__'
+
+def _encode_key(k):
+    return TUPLE_KEY + json.dumps(list(k)) if isinstance(k, tuple) else k
+
+def _decode_key(k):
+    return tuple(json.loads(k[len(TUPLE_KEY):])) if isinstance(k, str) and k.startswith(TUPLE_KEY) else k
+
+def _encode(obj):
+    if isinstance(obj, pd.Timestamp): return {'__ts__': obj.isoformat()}
+    if isinstance(obj, dict): return {_encode_key(k): _encode(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)): return [_encode(v) for v in obj]
+    if isinstance(obj, float) and math.isnan(obj): return None
+    if hasattr(obj, 'item'): return _encode(obj.item())  # escalares numpy
+    return obj
+
+def _decode(obj, key=None):
+    if isinstance(obj, dict):
+        if '__ts__' in obj: return pd.Timestamp(obj['__ts__'])
+        return {_decode_key(k): _decode(v, k) for k, v in obj.items()}
+    if isinstance(obj, list): return [_decode(v) for v in obj]
+    # None solo representa NaN en los campos numéricos de las EWM / valores
+    if obj is None and key in ('weighted', 'value', 'ADX', 'last_close'): return NAN
+    return obj
+
+def save_checkpoint(path, states):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, 'w') as f: f.write(json.dumps(_encode(states)))  # dumps usa el encoder en C
+    os.replace(tmp, path)
+
+def load_checkpoint(path):
+    if not os.path.exists(path): return {}
+    try:
+        with open(path) as f: return _decode(json.load(f))
+    except (ValueError, OSError): return {}
+
+def scan_incremental(frames, path, adx_th=20, adx_len=14, last_is_open=True):
+    """
+    frames: {clave: DataFrame OHLC o (index, open, high, low, close)}. Avanza cada estado desde
+    su checkpoint, guarda el nuevo checkpoint y devuelve {clave: estado actual}.
+    """
+    states = load_checkpoint(path)
+    views = {}
+    for key, data in frames.items():
+        if data is None or not len(data if isinstance(data, pd.DataFrame) else data[0]): continue
+        s = states.setdefault(key, ticker_state_init(adx_len))
+        views[key] = advance(s, data, adx_th, last_is_open) if isinstance(data, pd.DataFrame) \
+            else advance_bars(s, *data, adx_th=adx_th, last_is_open=last_is_open)
+    save_checkpoint(path, states)
+    return views